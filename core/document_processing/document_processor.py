@@ -9,21 +9,13 @@ import hashlib
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None  # type: ignore
-import pdfplumber
-from docx import Document
-from openpyxl import load_workbook
-import pandas as pd
-from bs4 import BeautifulSoup
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 
 from core.document_processing.text_splitter import TextSplitter
 from core.document_processing.file_processor import FileProcessor
-from core.pinecone.pinecone_service import PineconeService
+from core.document_processing.extractors import extract_text, iter_segments
+from core.vector_store.base import VectorStore
 from core.database.models import Document as DBDocument, DocumentType, Department
 from core.llm.config import get_settings
 
@@ -36,7 +28,7 @@ class DocumentProcessor:
     
     def __init__(
         self,
-        pinecone_service: PineconeService,
+        vector_store: VectorStore,
         db: Session,
         chunk_size: int = 1000,
         chunk_overlap: int = 200
@@ -45,12 +37,12 @@ class DocumentProcessor:
         Initialize Document Processor.
         
         Args:
-            pinecone_service: Pinecone service instance
+            vector_store: Vector store backend (Pinecone or local)
             db: Database session
             chunk_size: Size of text chunks
             chunk_overlap: Overlap between chunks
         """
-        self.pinecone_service = pinecone_service
+        self.vector_store = vector_store
         self.db = db
         self.text_splitter = TextSplitter(
             chunk_size=chunk_size,
@@ -61,115 +53,6 @@ class DocumentProcessor:
         
         logger.info(f"DocumentProcessor initialized with chunk_size={chunk_size}")
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """
-        Extract text from PDF file using multiple methods.
-        
-        Args:
-            file_path: Path to PDF file
-            
-        Returns:
-            Extracted text content
-        """
-        text = ""
-        
-        # Try PyMuPDF first (faster)
-        if fitz is not None:
-            try:
-                with fitz.open(file_path) as doc:  # type: ignore
-                    for page in doc:
-                        text += page.get_text()
-                
-                if text.strip():
-                    logger.info(f"Extracted {len(text)} characters from PDF using PyMuPDF")
-                    return text
-            except Exception as e:
-                logger.warning(f"PyMuPDF failed: {e}, trying pdfplumber...")
-        
-        # Fallback to pdfplumber
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            logger.info(f"Extracted {len(text)} characters from PDF using pdfplumber")
-        except Exception as e:
-            logger.error(f"Failed to extract text from PDF: {e}")
-            raise
-        
-        return text
-    
-    def extract_text_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file."""
-        try:
-            doc = Document(file_path)
-            text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
-            logger.info(f"Extracted {len(text)} characters from DOCX")
-            return text
-        except Exception as e:
-            logger.error(f"Failed to extract text from DOCX: {e}")
-            raise
-    
-    def extract_text_from_txt(self, file_path: str) -> str:
-        """Extract text from TXT file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            logger.info(f"Extracted {len(text)} characters from TXT")
-            return text
-        except UnicodeDecodeError:
-            # Try different encodings
-            for encoding in ['latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        text = f.read()
-                    logger.info(f"Extracted {len(text)} characters from TXT using {encoding}")
-                    return text
-                except:
-                    continue
-            raise ValueError("Could not decode text file with any known encoding")
-    
-    def extract_text_from_excel(self, file_path: str) -> str:
-        """Extract text from Excel file."""
-        try:
-            df = pd.read_excel(file_path, sheet_name=None)
-            text = ""
-            
-            for sheet_name, sheet_df in df.items():
-                text += f"\n\n=== Sheet: {sheet_name} ===\n"
-                # Convert DataFrame to text representation
-                text += sheet_df.to_string(index=False)
-            
-            logger.info(f"Extracted {len(text)} characters from Excel")
-            return text
-        except Exception as e:
-            logger.error(f"Failed to extract text from Excel: {e}")
-            raise
-    
-    def extract_text_from_html(self, file_path: str) -> str:
-        """Extract text from HTML file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            text = soup.get_text()
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            logger.info(f"Extracted {len(text)} characters from HTML")
-            return text
-        except Exception as e:
-            logger.error(f"Failed to extract text from HTML: {e}")
-            raise
-    
     def extract_text_from_file(self, file_path: str) -> str:
         """
         Extract text from file based on extension.
@@ -180,24 +63,8 @@ class DocumentProcessor:
         Returns:
             Extracted text
         """
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        extractors = {
-            '.pdf': self.extract_text_from_pdf,
-            '.docx': self.extract_text_from_docx,
-            '.txt': self.extract_text_from_txt,
-            '.xlsx': self.extract_text_from_excel,
-            '.xls': self.extract_text_from_excel,
-            '.csv': self.extract_text_from_excel,
-            '.html': self.extract_text_from_html,
-            '.htm': self.extract_text_from_html,
-        }
-        
-        extractor = extractors.get(ext)
-        if not extractor:
-            raise ValueError(f"Unsupported file type: {ext}")
-        
-        return extractor(file_path)
+        # Parser libraries are imported by the extractor on first use
+        return extract_text(file_path)
     
     def calculate_file_hash(self, file_path: str) -> str:
         """Calculate SHA-256 hash of file."""
@@ -246,99 +113,96 @@ class DocumentProcessor:
         
         return metadata
     
-    async def process_and_upload_file(
+    def ingest_file(
         self,
-        file: UploadFile,
+        file_path: str,
+        filename: str,
         namespace: str = "default",
-        additional_metadata: Optional[Dict[str, Any]] = None
+        additional_metadata: Optional[Dict[str, Any]] = None,
+        min_characters: int = 0
     ) -> Dict[str, Any]:
         """
-        Process a file and upload to Pinecone.
+        Extract, chunk and upsert a file incrementally, then record it in the database.
+        Segments stream from the format's extractor into the splitter, and
+        chunks are upserted in batches of INGEST_BATCH_SIZE, so peak memory
+        is bounded by one batch rather than the whole file. Chunks already
+        upserted are deleted again if ingestion fails.
         
         Args:
-            file: Uploaded file
+            file_path: Path to the file on disk
+            filename: Original filename
             namespace: Pinecone namespace
-            additional_metadata: Additional metadata
+            additional_metadata: Additional metadata (only simple types are kept)
+            min_characters: Fail if less text than this is extracted
             
         Returns:
             Dictionary with upload results
         """
-        # Save uploaded file temporarily
-        temp_dir = self.settings.UPLOAD_DIR
-        os.makedirs(temp_dir, exist_ok=True)
+        base_doc_id = str(uuid.uuid4())
+        file_type = self.file_processor.get_file_type(filename)
+        file_hash = self.calculate_file_hash(file_path)
+        upload_date = datetime.now().strftime("%Y-%m-%d")
         
-        # Ensure filename is not None
-        filename = file.filename or "unnamed_file"
-        file_path = os.path.join(temp_dir, filename)
+        # Add additional metadata if provided (keep flat, only simple types)
+        extra_metadata = {
+            key: value for key, value in (additional_metadata or {}).items()
+            if isinstance(value, (str, int, float, bool))
+        }
+        
+        batch_size = self.settings.INGEST_BATCH_SIZE
+        batch: List[Dict[str, Any]] = []
+        upserted_ids: List[str] = []
+        upload_result = {"dense_count": 0, "sparse_count": 0}
+        characters = 0
+        chunks_count = 0
+        
+        def flush() -> None:
+            result = self.vector_store.upsert_documents(documents=batch, namespace=namespace)
+            for key, count in (result or {}).items():
+                upload_result[key] = upload_result.get(key, 0) + count
+            upserted_ids.extend(doc["id"] for doc in batch)
+            batch.clear()
         
         try:
-            # Save file
-            with open(file_path, 'wb') as f:
-                content = await file.read()
-                f.write(content)
-            
-            logger.info(f"Processing file: {filename}")
-            
-            # Extract text
-            text = self.extract_text_from_file(file_path)
-            
-            if not text or len(text.strip()) < 10:
-                raise ValueError("Extracted text is too short or empty")
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_text(text)
-            logger.info(f"Split into {len(chunks)} chunks")
-            
-            # Prepare documents for Pinecone
-            documents = []
-            base_doc_id = str(uuid.uuid4())
-            
-            for i, chunk_text in enumerate(chunks):
-                doc_id = f"{base_doc_id}_chunk_{i}"
+            # Parser libraries are imported by the extractor on first use
+            for chunk in self.text_splitter.split_segments(iter_segments(file_path)):
+                characters += len(chunk["text"])
                 
-                # Create flat metadata structure (Pinecone v7 requirement)
-                # All fields must be at top level, not nested
-                doc_metadata = {
+                # Flat metadata structure (Pinecone v7 requirement): all fields at
+                # top level. total_chunks is unknown while streaming, so it is
+                # only stored in the database
+                batch.append({
+                    "id": f"{base_doc_id}_chunk_{chunks_count}",
+                    "chunk_text": chunk["text"],  # This field gets auto-embedded by Pinecone
+                    **chunk["metadata"],  # page / heading / sheet / row
                     "source": filename,
-                    "document_type": self.file_processor.get_file_type(filename),
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "upload_date": datetime.now().strftime("%Y-%m-%d"),
-                    "file_hash": self.calculate_file_hash(file_path)[:16]  # Shortened for metadata
-                }
-                
-                # Add additional metadata if provided (keep flat)
-                if additional_metadata:
-                    for key, value in additional_metadata.items():
-                        # Only add simple types (str, int, float, bool)
-                        if isinstance(value, (str, int, float, bool)):
-                            doc_metadata[key] = value
-                
-                # Format for Pinecone v7 (auto-embedding via integrated inference)
-                documents.append({
-                    "id": doc_id,
-                    "chunk_text": chunk_text,  # This field gets auto-embedded by Pinecone
-                    **doc_metadata  # Flat metadata at top level
+                    "document_type": file_type,
+                    "chunk_index": chunks_count,
+                    "upload_date": upload_date,
+                    "file_hash": file_hash[:16],  # Shortened for metadata
+                    **extra_metadata
                 })
+                chunks_count += 1
+                if len(batch) >= batch_size:
+                    flush()
             
-            # Upload to Pinecone
-            logger.info(f"Uploading {len(documents)} chunks to Pinecone...")
-            upload_result = self.pinecone_service.upsert_documents(
-                documents=documents,
-                namespace=namespace
-            )
+            if characters < min_characters:
+                raise ValueError("Extracted text is too short or empty")
+            if batch:
+                flush()
+            logger.info(f"Upserted {chunks_count} chunks ({characters} characters) from {filename}")
             
-            # Save to PostgreSQL/SQLite
+            # Save to database
             db_document = DBDocument(
                 document_id=base_doc_id,
                 file_name=filename,
                 display_name=filename,
-                file_type=self.file_processor.get_file_type(filename),
+                file_type=file_type,
                 file_size=os.path.getsize(file_path),
-                file_hash=self.calculate_file_hash(file_path),
-                total_chunks=len(chunks)
+                file_hash=file_hash,
+                total_chunks=chunks_count
                 # created_at is auto-set by model
-                # namespace is stored in Pinecone, not in DB
+                # namespace is stored in Pinecone metadata, not in DB
             )
             
             if additional_metadata:
@@ -349,17 +213,66 @@ class DocumentProcessor:
             
             self.db.add(db_document)
             self.db.commit()
+        except Exception:
+            if upserted_ids:
+                logger.warning(f"Removing {len(upserted_ids)} chunks of {filename} after failed ingestion")
+                try:
+                    self.vector_store.delete_vectors(upserted_ids, namespace)
+                except Exception as e:
+                    logger.error(f"Failed to remove partial upload of {filename}: {str(e)}")
+            raise
+        
+        logger.info(f"Successfully processed and uploaded: {filename}")
+        
+        return {
+            "status": "success",
+            "filename": filename,
+            "document_id": base_doc_id,
+            "chunks_count": chunks_count,
+            "namespace": namespace,
+            "pinecone_upload": upload_result
+        }
+    
+    async def process_and_upload_file(
+        self,
+        file: UploadFile,
+        namespace: str = "default",
+        additional_metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a file and upload to Pinecone.
+        
+        Args:
+            file: Uploaded file
+            namespace: Pinecone namespace
+            additional_metadata: Additional metadata
             
-            logger.info(f"Successfully processed and uploaded: {filename}")
+        Returns:
+            Dictionary with upload results
+        """
+        # Save uploaded file temporarily
+        temp_dir = self.settings.UPLOAD_DIR
+        os.makedirs(temp_dir, exist_ok=True)
+        
+        # Ensure filename is not None
+        filename = file.filename or "unnamed_file"
+        file_path = os.path.join(temp_dir, filename)
+        
+        try:
+            # Save file in blocks rather than reading it into memory at once
+            with open(file_path, 'wb') as f:
+                while block := await file.read(1 << 20):
+                    f.write(block)
             
-            return {
-                "status": "success",
-                "filename": filename,
-                "document_id": base_doc_id,
-                "chunks_count": len(chunks),
-                "namespace": namespace,
-                "pinecone_upload": upload_result
-            }
+            logger.info(f"Processing file: {filename}")
+            
+            return self.ingest_file(
+                file_path,
+                filename,
+                namespace=namespace,
+                additional_metadata=additional_metadata,
+                min_characters=10
+            )
             
         except Exception as e:
             logger.error(f"Error processing file {filename}: {str(e)}")
@@ -392,83 +305,13 @@ class DocumentProcessor:
             Status dict with upload results
         """
         try:
-            # Extract text from file
-            text = self.extract_text_from_file(file_path)
-            logger.info(f"Extracted {len(text)} characters from {original_filename}")
-            
-            # Split text into chunks
-            chunks = self.text_splitter.split_text(text)
-            logger.info(f"Split into {len(chunks)} chunks")
-            
-            # Generate base document ID
-            base_doc_id = str(uuid.uuid4())
-            
-            # Prepare documents with flat metadata for Pinecone v7
-            documents = []
-            for i, chunk_text in enumerate(chunks):
-                doc_id = f"{base_doc_id}_chunk_{i}"
-                
-                # Create flat metadata structure (Pinecone v7 requirement)
-                doc_metadata = {
-                    "source": original_filename,
-                    "document_type": self.file_processor.get_file_type(original_filename),
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "upload_date": datetime.now().strftime("%Y-%m-%d"),
-                    "file_hash": self.calculate_file_hash(file_path)[:16]
-                }
-                
-                # Add additional metadata (keep flat, only simple types)
-                if additional_metadata:
-                    for key, value in additional_metadata.items():
-                        if isinstance(value, (str, int, float, bool)):
-                            doc_metadata[key] = value
-                
-                documents.append({
-                    "id": doc_id,
-                    "chunk_text": chunk_text,  # REQUIRED field for Pinecone
-                    **doc_metadata  # Flat at top level
-                })
-            
-            # Upload to Pinecone (auto-embedding handled by Pinecone)
-            upload_result = self.pinecone_service.upsert_documents(
-                documents=documents,
-                namespace=namespace
+            return self.ingest_file(
+                file_path,
+                original_filename,
+                namespace=namespace,
+                additional_metadata=additional_metadata
             )
             
-            # Save to Database (SQLite)
-            db_document = DBDocument(
-                document_id=base_doc_id,
-                file_name=original_filename,
-                display_name=original_filename,
-                file_type=self.file_processor.get_file_type(original_filename),
-                file_size=os.path.getsize(file_path),
-                file_hash=self.calculate_file_hash(file_path),
-                total_chunks=len(chunks)
-                # created_at is auto-set by model
-                # namespace is stored in Pinecone metadata, not in DB
-            )
-            
-            if additional_metadata:
-                if 'document_type' in additional_metadata:
-                    db_document.document_type = additional_metadata['document_type']
-                if 'department' in additional_metadata:
-                    db_document.department = additional_metadata['department']
-            
-            self.db.add(db_document)
-            self.db.commit()
-            
-            logger.info(f"Successfully processed and uploaded: {original_filename}")
-            
-            return {
-                "status": "success",
-                "filename": original_filename,
-                "document_id": base_doc_id,
-                "chunks_count": len(chunks),
-                "namespace": namespace,
-                "pinecone_upload": upload_result
-            }
-            
         except Exception as e:
             logger.error(f"Error processing file {original_filename}: {str(e)}")
             return {
@@ -509,7 +352,7 @@ class DocumentProcessor:
             ]
             
             # Delete from Pinecone
-            self.pinecone_service.delete_vectors(chunk_ids, namespace)
+            self.vector_store.delete_vectors(chunk_ids, namespace)
             
             # Delete from PostgreSQL
             self.db.delete(db_doc)
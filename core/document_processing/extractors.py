@@ -0,0 +1,318 @@
+"""
+Extractors - Streaming text extraction per file format, registered by extension.
+Each extractor is a generator of segments, {"text", "metadata"}, one per
+page, paragraph or row, with structural metadata (page number, heading,
+sheet and row), so files are chunked and upserted incrementally and large
+files are never held in memory as one string.
+
+Parser libraries (PyMuPDF, pdfplumber, python-docx, openpyxl, pandas,
+BeautifulSoup) are imported inside each extractor, on first use, so API
+workers that never ingest a file do not pay their import time or memory.
+"""
+
+import codecs
+import csv
+import logging
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core.document_processing.pdf_extractor import iter_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+Segment = Dict[str, Any]
+Extractor = Callable[[str], Iterator[Segment]]
+
+# Extension (with dot, lowercase) -> extractor
+_EXTRACTORS: Dict[str, Extractor] = {}
+
+# Candidate encodings for plain text and CSV files, in order
+TEXT_ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+
+def register_extractor(*extensions: str) -> Callable[[Extractor], Extractor]:
+    """
+    Register a segment extractor for one or more file extensions.
+
+    Args:
+        *extensions: Extensions such as ".pdf" (case-insensitive)
+
+    Returns:
+        Decorator that registers the function and returns it unchanged
+    """
+    def decorator(func: Extractor) -> Extractor:
+        for ext in extensions:
+            _EXTRACTORS[ext.lower()] = func
+        return func
+    return decorator
+
+def supported_extensions() -> List[str]:
+    """Extensions with a registered extractor."""
+    return sorted(_EXTRACTORS)
+
+def _segment(text: str, **metadata: Any) -> Segment:
+    """Build a segment, leaving out unset metadata (Pinecone rejects nulls)."""
+    return {"text": text, "metadata": {k: v for k, v in metadata.items() if v is not None}}
+
+def iter_segments(file_path: str) -> Iterator[Segment]:
+    """
+    Stream the non-empty text segments of a file.
+
+    Args:
+        file_path: Path to file
+
+    Returns:
+        Iterator of {"text", "metadata"} in document order
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    extractor = _EXTRACTORS.get(ext)
+    if not extractor:
+        raise ValueError(f"Unsupported file type: {ext}")
+    segments = 0
+    characters = 0
+    for segment in extractor(file_path):
+        if segment["text"].strip():
+            segments += 1
+            characters += len(segment["text"])
+            yield segment
+    logger.info(f"Extracted {characters} characters in {segments} segments from {os.path.basename(file_path)}")
+
+def extract_text(file_path: str) -> str:
+    """
+    Extract the whole text of a file.
+
+    Args:
+        file_path: Path to file
+
+    Returns:
+        Segment texts joined by blank lines
+    """
+    return "\n\n".join(segment["text"] for segment in iter_segments(file_path))
+
+def _detect_encoding(file_path: str, block_size: int = 1 << 20) -> str:
+    """Pick the first candidate encoding that decodes the whole file, block by block."""
+    for encoding in TEXT_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(block_size), b""):
+                    decoder.decode(block)
+                decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Could not decode text file with any known encoding")
+
+@register_extractor(".pdf")
+def extract_pdf_pages(file_path: str) -> Iterator[Segment]:
+    """
+    Stream PDF pages, extracted in page ranges over a process pool with
+    PyMuPDF and a per-page pdfplumber fallback (see pdf_extractor).
+
+    Args:
+        file_path: Path to PDF file
+
+    Returns:
+        Iterator of segments with metadata {"page"} (1-based)
+    """
+    fallback_pages = 0
+    for number, text, method in iter_pdf_pages(file_path):
+        fallback_pages += method == "pdfplumber"
+        yield _segment(text, page=number)
+    if fallback_pages:
+        logger.info(f"Extracted {fallback_pages} PDF pages with pdfplumber")
+
+@register_extractor(".docx")
+def extract_docx_paragraphs(file_path: str) -> Iterator[Segment]:
+    """
+    Stream DOCX paragraphs.
+
+    Args:
+        file_path: Path to DOCX file
+
+    Returns:
+        Iterator of segments with metadata {"heading"}: the latest heading
+        or title paragraph, which is itself a segment
+    """
+    from docx import Document
+    try:
+        doc = Document(file_path)
+    except Exception as e:
+        logger.error(f"Failed to extract text from DOCX: {e}")
+        raise
+    heading: Optional[str] = None
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+        style = para.style.name if para.style is not None else ""
+        if style.startswith("Heading") or style == "Title":
+            heading = text
+        yield _segment(text, heading=heading)
+
+@register_extractor(".txt")
+def extract_txt_paragraphs(file_path: str) -> Iterator[Segment]:
+    """
+    Stream blank-line separated paragraphs of a text file.
+
+    Args:
+        file_path: Path to TXT file
+
+    Returns:
+        Iterator of segments with metadata {"paragraph"} (1-based)
+    """
+    encoding = _detect_encoding(file_path)
+    if encoding != 'utf-8':
+        logger.info(f"Reading TXT using {encoding}")
+    paragraph: List[str] = []
+    number = 0
+    with open(file_path, 'r', encoding=encoding) as f:
+        for line in f:
+            if line.strip():
+                paragraph.append(line.rstrip("\n"))
+            elif paragraph:
+                number += 1
+                yield _segment("\n".join(paragraph), paragraph=number)
+                paragraph = []
+    if paragraph:
+        yield _segment("\n".join(paragraph), paragraph=number + 1)
+
+def _format_row(header: List[str], values: List[Any]) -> str:
+    """Render a row as "column: value | ..." (header-less cells by value only)."""
+    cells = []
+    for i, value in enumerate(values):
+        if value is None or str(value).strip() == "" or str(value) == "nan":
+            continue
+        column = header[i] if i < len(header) and header[i] else ""
+        cells.append(f"{column}: {value}" if column else str(value))
+    return " | ".join(cells)
+
+def _row_segments(rows: Iterator[List[Any]], sheet: Optional[str]) -> Iterator[Segment]:
+    """Turn rows (the first one being the header) into row segments."""
+    header: Optional[List[str]] = None
+    for number, values in enumerate(rows, start=1):
+        if header is None:
+            header = ["" if v is None else str(v).strip() for v in values]
+            continue
+        text = _format_row(header, list(values))
+        if text:
+            yield _segment(text, sheet=sheet, row=number)
+
+@register_extractor(".xlsx")
+def extract_xlsx_rows(file_path: str) -> Iterator[Segment]:
+    """
+    Stream spreadsheet rows with openpyxl in read-only mode.
+
+    Args:
+        file_path: Path to XLSX file
+
+    Returns:
+        Iterator of segments with metadata {"sheet", "row"} (1-based, the
+        first row of each sheet is its header)
+    """
+    from openpyxl import load_workbook
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        logger.error(f"Failed to extract text from Excel: {e}")
+        raise
+    try:
+        for sheet in workbook.worksheets:
+            yield from _row_segments(sheet.iter_rows(values_only=True), sheet.title)
+    finally:
+        workbook.close()
+
+@register_extractor(".xls")
+def extract_xls_rows(file_path: str) -> Iterator[Segment]:
+    """
+    Stream legacy Excel rows (pandas loads one sheet at a time).
+
+    Args:
+        file_path: Path to XLS file
+
+    Returns:
+        Iterator of segments with metadata {"sheet", "row"}
+    """
+    import pandas as pd
+    try:
+        workbook = pd.ExcelFile(file_path)
+    except Exception as e:
+        logger.error(f"Failed to extract text from Excel: {e}")
+        raise
+    with workbook:
+        for sheet_name in workbook.sheet_names:
+            df = workbook.parse(sheet_name, header=None, dtype=str)
+            yield from _row_segments((list(row) for row in df.itertuples(index=False)), str(sheet_name))
+
+@register_extractor(".csv")
+def extract_csv_rows(file_path: str) -> Iterator[Segment]:
+    """
+    Stream CSV rows.
+
+    Args:
+        file_path: Path to CSV file
+
+    Returns:
+        Iterator of segments with metadata {"row"}
+    """
+    encoding = _detect_encoding(file_path)
+    with open(file_path, 'r', encoding=encoding, newline='') as f:
+        yield from _row_segments(csv.reader(f), None)
+
+_HTML_HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# Text nodes under the same one of these are joined on one line
+_HTML_BLOCKS = ("p", "li", "tr", "dt", "dd", "pre", "blockquote", "div", "section", "article", "td", "th") + _HTML_HEADINGS
+
+@register_extractor(".html", ".htm")
+def extract_html_blocks(file_path: str) -> Iterator[Segment]:
+    """
+    Stream the text of an HTML file, split at headings.
+
+    Args:
+        file_path: Path to HTML file
+
+    Returns:
+        Iterator of segments with metadata {"heading"}: the nearest
+        preceding h1-h6, which is itself a segment
+    """
+    from bs4 import BeautifulSoup
+    from bs4.element import CData, NavigableString
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+    except Exception as e:
+        logger.error(f"Failed to extract text from HTML: {e}")
+        raise
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    heading: Optional[str] = None
+    lines: List[str] = []
+    block = None
+    for string in soup.find_all(string=True):
+        # Visible text only (no comments, doctype or declarations)
+        if type(string) not in (NavigableString, CData):
+            continue
+        # Clean up whitespace
+        phrases = [p.strip() for line in string.splitlines() for p in line.strip().split("  ")]
+        text = "\n".join(p for p in phrases if p)
+        if not text:
+            continue
+        if string.find_parent(_HTML_HEADINGS) is not None:
+            if lines:
+                yield _segment("\n".join(lines), heading=heading)
+                lines = []
+            heading = " ".join(text.split())
+            yield _segment(heading, heading=heading)
+            block = None
+        else:
+            parent = string.find_parent(_HTML_BLOCKS)
+            if lines and parent is not None and parent is block:
+                lines[-1] += " " + text
+            else:
+                lines.append(text)
+            block = parent
+    if lines:
+        yield _segment("\n".join(lines), heading=heading)
@@ -0,0 +1,241 @@
+"""
+PDF Extractor - Page-range text extraction fanned out over a process pool.
+A PDF is cut into ranges of pages; each range is extracted in a worker
+process with PyMuPDF, and only the pages PyMuPDF fails on are re-read with
+pdfplumber. Ranges are submitted through a bounded window and their pages
+are yielded in page order, so memory stays bounded by a few ranges.
+Small files are extracted in-process, where the pool's overhead would
+outweigh the parallelism. A range whose worker fails (or whose pool breaks)
+is extracted again in-process, skipping only the pages that still fail.
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import threading
+from contextlib import ExitStack
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from core.llm.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# (1-based page number, text, "pymupdf" | "pdfplumber")
+PageText = Tuple[int, str, str]
+
+def default_workers() -> int:
+    """PDF_EXTRACT_WORKERS capped by the CPU count."""
+    return max(1, min(get_settings().PDF_EXTRACT_WORKERS, os.cpu_count() or 1))
+
+# Process pools by size, created on first use
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+def get_pdf_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Get the shared process pool of a given size for PDF page extraction.
+    Workers are spawned (not forked) so they never inherit the server's
+    threads and locks; each pays the module import once, on first use.
+
+    Args:
+        workers: Number of processes
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            logger.info(f"Creating PDF extraction pool with {workers} processes")
+            executor = _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return executor
+
+def shutdown_pdf_executor() -> None:
+    """Shut down every PDF extraction pool that was created."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _discard_pdf_executor(workers: int, executor: ProcessPoolExecutor) -> None:
+    """Forget a broken pool, so the next extraction spawns a new one."""
+    with _executors_lock:
+        if _executors.get(workers) is executor:
+            del _executors[workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def count_pages(file_path: str) -> int:
+    """
+    Count the pages of a PDF.
+
+    Args:
+        file_path: Path to PDF file
+
+    Returns:
+        Number of pages
+    """
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"PyMuPDF could not open PDF: {e}, counting pages with pdfplumber...")
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+def iter_page_range(file_path: str, start: int, stop: int) -> Iterator[PageText]:
+    """
+    Stream pages [start, stop) (0-based) with PyMuPDF, falling back to
+    pdfplumber for the pages it fails on (or every page, if PyMuPDF is
+    missing or cannot open the file). Each library opens the file once.
+
+    Args:
+        file_path: Path to PDF file
+        start: First page index
+        stop: Page index after the last one
+
+    Returns:
+        Iterator of page texts in page order
+    """
+    with ExitStack() as stack:
+        doc = None
+        try:
+            import fitz  # PyMuPDF
+            doc = stack.enter_context(fitz.open(file_path))
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"PyMuPDF could not open PDF: {e}, using pdfplumber...")
+
+        plumber = None
+        for index in range(start, stop):
+            if doc is not None:
+                try:
+                    text = doc.load_page(index).get_text()
+                except Exception as e:
+                    logger.warning(f"PyMuPDF failed on page {index + 1}: {e}, trying pdfplumber...")
+                else:
+                    yield (index + 1, text, "pymupdf")
+                    continue
+
+            # Fallback to pdfplumber, opened on the first page that needs it
+            if plumber is None:
+                import pdfplumber
+                plumber = stack.enter_context(pdfplumber.open(file_path))
+            page = plumber.pages[index]
+            text = page.extract_text() or ""
+            # Release the page's parsed layout objects
+            page.flush_cache()
+            yield (index + 1, text, "pdfplumber")
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[PageText]:
+    """
+    Extract pages [start, stop) (0-based); the task run by pool workers.
+
+    Args:
+        file_path: Path to PDF file
+        start: First page index
+        stop: Page index after the last one
+
+    Returns:
+        Page texts in page order
+    """
+    return list(iter_page_range(file_path, start, stop))
+
+def _submit_range(executor: ProcessPoolExecutor, file_path: str, start: int, stop: int) -> Future:
+    """Submit a range to the pool; a broken pool gives a failed future instead of raising."""
+    try:
+        return executor.submit(extract_page_range, file_path, start, stop)
+    except Exception as e:
+        future: Future = Future()
+        future.set_exception(e)
+        return future
+
+def _recover_page_range(file_path: str, start: int, stop: int) -> Iterator[PageText]:
+    """
+    Extract pages [start, stop) in-process, one page at a time, after their
+    worker failed. Pages that fail again are logged and skipped.
+
+    Args:
+        file_path: Path to PDF file
+        start: First page index
+        stop: Page index after the last one
+
+    Returns:
+        Iterator of the page texts that could be extracted
+    """
+    for index in range(start, stop):
+        try:
+            yield from iter_page_range(file_path, index, index + 1)
+        except Exception as e:
+            logger.error(f"Skipping PDF page {index + 1}, extraction failed: {e}")
+
+def iter_pdf_pages(
+    file_path: str,
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+    parallel_min_pages: Optional[int] = None
+) -> Iterator[PageText]:
+    """
+    Stream the pages of a PDF in page order.
+
+    Args:
+        file_path: Path to PDF file
+        workers: Pool size (default PDF_EXTRACT_WORKERS capped by the CPU
+                 count; 1 extracts in-process)
+        pages_per_task: Pages per worker task (default PDF_PAGES_PER_TASK)
+        parallel_min_pages: Smaller files are extracted in-process
+                            (default PDF_PARALLEL_MIN_PAGES)
+
+    Returns:
+        Iterator of (page number, text, extraction method)
+    """
+    settings = get_settings()
+    workers = max(1, workers) if workers is not None else default_workers()
+    pages_per_task = max(1, pages_per_task or settings.PDF_PAGES_PER_TASK)
+    if parallel_min_pages is None:
+        parallel_min_pages = settings.PDF_PARALLEL_MIN_PAGES
+
+    total = count_pages(file_path)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+
+    if workers <= 1 or total < parallel_min_pages:
+        yield from iter_page_range(file_path, 0, total)
+        return
+
+    logger.info(f"Extracting {total} PDF pages in {len(ranges)} ranges over {workers} processes")
+    executor = get_pdf_executor(workers)
+    # At most two ranges per worker in flight: workers stay busy, memory stays bounded
+    window = workers * 2
+    pending: Deque[Tuple[int, int, Future]] = deque()
+    next_range = 0
+    try:
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < window:
+                start, stop = ranges[next_range]
+                pending.append((start, stop, _submit_range(executor, file_path, start, stop)))
+                next_range += 1
+            start, stop, future = pending.popleft()
+            try:
+                pages = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_pdf_executor(workers, executor)
+                logger.warning(f"PDF pages {start + 1}-{stop} failed in a worker: {e}, extracting in-process...")
+                yield from _recover_page_range(file_path, start, stop)
+            else:
+                yield from pages
+    finally:
+        # Consumer stopped early: drop the queued ranges
+        for _, _, future in pending:
+            future.cancel()
@@ -1,11 +1,51 @@
-from underthesea import word_tokenize, pos_tag, text_normalize
+from underthesea import pos_tag, text_normalize
 import re
-from typing import Optional, List
+from typing import Optional, List, Iterable, Dict, Any
 import logging
 
+from core.utils.cache import LRUCache
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Runs of punctuation and whitespace, replaced by a single space in one pass
+_SEPARATORS = re.compile(r'\W+')
+
+def _compile_substring_matcher(patterns: Iterable[str]) -> "re.Pattern":
+    """
+    Compile literals into one regex that finds whether any of them occurs.
+    Literals containing a shorter literal are dropped (the shorter one always
+    matches first), and the rest are merged into a character trie so the
+    regex engine walks shared prefixes once.
+    
+    Args:
+        patterns: Literal strings
+        
+    Returns:
+        Compiled pattern for use with .search()
+    """
+    literals = sorted(set(patterns), key=len)
+    minimal: List[str] = []
+    for literal in literals:
+        if not any(shorter in literal for shorter in minimal):
+            minimal.append(literal)
+    
+    trie: Dict[str, Any] = {}
+    for literal in minimal:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    
+    def emit(node: Dict[str, Any]) -> str:
+        # No literal is a prefix of another, so a node is either an end or a branch
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    
+    return re.compile(emit(trie))
+
 class QueryProcessor:
     """
     A class to preprocess and clean user queries before sending to the RAG system.
@@ -38,6 +78,12 @@ class QueryProcessor:
     # Maximum query length
     MAX_QUERY_LENGTH = 1000
     
+    # Finds any domain keyword inside a token in one scan
+    _DOMAIN_MATCHER = _compile_substring_matcher(DOMAIN_KEYWORDS)
+    
+    # Processed queries by raw query (students ask the same questions repeatedly)
+    _memo = LRUCache(max_size=4096, name="processed_queries")
+    
     @staticmethod
     def normalize_vietnamese(text: str) -> str:
         """Normalize Vietnamese text using underthesea."""
@@ -49,23 +95,17 @@ class QueryProcessor:
     
     @staticmethod
     def extract_keywords(text: str) -> List[str]:
-        """Extract important keywords from text."""
+        """Extract important keywords from text (one POS tagging pass)."""
         try:
-            # Tokenize and POS tag
-            tokens = word_tokenize(text)
-            pos_tags = pos_tag(text)
-            
             keywords = []
-            for word, pos in pos_tags:
-                # Keep domain keywords regardless of POS
-                is_domain_keyword = any(keyword in word.lower() for keyword in QueryProcessor.DOMAIN_KEYWORDS)
-                
-                # Keep words based on POS or domain relevance
-                if (is_domain_keyword or 
-                    pos.startswith('N') or  # Nouns
-                    pos.startswith('V') or  # Verbs
-                    pos.startswith('A') or  # Adjectives
-                    (word.lower() not in QueryProcessor.STOP_WORDS and len(word) > 1)):
+            for word, pos in pos_tag(text):
+                # Keep words based on POS, stop word status or domain relevance
+                if pos[:1] in ('N', 'V', 'A', 'M'):  # Nouns, verbs, adjectives, numerals
+                    keywords.append(word)
+                    continue
+                lowered = word.lower()
+                if ((lowered not in QueryProcessor.STOP_WORDS and len(word) > 1) or
+                    QueryProcessor._DOMAIN_MATCHER.search(lowered)):
                     keywords.append(word)
             
             return keywords
@@ -82,6 +122,7 @@ class QueryProcessor:
         3. Remove special characters and extra spaces
         4. Extract and preserve important keywords
         5. Remove stop words while preserving domain-specific keywords
+        Results are memoized per raw query.
         """
         try:
             if not query or not query.strip():
@@ -92,26 +133,22 @@ class QueryProcessor:
                 query = query[:QueryProcessor.MAX_QUERY_LENGTH]
                 logger.warning(f"Query truncated to {QueryProcessor.MAX_QUERY_LENGTH} characters")
             
+            cached = QueryProcessor._memo.get(query)
+            if cached is not None:
+                return cached
+            raw_query = query
+            
             # Normalize Vietnamese text
             query = QueryProcessor.normalize_vietnamese(query)
             
-            # Remove special characters and extra spaces
-            query = re.sub(r'[^\w\s]', ' ', query)
-            query = re.sub(r'\s+', ' ', query).strip()
-            
-            # Convert to lowercase
-            query = query.lower()
+            # Remove special characters and extra spaces, lowercase
+            query = _SEPARATORS.sub(' ', query).strip().lower()
             
-            # Extract keywords
+            # Extract keywords; if none are found, use the normalized query
             keywords = QueryProcessor.extract_keywords(query)
+            processed_query = ' '.join(keywords) if keywords else query
             
-            if not keywords:
-                # If no keywords found, return normalized original query
-                return query
-            
-            # Join keywords back into query
-            processed_query = ' '.join(keywords)
-            
+            QueryProcessor._memo.set(raw_query, processed_query)
             logger.debug(f"Processed query: {processed_query}")
             return processed_query
             
@@ -119,6 +156,11 @@ class QueryProcessor:
             logger.error(f"Error processing query: {str(e)}")
             return query  # Return original query if processing fails
     
+    @staticmethod
+    def get_memo_stats() -> Dict[str, Any]:
+        """Get hit/miss counters of the processed query memo."""
+        return QueryProcessor._memo.stats()
+    
     @staticmethod
     def extract_metadata_filters(query: str) -> Optional[dict]:
         """Extract metadata filters from query if present."""
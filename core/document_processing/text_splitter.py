@@ -1,9 +1,17 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Tuple
+
+# Segment metadata that gets an "<key>_end" field when a chunk spans several values
+RANGE_KEYS = ("page", "paragraph", "row")
 
 class TextSplitter:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, buffer_chunks: int = 8):
+        # Imported here: langchain is only needed by workers that ingest files
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # Segments are buffered up to this many chunks' worth of text before splitting
+        self.buffer_chunks = buffer_chunks
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap
@@ -13,4 +21,78 @@ class TextSplitter:
         """Split text into chunks using the configured splitter."""
         if not text:
             return []
-        return self.text_splitter.split_text(text) 
\ No newline at end of file
+        return self.text_splitter.split_text(text)
+
+    def split_segments(
+        self,
+        segments: Iterable[Dict[str, Any]],
+        separator: str = "\n\n"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Split a stream of extracted segments into chunks, incrementally.
+        Segments are joined into a bounded buffer that is split whenever it
+        holds buffer_chunks chunks' worth of text; the last (possibly partial)
+        chunk is carried over so chunks and overlaps match splitting the
+        whole text at once, up to buffer boundaries.
+        
+        Args:
+            segments: {"text", "metadata"} in document order
+            separator: Text placed between segments
+            
+        Returns:
+            Iterator of {"text", "metadata"}; metadata is the first covered
+            segment's, plus "<key>_end" when a chunk spans several pages,
+            paragraphs or rows
+        """
+        buffer = ""
+        spans: List[Tuple[int, int, Dict[str, Any]]] = []  # (start, end, metadata) in buffer
+        flush_size = self.chunk_size * self.buffer_chunks
+        
+        for segment in segments:
+            if buffer:
+                buffer += separator
+            spans.append((len(buffer), len(buffer) + len(segment["text"]), segment["metadata"]))
+            buffer += segment["text"]
+            if len(buffer) >= flush_size:
+                carry = yield from self._emit_chunks(buffer, spans, final=False)
+                buffer = buffer[carry:]
+                spans = [(max(s - carry, 0), e - carry, m) for s, e, m in spans if e > carry]
+        
+        if buffer:
+            yield from self._emit_chunks(buffer, spans, final=True)
+
+    def _emit_chunks(
+        self,
+        buffer: str,
+        spans: List[Tuple[int, int, Dict[str, Any]]],
+        final: bool
+    ) -> Generator[Dict[str, Any], None, int]:
+        """
+        Yield the chunks of the buffer with their segment metadata.
+        
+        Args:
+            buffer: Joined segment texts
+            spans: (start, end, metadata) of each segment in the buffer
+            final: Emit every chunk; otherwise the last one is held back
+            
+        Returns:
+            Offset where the held back text starts (len(buffer) if final)
+        """
+        chunks = self.split_text(buffer)
+        cursor = 0
+        for i, chunk in enumerate(chunks):
+            start = buffer.find(chunk, cursor)
+            if start < 0:
+                start = cursor
+            if not final and i == len(chunks) - 1:
+                # Re-split with the text that follows, overlap included
+                return start
+            end = start + len(chunk)
+            cursor = start + 1
+            covered = [m for s, e, m in spans if s < end and e > start] or [spans[-1][2]]
+            metadata = dict(covered[0])
+            for key in RANGE_KEYS:
+                if key in metadata and covered[-1].get(key) != metadata[key]:
+                    metadata[f"{key}_end"] = covered[-1][key]
+            yield {"text": chunk, "metadata": metadata}
+        return len(buffer)
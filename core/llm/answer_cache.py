@@ -0,0 +1,331 @@
+"""
+Answer Cache - Reuses LLM answers for repeated questions over the same chunks.
+Two tiers: an in-memory LRU and a persistent JSON file per entry on disk.
+The disk tier is bounded by an entry count (least recently used files are
+evicted) and swept for expired entries on startup and periodically.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from core.utils.cache import LRUCache
+from core.utils.semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# Request context fields written into the prompt, so part of the cache key
+COURSE_CONTEXT_FIELDS = ("course_title", "course_code", "course_description")
+
+# Longest interval between two sweeps of expired disk entries
+DISK_SWEEP_INTERVAL_SECONDS = 3600.0
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a question for cache lookups: Unicode NFC, lowercase,
+    punctuation removed and whitespace collapsed.
+
+    Args:
+        query: Raw user question
+
+    Returns:
+        Normalized question
+    """
+    query = unicodedata.normalize("NFC", query).lower()
+    return _NON_WORD.sub(" ", query).strip()
+
+def temperature_bucket(temperature: float) -> str:
+    """Round temperature to one decimal so near-identical settings share entries."""
+    return f"{round(temperature, 1):.1f}"
+
+def passage_id(document: Dict[str, Any]) -> Optional[str]:
+    """
+    Identify a context passage by its chunk IDs and its text. Stitched
+    passages keep the ID of their first chunk, so the IDs of every merged
+    chunk and a digest of the text are included: a different merge, or a
+    re-ingested chunk with new text, gives a different ID.
+
+    Args:
+        document: Formatted document ({"text", "metadata"})
+
+    Returns:
+        Passage ID, or None if the chunk has no document_id
+    """
+    metadata = document.get("metadata", {})
+    chunk_id = metadata.get("document_id")
+    if not chunk_id:
+        return None
+    merged = metadata.get("merged_document_ids") or [chunk_id]
+    digest = hashlib.sha256(document.get("text", "").encode("utf-8")).hexdigest()[:16]
+    return f"{'+'.join(merged)}#{digest}"
+
+class AnswerCache:
+    """
+    Two-tier answer cache keyed on (normalized query, sorted passage IDs,
+    model, temperature bucket, max_tokens, course context), with an optional semantic layer that
+    matches paraphrased questions over the same chunks.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_seconds: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        disk_max_entries: int = 10000
+    ):
+        """
+        Initialize the answer cache. Existing disk entries are indexed, and
+        expired or surplus ones removed.
+
+        Args:
+            max_size: Maximum entries kept in memory (0 disables the cache)
+            ttl_seconds: Entry lifetime for both tiers (None means no expiry)
+            cache_dir: Directory for the disk tier (None disables it)
+            semantic_cache: Optional paraphrase-tolerant layer (in memory only)
+            disk_max_entries: Maximum files in the disk tier, least recently
+                              used ones are evicted first
+        """
+        self.memory = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds, name="answer_cache")
+        self.semantic = semantic_cache if max_size > 0 else None
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir if max_size > 0 else None
+        self.disk_max_entries = max(1, disk_max_entries)
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.disk_expired = 0
+        # Disk entry key -> creation time, least recently used first
+        self._disk_index: "OrderedDict[str, float]" = OrderedDict()
+        self._disk_lock = threading.Lock()
+        self._last_sweep = time.time()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+            logger.info(f"Answer cache disk tier at: {self.cache_dir} ({len(self._disk_index)} entries)")
+
+    @staticmethod
+    def make_key(
+        query: str,
+        passage_ids: List[str],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build the cache key.
+
+        Args:
+            query: User's question
+            passage_ids: passage_id() of each retrieved passage used as context
+            model: LLM model name
+            temperature: LLM temperature
+            max_tokens: Answer length limit (a shorter limit may truncate the answer)
+            context: Request context; its COURSE_CONTEXT_FIELDS are in the prompt
+
+        Returns:
+            Hex digest identifying the entry
+        """
+        course = [str((context or {}).get(field, "")) for field in COURSE_CONTEXT_FIELDS]
+        payload = json.dumps(
+            [normalize_query(query), sorted(passage_ids), model, temperature_bucket(temperature), max_tokens, course],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_scope(
+        passage_ids: List[str],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build the semantic scope: everything in the key except the query.
+
+        Args:
+            passage_ids: passage_id() of each retrieved passage used as context
+            model: LLM model name
+            temperature: LLM temperature
+            max_tokens: Answer length limit
+            context: Request context (course fields)
+
+        Returns:
+            Hex digest identifying the scope
+        """
+        return AnswerCache.make_key("", passage_ids, model, temperature, max_tokens, context)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir or "", f"{key}.json")
+
+    def _remove_entry(self, key: str) -> None:
+        """Delete an entry file (caller holds the disk lock)."""
+        self._disk_index.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _scan_disk(self) -> None:
+        """
+        Index the disk tier by file modification time, removing leftover
+        temporary files, expired entries and the oldest entries over the limit.
+        """
+        now = time.time()
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for item in it:
+                if item.name.endswith(".tmp"):
+                    try:
+                        os.remove(item.path)
+                    except OSError:
+                        pass
+                elif item.name.endswith(".json"):
+                    entries.append((item.stat().st_mtime, item.name[:-len(".json")]))
+        with self._disk_lock:
+            for mtime, key in sorted(entries):
+                self._disk_index[key] = mtime
+            self._sweep_expired(now)
+            self._evict_over_limit()
+
+    def _sweep_expired(self, now: float) -> None:
+        """Remove expired disk entries (caller holds the disk lock)."""
+        self._last_sweep = now
+        if not self.ttl_seconds:
+            return
+        expired = [key for key, created_at in self._disk_index.items() if now - created_at > self.ttl_seconds]
+        for key in expired:
+            self._remove_entry(key)
+        self.disk_expired += len(expired)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired answer cache entries from disk")
+
+    def _evict_over_limit(self) -> None:
+        """Remove least recently used disk entries over the limit (caller holds the disk lock)."""
+        while len(self._disk_index) > self.disk_max_entries:
+            key = next(iter(self._disk_index))
+            self._remove_entry(key)
+            self.disk_evictions += 1
+
+    def get(self, key: str, query: Optional[str] = None, scope: Optional[str] = None) -> Optional[str]:
+        """
+        Look up an answer in memory, then on disk, then in the semantic layer.
+        Disk hits are promoted to the memory tier.
+
+        Args:
+            key: Key from make_key()
+            query: Question text, needed for semantic lookups
+            scope: Scope from make_scope(), needed for semantic lookups
+
+        Returns:
+            Cached answer or None
+        """
+        answer = self.memory.get(key)
+        if answer is None and self.cache_dir:
+            answer = self._get_from_disk(key)
+        if answer is None and self.semantic and query is not None:
+            similar = self.semantic.get(normalize_query(query), scope=scope)
+            if similar is not None:
+                answer, matched_query, similarity = similar
+                logger.info(f"Semantic answer cache hit ({similarity:.3f}) via: {matched_query[:50]}")
+        return answer
+
+    def _get_from_disk(self, key: str) -> Optional[str]:
+        """Read an entry from the disk tier, dropping it if expired."""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable answer cache entry {path}: {e}")
+            return None
+
+        created_at = entry.get("created_at", 0)
+        with self._disk_lock:
+            if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+                self._remove_entry(key)
+                self.disk_expired += 1
+                return None
+            # Entries written by another process are indexed on first read
+            self._disk_index[key] = created_at
+            self._disk_index.move_to_end(key)
+
+        self.disk_hits += 1
+        self.memory.set(key, entry["answer"])
+        return entry["answer"]
+
+    def set(
+        self,
+        key: str,
+        answer: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        query: Optional[str] = None,
+        scope: Optional[str] = None
+    ) -> None:
+        """
+        Store an answer in both tiers (and the semantic layer if enabled).
+
+        Args:
+            key: Key from make_key()
+            answer: LLM answer text
+            metadata: Extra fields saved with the disk entry (e.g. query, model)
+            query: Question text, needed for the semantic layer
+            scope: Scope from make_scope(), needed for the semantic layer
+        """
+        if not self.memory.enabled:
+            return
+        self.memory.set(key, answer)
+        if self.semantic and query is not None:
+            self.semantic.set(normalize_query(query), answer, scope=scope)
+        if not self.cache_dir:
+            return
+
+        now = time.time()
+        entry = {"answer": answer, "created_at": now, **(metadata or {})}
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write answer cache entry {path}: {e}")
+            return
+
+        with self._disk_lock:
+            self._disk_index[key] = now
+            self._disk_index.move_to_end(key)
+            self._evict_over_limit()
+            sweep_interval = min(self.ttl_seconds or DISK_SWEEP_INTERVAL_SECONDS, DISK_SWEEP_INTERVAL_SECONDS)
+            if now - self._last_sweep > sweep_interval:
+                self._sweep_expired(now)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Memory tier statistics plus disk tier counters
+        """
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_dir"] = self.cache_dir
+        stats["disk_entries"] = len(self._disk_index)
+        stats["disk_max_entries"] = self.disk_max_entries
+        stats["disk_evictions"] = self.disk_evictions
+        stats["disk_expired"] = self.disk_expired
+        stats["semantic"] = self.semantic.stats() if self.semantic else None
+        return stats
@@ -68,8 +68,54 @@ class Settings(BaseSettings):
     PINECONE_DENSE_INDEX: str = f"{CollectionConfig.STORAGE_NAME}-dense"
     PINECONE_SPARSE_INDEX: str = f"{CollectionConfig.STORAGE_NAME}-sparse"
     
+    # Vector store backend: "pinecone" (hosted) or "local" (in-process NumPy)
+    VECTOR_STORE_BACKEND: str = "pinecone"
+    LOCAL_STORE_DIR: str = "data/vector_store"  # Persistence directory for the local store
+    LOCAL_STORE_DIM: int = 1024  # Hashed vector dimension of the local store
+    
+    # Lexical search: "pinecone" (hosted sparse index) or "bm25" (local Vietnamese BM25)
+    SPARSE_BACKEND: str = "pinecone"
+    BM25_INDEX_DIR: str = "data/bm25"  # Persistence directory for the BM25 log, shared by all API workers (each replays the others' writes before searching)
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    
+    # Retrieval settings
+    SEARCH_TIMEOUT_SECONDS: float = 10.0  # Per-index timeout for hybrid search, also the Pinecone HTTP request timeout
+    SEARCH_MAX_WORKERS: int = 8  # Threads shared by concurrent dense/sparse searches
+    BLOCKING_POOL_SIZE: int = 32  # Threads for blocking calls made from async routes
+    RETRIEVAL_CACHE_SIZE: int = 512  # Cached retrieval results (0 disables the cache)
+    RETRIEVAL_CACHE_TTL_SECONDS: float = 600.0
+    SEMANTIC_CACHE_SIZE: int = 0  # Entries in the paraphrase-tolerant cache (0 disables it)
+    SEMANTIC_CACHE_THRESHOLD: float = 0.75  # Minimum cosine similarity of hashed n-gram vectors (plus same numbers and content words)
+    FUSION_STRATEGY: str = "rrf"  # Dense/sparse fusion: "rrf", "weighted" (min-max) or "max" (raw scores)
+    FUSION_DENSE_WEIGHT: float = 0.5  # Dense share of the fused score, sparse gets the rest
+    FUSION_RRF_K: int = 60
+    ADAPTIVE_RERANK: bool = True  # Skip or shrink reranking when the fused ranking is confident
+    RERANK_MAX_CANDIDATES: int = 8  # Fused candidates sent to the reranker
+    RERANK_SKIP_OVERLAP: float = 0.75  # Share of top_n both indexes agree on that skips reranking
+    RERANK_SKIP_MARGIN: float = 0.4  # Relative top-1 vs top-2 fused score gap that skips reranking
+    RERANK_CACHE_SIZE: int = 1024  # Queries whose rerank scores are cached (0 disables the cache)
+    RERANK_CACHE_TTL_SECONDS: float = 3600.0
+    RERANK_LEAN_PAYLOAD: bool = True  # Send only ID + capped chunk text to the reranker
+    RERANK_MAX_DOC_TOKENS: int = 512  # Estimated token cap per chunk in lean rerank payloads
+    RERANK_BREAKER_FAILURE_RATE: float = 0.5  # Failure ratio over the window that opens the breaker
+    RERANK_BREAKER_WINDOW: int = 20  # Recent hosted rerank calls considered
+    RERANK_BREAKER_MIN_CALLS: int = 5
+    RERANK_BREAKER_SLOW_SECONDS: float = 3.0  # Slower hosted rerank calls count as failures
+    RERANK_BREAKER_OPEN_SECONDS: float = 30.0  # Cool-down before probing the hosted reranker again
+    RERANK_BREAKER_RECOVERY_PROBES: int = 2  # Successful probes needed to close the breaker
+    MMR_ENABLED: bool = False  # Diversify final chunks with maximal marginal relevance
+    MMR_LAMBDA: float = 0.7  # Relevance weight (1.0 keeps the rerank order)
+    MMR_POOL_SIZE: int = 10  # Ranked candidates MMR chooses top_n from
+    MMR_DUPLICATE_THRESHOLD: float = 0.85  # Shingle similarity at which a chunk counts as a duplicate
+    STITCH_ADJACENT_CHUNKS: bool = True  # Merge retrieved neighbouring chunks and drop their shared overlap
+    
     # File upload settings
     UPLOAD_DIR: str = "data/uploads"
+    INGEST_BATCH_SIZE: int = 96  # Chunks upserted per batch while a file is streamed in (Pinecone limit is 96)
+    PDF_EXTRACT_WORKERS: int = 4  # Processes extracting PDF page ranges (capped by CPU count; 1 = in-process)
+    PDF_PAGES_PER_TASK: int = 16  # Pages per worker task
+    PDF_PARALLEL_MIN_PAGES: int = 48  # Smaller PDFs are extracted in-process
     OUTPUT_DIR: str = "data/outputs"
     
     # Database settings (SQLite)
@@ -80,9 +126,23 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = "llama-text-embed-v2"  # For Pinecone integrated inference
     LLM_PROVIDER: str = "qwen"  # Default to Qwen3-Max
     LLM_MODEL: str = "qwen3-max"
+    LLM_MAX_INPUT_TOKENS: int = 6000  # Estimated prompt budget: system message, history, documents and query
+    LLM_MAX_HISTORY_TOKENS: int = 1500  # Share of the budget chat history may use
+    LLM_MIN_DOCUMENT_TOKENS: int = 64  # Smallest truncated document worth sending
+    CONTEXT_COMPRESSION: bool = False  # Keep only query-relevant sentences of each chunk (off until validated on the 100-question set)
+    CONTEXT_COMPRESSION_RATIO: float = 0.5  # Share of a chunk's tokens kept
+    CONTEXT_COMPRESSION_MIN_TOKENS: int = 120  # Smaller chunks are sent whole
+    ANSWER_CACHE_SIZE: int = 256  # Cached answers kept in memory (0 disables the cache)
+    ANSWER_CACHE_TTL_SECONDS: float = 86400.0
+    ANSWER_CACHE_DIR: str = "data/cache/answers"  # Persistent tier, empty string disables it
+    ANSWER_CACHE_DISK_MAX_ENTRIES: int = 10000  # Files kept in the persistent tier, least recently used evicted first
+    SEMANTIC_CACHE_REUSE_ANSWERS: bool = False  # Reuse answers of similar questions over the same chunks
     
     # Application settings
     DEBUG: bool = False
+    SERVER_TIMING_HEADER: bool = True  # Send per-stage durations in the Server-Timing header of /api/query/rag
+    WARMUP_ON_STARTUP: bool = True  # Build services and load models at startup; /api/health is 503 until done
+    WARMUP_CONNECTIONS: bool = True  # Also open Pinecone and LLM connections during warmup (network calls)
     VERBOSE: bool = False
     SECRET_KEY: str = Field(default="")
     ALGORITHM: str = "HS256"
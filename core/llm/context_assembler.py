@@ -0,0 +1,141 @@
+"""
+Context Assembler - Fits chat history and retrieved documents into an
+explicit prompt token budget.
+The fixed part of the prompt (system message, instructions, query) is
+counted first. Recent history turns are then added newest first, each
+exactly once, up to their own cap. The remaining budget is packed with
+documents in score order, truncating the document at the boundary.
+"""
+
+import logging
+from typing import List, Dict, Any
+
+from core.utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Estimated tokens of the per-document header ("Document i (Source: ..., Type: ...):")
+DOCUMENT_OVERHEAD_TOKENS = 20
+
+# Estimated tokens of the role framing around each chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+class ContextAssembler:
+    """
+    Budgeted selection of history turns and documents for one LLM request.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: int = 6000,
+        max_history_tokens: int = 1500,
+        min_document_tokens: int = 64
+    ):
+        """
+        Initialize the assembler.
+
+        Args:
+            max_input_tokens: Token budget for the whole request (system message, history and prompt)
+            max_history_tokens: Cap on tokens spent on chat history
+            min_document_tokens: Smallest useful slice when truncating the boundary document
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_history_tokens = max_history_tokens
+        self.min_document_tokens = min_document_tokens
+
+    @staticmethod
+    def document_score(document: Dict[str, Any]) -> float:
+        """Relevance score of a retrieved document (rerank score when present)."""
+        return document.get("rerank_score", document.get("score", 0.0))
+
+    def select_history(self, chat_history: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """
+        Keep the most recent contiguous turns that fit the budget.
+
+        Args:
+            chat_history: Messages as {"role", "content"}, oldest first
+            budget: Tokens available for history
+
+        Returns:
+            Selected messages, oldest first
+        """
+        selected: List[Dict[str, Any]] = []
+        used = 0
+        for msg in reversed(chat_history):
+            cost = estimate_tokens(msg.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                break
+            selected.append({"role": msg["role"], "content": msg["content"]})
+            used += cost
+        selected.reverse()
+        return selected
+
+    def pack_documents(self, documents: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """
+        Pack documents by descending score until the budget is reached.
+        The first document that does not fit is truncated if the remaining
+        budget is still worth using; later documents are dropped.
+
+        Args:
+            documents: Retrieved documents with "text" and a score
+            budget: Tokens available for documents
+
+        Returns:
+            Packed documents, best first (a truncated one carries "truncated": True)
+        """
+        packed: List[Dict[str, Any]] = []
+        remaining = budget
+        for doc in sorted(documents, key=self.document_score, reverse=True):
+            cost = estimate_tokens(doc["text"]) + DOCUMENT_OVERHEAD_TOKENS
+            if cost <= remaining:
+                packed.append(doc)
+                remaining -= cost
+                continue
+            text_budget = remaining - DOCUMENT_OVERHEAD_TOKENS
+            if text_budget >= self.min_document_tokens:
+                packed.append({**doc, "text": truncate_to_tokens(doc["text"], text_budget), "truncated": True})
+            break
+        return packed
+
+    def assemble(
+        self,
+        documents: List[Dict[str, Any]],
+        chat_history: List[Dict[str, Any]],
+        fixed_tokens: int
+    ) -> Dict[str, Any]:
+        """
+        Select history and documents for one request.
+
+        Args:
+            documents: Retrieved documents
+            chat_history: Conversation so far, oldest first
+            fixed_tokens: Tokens of the parts always sent (system message, instructions, query)
+
+        Returns:
+            Dictionary with "history" (messages), "documents" (packed documents)
+            and "stats" (token accounting)
+        """
+        available = max(0, self.max_input_tokens - fixed_tokens)
+        history = self.select_history(chat_history, min(self.max_history_tokens, available))
+        history_tokens = sum(estimate_tokens(msg["content"]) + MESSAGE_OVERHEAD_TOKENS for msg in history)
+
+        packed = self.pack_documents(documents, available - history_tokens)
+        document_tokens = sum(estimate_tokens(doc["text"]) + DOCUMENT_OVERHEAD_TOKENS for doc in packed)
+
+        stats = {
+            "budget": self.max_input_tokens,
+            "fixed_tokens": fixed_tokens,
+            "history_tokens": history_tokens,
+            "history_turns": len(history),
+            "history_turns_dropped": len(chat_history) - len(history),
+            "document_tokens": document_tokens,
+            "documents": len(packed),
+            "documents_dropped": len(documents) - len(packed),
+            "documents_truncated": sum(1 for doc in packed if doc.get("truncated")),
+            "input_tokens": fixed_tokens + history_tokens + document_tokens
+        }
+        logger.info(
+            f"Assembled context: {stats['input_tokens']}/{self.max_input_tokens} tokens, "
+            f"{len(packed)}/{len(documents)} documents, {len(history)}/{len(chat_history)} history turns"
+        )
+        return {"history": history, "documents": packed, "stats": stats}
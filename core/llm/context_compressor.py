@@ -0,0 +1,184 @@
+"""
+Context Compressor - Extractive compression of retrieved chunks before generation.
+A ~1000 character chunk usually answers the question with one or two
+sentences. Each chunk is split into sentences (underthesea, which knows
+Vietnamese abbreviations such as "TS." or "Th.S."), sentences are scored
+against the query, and only the best ones plus their neighbours are kept,
+in document order, within a per-chunk token budget.
+
+Scoring is local and cheap: overlap of query syllables and syllable
+bigrams (a stand-in for Vietnamese compound words) plus the cosine of
+character n-gram sets.
+"""
+
+import logging
+import re
+from typing import List, Dict, Any, Set, Tuple
+
+import numpy as np
+from underthesea import sent_tokenize
+
+from core.document_processing.query_processor import QueryProcessor
+from core.utils.text_vectors import HashedNgramVectorizer
+from core.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Line breaks and list markers end a sentence even without punctuation
+_LINE_BREAK = re.compile(r"\s*\n+\s*|\s+(?=[-•+]\s)")
+
+# Marks text removed between two kept spans
+GAP_MARKER = " … "
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a chunk into sentences.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Non-empty sentences in document order
+    """
+    sentences = []
+    for line in _LINE_BREAK.split(text):
+        if line.strip():
+            sentences.extend(s.strip() for s in sent_tokenize(line) if s.strip())
+    return sentences
+
+def _terms(text: str) -> Tuple[Set[str], Set[str]]:
+    """Content syllables and syllable bigrams of a text."""
+    syllables = HashedNgramVectorizer.normalize(text).split()
+    unigrams = {s for s in syllables if s not in QueryProcessor.STOP_WORDS}
+    bigrams = {f"{a} {b}" for a, b in zip(syllables, syllables[1:])}
+    return unigrams, bigrams
+
+class ContextCompressor:
+    """
+    Keeps the query-relevant sentences of each retrieved chunk.
+    """
+
+    def __init__(
+        self,
+        target_ratio: float = 0.5,
+        min_tokens: int = 120,
+        neighbours: int = 1,
+        lexical_weight: float = 0.6
+    ):
+        """
+        Initialize the compressor.
+
+        Args:
+            target_ratio: Share of a chunk's tokens to keep (0-1)
+            min_tokens: Chunks at or below this size are left as is, and no
+                        chunk is cut below it
+            neighbours: Sentences kept on each side of a selected sentence
+            lexical_weight: Weight of term overlap vs. n-gram similarity in the score
+        """
+        self.target_ratio = target_ratio
+        self.min_tokens = min_tokens
+        self.neighbours = neighbours
+        self.lexical_weight = lexical_weight
+        self.vectorizer = HashedNgramVectorizer()
+
+    def score_sentences(self, query: str, sentences: List[str]) -> np.ndarray:
+        """
+        Score sentences against the query.
+
+        Args:
+            query: User's question
+            sentences: Candidate sentences
+
+        Returns:
+            Scores between 0 and 1, one per sentence
+        """
+        query_unigrams, query_bigrams = _terms(query)
+        query_terms = len(query_unigrams) + len(query_bigrams)
+        lexical = np.zeros(len(sentences), dtype=np.float32)
+        if query_terms:
+            for i, sentence in enumerate(sentences):
+                unigrams, bigrams = _terms(sentence)
+                lexical[i] = (len(query_unigrams & unigrams) + len(query_bigrams & bigrams)) / query_terms
+
+        # Set cosine over character n-grams: cheaper than hashing dense vectors
+        query_ngrams = set(self.vectorizer.features(query))
+        similarity = np.zeros(len(sentences), dtype=np.float32)
+        if query_ngrams:
+            for i, sentence in enumerate(sentences):
+                ngrams = set(self.vectorizer.features(sentence))
+                if ngrams:
+                    similarity[i] = len(query_ngrams & ngrams) / np.sqrt(len(query_ngrams) * len(ngrams))
+        return self.lexical_weight * lexical + (1.0 - self.lexical_weight) * similarity
+
+    def compress_text(self, query: str, text: str) -> str:
+        """
+        Compress one chunk.
+
+        Args:
+            query: User's question
+            text: Chunk text
+
+        Returns:
+            Kept sentences in document order, gaps marked with GAP_MARKER
+        """
+        total = estimate_tokens(text)
+        if total <= self.min_tokens:
+            return text
+        sentences = split_sentences(text)
+        if len(sentences) <= 1:
+            return text
+
+        budget = max(self.min_tokens, int(total * self.target_ratio))
+        costs = [estimate_tokens(sentence) for sentence in sentences]
+        scores = self.score_sentences(query, sentences)
+
+        kept: Set[int] = set()
+        used = 0
+        for best in np.argsort(-scores, kind="stable"):
+            # A sentence is taken with its neighbours, or not at all
+            span = range(max(0, best - self.neighbours), min(len(sentences), best + self.neighbours + 1))
+            cost = sum(costs[i] for i in span if i not in kept)
+            if kept and used + cost > budget:
+                continue
+            kept.update(span)
+            used += cost
+            if used >= budget:
+                break
+
+        if len(kept) == len(sentences):
+            return text
+        parts = []
+        for i in sorted(kept):
+            if parts and i - 1 not in kept:
+                parts.append(GAP_MARKER)
+            elif parts:
+                parts.append(" ")
+            parts.append(sentences[i])
+        return "".join(parts)
+
+    def compress(self, query: str, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Compress every document's text.
+
+        Args:
+            query: User's question
+            documents: Retrieved documents ({"text", "score", "metadata"})
+
+        Returns:
+            (copies of the documents with compressed text, token statistics)
+        """
+        compressed = []
+        tokens_before = tokens_after = 0
+        for doc in documents:
+            text = self.compress_text(query, doc["text"])
+            tokens_before += estimate_tokens(doc["text"])
+            tokens_after += estimate_tokens(text)
+            compressed.append({**doc, "text": text} if text != doc["text"] else doc)
+
+        stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "reduction": round(1 - tokens_after / tokens_before, 4) if tokens_before else 0.0
+        }
+        logger.info(f"Compressed context from {tokens_before} to {tokens_after} tokens")
+        return compressed, stats
@@ -1,15 +1,33 @@
-from typing import Optional, Dict, List, Any, cast
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple, cast
 import logging
 import json
+import time
 import requests
 import os
 import base64
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from requests.exceptions import RequestException
 
+from core.llm.answer_cache import AnswerCache, passage_id
+from core.llm.context_assembler import ContextAssembler
+from core.llm.context_compressor import ContextCompressor
+from core.utils.tokens import estimate_tokens
+from core.utils.metrics import STAGE_LATENCY, track_stage, record_cache
+from core.utils.concurrency import run_blocking
+from core.utils.singleflight import SingleFlight, AsyncSingleFlight
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# DashScope OpenAI-compatible endpoint for Qwen models
+QWEN_BASE_URL = "https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
+
+# System message sent with every RAG request
+SYSTEM_MESSAGE = "Bạn là một trợ lý AI thông minh, nhiệm vụ của bạn là trả lời câu hỏi dựa trên các tài liệu được cung cấp một cách chính xác và đầy đủ. Luôn trả lời bằng tiếng Việt."
+
+# Answer returned when generation fails
+FALLBACK_ANSWER = "Xin lỗi, tôi không thể tạo câu trả lời lúc này. Vui lòng thử lại sau."
+
 def create_llm_provider(provider_name: str, api_key: str):
     """Create a provider configuration dictionary"""
     return {"provider": provider_name, "api_key": api_key}
@@ -20,35 +38,55 @@ class RAGPromptManager:
     Supports OpenAI, Deepseek, and Grok APIs.
     """
     
-    def __init__(self, provider: dict):
+    def __init__(
+        self,
+        provider: dict,
+        answer_cache: Optional[AnswerCache] = None,
+        context_assembler: Optional[ContextAssembler] = None,
+        context_compressor: Optional[ContextCompressor] = None
+    ):
         """
         Initialize with a provider configuration.
         
         Args:
             provider: Dictionary with provider details (provider name and API key)
+            answer_cache: Optional cache for answers to repeated questions
+            context_assembler: Fits history and documents into the prompt token budget
+            context_compressor: Optional extractive compression of documents before assembly
         """
         self.provider = provider
+        self.answer_cache = answer_cache
+        self.context_assembler = context_assembler or ContextAssembler()
+        self.context_compressor = context_compressor
+        
+        # Coalesce identical concurrent generations (sync and async paths)
+        self._inflight = SingleFlight(name="generation")
+        self._async_inflight = AsyncSingleFlight(name="generation_async")
         self.provider_name = provider["provider"].lower()
         
-        # Initialize client based on provider
+        # Initialize clients based on provider
+        # The async client shares configuration and is used by async routes
         if self.provider_name == "qwen":
             # Qwen3-Max via Alibaba Cloud DashScope
-            self.client = OpenAI(
-                api_key=provider["api_key"],
-                base_url="https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
-            )
+            client_kwargs = {
+                "api_key": provider["api_key"],
+                "base_url": QWEN_BASE_URL
+            }
             logger.info("Initialized Qwen3-Max client")
         elif self.provider_name == "openai":
-            self.client = OpenAI(api_key=provider["api_key"])
+            client_kwargs = {"api_key": provider["api_key"]}
             logger.info("Initialized OpenAI client")
         else:
             # Default to Qwen
             logger.warning(f"Unknown provider {self.provider_name}, defaulting to Qwen3-Max")
-            self.client = OpenAI(
-                api_key=provider["api_key"],
-                base_url="https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
-            )
+            client_kwargs = {
+                "api_key": provider["api_key"],
+                "base_url": QWEN_BASE_URL
+            }
             self.provider_name = "qwen"
+        
+        self.client = OpenAI(**client_kwargs)
+        self.async_client = AsyncOpenAI(**client_kwargs)
 
     def _encode_image(self, image_data: str) -> str:
         """
@@ -215,11 +253,9 @@ class RAGPromptManager:
         Args:
             query: User's question (will be included in the prompt)
             documents: List of retrieved documents with text and metadata
-            context: Optional dictionary containing chat history and course info
+            context: Optional dictionary containing course info (chat history is
+                     sent as separate messages by _build_messages)
         """
-        # Maximum number of chat history messages to include in prompt
-        MAX_HISTORY_IN_PROMPT = 3  # Increased to 5 for complex queries
-
         # --- English Prompt Construction ---
 
         # System Role and Core Instruction
@@ -241,20 +277,6 @@ class RAGPromptManager:
                 prompt += f"\nCourse Description: {context['course_description']}"
             prompt += "\n</course_context>"
 
-        # Add chat history if available, with dynamic limit
-        if context and "chat_history" in context:
-            chat_history = context["chat_history"]
-            if len(chat_history) > 0:
-                prompt += "\n\n<chat_history>"
-                prompt += "\nRecent conversation context:"
-                # Increase history for complex queries (e.g., containing 'explain', 'calculate')
-                max_history = 5 if any(keyword in query.lower() for keyword in ["explain", "calculate", "analyze"]) else MAX_HISTORY_IN_PROMPT
-                recent_history = chat_history[-max_history:]
-                for msg in recent_history:
-                    role = "User" if msg["role"] == "user" else "Assistant"
-                    prompt += f"\n{role}: {msg['content']}"
-                prompt += "\n</chat_history>"
-
         # Context Section (unchanged)
         prompt += "\n\n<context>"
         prompt += "\nBased on the following documents (relevant to education and Vinh University):"
@@ -296,6 +318,200 @@ class RAGPromptManager:
         
         return prompt
 
+    def _build_messages(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Build the chat messages for a RAG request within the token budget.
+        Documents are compressed to their query-relevant sentences (if a
+        compressor is set), history turns are sent once, as chat messages,
+        and documents are packed by score into what the budget leaves.
+        
+        Args:
+            query: User's question
+            documents: List of retrieved documents
+            context: Optional dictionary containing chat history and course info
+            
+        Returns:
+            (list of message dictionaries for the API, token statistics)
+        """
+        chat_history = (context.get("chat_history") or []) if context else []
+        
+        compression = None
+        if self.context_compressor:
+            documents, compression = self.context_compressor.compress(query, documents)
+        
+        # Everything except history and documents is always sent
+        fixed_tokens = estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(self._create_prompt(query, [], context))
+        assembled = self.context_assembler.assemble(documents, chat_history, fixed_tokens)
+        
+        prompt = self._create_prompt(query, assembled["documents"], context)
+        logger.info(f"Created prompt with query: {query}")
+        
+        messages = [
+            {
+                "role": "system",
+                "content": SYSTEM_MESSAGE
+            }
+        ]
+        messages.extend(assembled["history"])
+        
+        # Add current query
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        
+        stats = assembled["stats"]
+        if compression:
+            stats["compression"] = compression
+        return messages, stats
+    
+    def _answer_cache_key(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        image_data: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Get the answer cache (key, semantic scope) for a request, or None if the
+        answer must not be reused (no cache, image input, chat history, or
+        unidentified chunks). The course context and max_tokens shape the
+        answer, so they are part of both.
+        """
+        if not self.answer_cache or image_data:
+            return None
+        if context and context.get("chat_history"):
+            return None
+        
+        # Chunk IDs alone are not enough: stitched passages share their first chunk's ID
+        passage_ids = [passage_id(doc) for doc in documents]
+        if not passage_ids or not all(passage_ids):
+            return None
+        
+        return (
+            AnswerCache.make_key(query, passage_ids, model, temperature, max_tokens, context),
+            AnswerCache.make_scope(passage_ids, model, temperature, max_tokens, context)
+        )
+    
+    def _lookup_answer(self, cache_key: Optional[Tuple[str, str]], query: str) -> Optional[str]:
+        """Look up a cached answer (exact, then semantic)."""
+        if not cache_key or not self.answer_cache:
+            return None
+        key, scope = cache_key
+        answer = self.answer_cache.get(key, query=query, scope=scope)
+        record_cache("answer", "miss" if answer is None else "hit")
+        return answer
+    
+    def _store_answer(
+        self,
+        cache_key: Optional[Tuple[str, str]],
+        query: str,
+        model: str,
+        answer: Optional[str]
+    ) -> None:
+        """Save a successful answer to the answer cache."""
+        if cache_key and self.answer_cache and answer:
+            key, scope = cache_key
+            self.answer_cache.set(
+                key,
+                answer,
+                metadata={"query": query, "model": model},
+                query=query,
+                scope=scope
+            )
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for coalesced LLM calls.
+        
+        Returns:
+            Dictionary with sync and async coalescing statistics
+        """
+        return {
+            "sync": self._inflight.stats(),
+            "async": self._async_inflight.stats()
+        }
+    
+    def format_sources(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Format retrieved documents as sources with enhanced metadata.
+        
+        Args:
+            documents: List of retrieved documents
+            
+        Returns:
+            List of source dictionaries
+        """
+        sources = []
+        for doc in documents:
+            metadata = doc.get("metadata", {})
+            source = {
+                "text": doc["text"],
+                "metadata": metadata,
+                "score": doc.get("rerank_score", doc.get("score", 0.0)),
+                "source": metadata.get("source_collection", metadata.get("collection_name", "unknown")),
+                "document_type": metadata.get("document_type", "unknown")
+            }
+            sources.append(source)
+        return sources
+
+    def _complete(
+        self,
+        cache_key: Optional[Tuple[str, str]],
+        query: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """Call the LLM (blocking client) and cache the answer."""
+        # Call Qwen3-Max API via OpenAI SDK with timeout
+        logger.info(f"Calling Qwen3-Max API with model: {model}")
+        with track_stage("llm"):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=cast(Any, messages),  # Type cast for OpenAI SDK compatibility
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=30  # 30 second timeout
+            )
+        answer = response.choices[0].message.content
+        logger.info("LLM response received successfully")
+        self._store_answer(cache_key, query, model, answer)
+        return answer
+    
+    async def _acomplete(
+        self,
+        cache_key: Optional[Tuple[str, str]],
+        query: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """Call the LLM (async client) and cache the answer."""
+        logger.info(f"Calling Qwen3-Max API with model: {model}")
+        with track_stage("llm"):
+            response = await self.async_client.chat.completions.create(
+                model=model,
+                messages=cast(Any, messages),  # Type cast for OpenAI SDK compatibility
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=30  # 30 second timeout
+            )
+        answer = response.choices[0].message.content
+        logger.info("LLM response received successfully")
+        await run_blocking(self._store_answer, cache_key, query, model, answer)
+        return answer
+    
     def generate_answer(
         self,
         query: str,
@@ -304,7 +520,8 @@ class RAGPromptManager:
         max_tokens: int = 500,
         model: str = "qwen3-max",
         image_data: Optional[str] = None,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        diagnostics: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Generate an answer using Qwen3-Max LLM based on retrieved documents.
@@ -317,6 +534,8 @@ class RAGPromptManager:
             model: Model to use (default: qwen3-max)
             image_data: Optional base64 encoded image data (not supported yet)
             context: Optional dictionary containing chat history and course info
+            diagnostics: Optional dict that receives the prompt token statistics
+                         under "context" when the LLM is called
             
         Returns:
             Dictionary containing the answer and source information
@@ -324,67 +543,160 @@ class RAGPromptManager:
         try:
             logger.info(f"Using Qwen3-Max model: {model}")
             
+            cache_key = self._answer_cache_key(query, documents, model, temperature, max_tokens, image_data, context)
+            cached_answer = self._lookup_answer(cache_key, query)
+            if cached_answer is not None:
+                logger.info("Answer cache hit")
+                return {
+                    "answer": cached_answer,
+                    "sources": self.format_sources(documents)
+                }
+            
             # Handle text-based query
             logger.info("Processing text-based query")
-            prompt = self._create_prompt(query, documents, context)
-            logger.info(f"Created prompt with query: {query}")
-            
-            # Prepare messages for Qwen3-Max
-            messages = [
-                {
-                    "role": "system",
-                    "content": "Bạn là một trợ lý AI thông minh, nhiệm vụ của bạn là trả lời câu hỏi dựa trên các tài liệu được cung cấp một cách chính xác và đầy đủ. Luôn trả lời bằng tiếng Việt."
-                }
-            ]
+            with track_stage("prompt_build"):
+                messages, token_stats = self._build_messages(query, documents, context)
+            if diagnostics is not None:
+                diagnostics["context"] = token_stats
+            llm_args = (cache_key, query, messages, model, temperature, max_tokens)
+            if cache_key:
+                # Identical concurrent questions share one LLM call
+                answer = self._inflight.do(cache_key[0], self._complete, *llm_args)
+            else:
+                answer = self._complete(*llm_args)
             
-            # Add chat history if available
-            if context and "chat_history" in context:
-                for msg in context["chat_history"]:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
+            logger.info("Query processing completed successfully")
+            return {
+                "answer": answer,
+                "sources": self.format_sources(documents)
+            }
             
-            # Add current query
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+        except Exception as e:
+            logger.error(f"Error generating answer with Qwen3-Max: {str(e)}")
+            return {
+                "answer": FALLBACK_ANSWER,
+                "sources": []
+            }
+    
+    async def agenerate_answer(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        temperature: float = 0.1,
+        max_tokens: int = 500,
+        model: str = "qwen3-max",
+        image_data: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        diagnostics: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate_answer() using the AsyncOpenAI client,
+        so a slow completion does not block the event loop.
+        
+        Args:
+            Same as generate_answer()
             
-            # Call Qwen3-Max API via OpenAI SDK with timeout
-            logger.info(f"Calling Qwen3-Max API with model: {model}")
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=cast(Any, messages),  # Type cast for OpenAI SDK compatibility
-                temperature=temperature,
-                max_tokens=max_tokens,
-                timeout=30  # 30 second timeout
-            )
-            answer = response.choices[0].message.content
-            logger.info("LLM response received successfully")
+        Returns:
+            Dictionary containing the answer and source information
+        """
+        try:
+            logger.info(f"Using Qwen3-Max model (async): {model}")
             
-            # Format sources with enhanced metadata
-            sources = []
-            for doc in documents:
-                metadata = doc.get("metadata", {})
-                source = {
-                    "text": doc["text"],
-                    "metadata": metadata,
-                    "score": doc.get("rerank_score", doc.get("score", 0.0)),
-                    "source": metadata.get("source_collection", metadata.get("collection_name", "unknown")),
-                    "document_type": metadata.get("document_type", "unknown")
+            cache_key = self._answer_cache_key(query, documents, model, temperature, max_tokens, image_data, context)
+            cached_answer = await run_blocking(self._lookup_answer, cache_key, query)
+            if cached_answer is not None:
+                logger.info("Answer cache hit")
+                return {
+                    "answer": cached_answer,
+                    "sources": self.format_sources(documents)
                 }
-                sources.append(source)
             
-            logger.info("Query processing completed successfully")
+            # Compression and token counting are CPU work: keep them off the event loop
+            with track_stage("prompt_build"):
+                messages, token_stats = await run_blocking(self._build_messages, query, documents, context)
+            if diagnostics is not None:
+                diagnostics["context"] = token_stats
+            llm_args = (cache_key, query, messages, model, temperature, max_tokens)
+            if cache_key:
+                # Identical concurrent questions share one LLM call
+                answer = await self._async_inflight.do(cache_key[0], self._acomplete, *llm_args)
+            else:
+                answer = await self._acomplete(*llm_args)
+            
             return {
                 "answer": answer,
-                "sources": sources
+                "sources": self.format_sources(documents)
             }
             
         except Exception as e:
             logger.error(f"Error generating answer with Qwen3-Max: {str(e)}")
             return {
-                "answer": "Xin lỗi, tôi không thể tạo câu trả lời lúc này. Vui lòng thử lại sau.",
+                "answer": FALLBACK_ANSWER,
                 "sources": []
-            } 
\ No newline at end of file
+            }
+    
+    async def astream_answer(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        temperature: float = 0.1,
+        max_tokens: int = 500,
+        model: str = "qwen3-max",
+        context: Optional[Dict[str, Any]] = None,
+        diagnostics: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an answer from the LLM token by token (stream=True).
+        A cached answer is yielded as a single chunk. Errors are raised to
+        the caller, which decides how to report them.
+        
+        Args:
+            query: User's question
+            documents: List of retrieved documents
+            temperature: LLM temperature parameter
+            max_tokens: Maximum tokens in response
+            model: Model to use (default: qwen3-max)
+            context: Optional dictionary containing chat history and course info
+            diagnostics: Optional dict that receives the prompt token statistics
+                         under "context" when the LLM is called
+            
+        Yields:
+            Text deltas as they arrive from the LLM
+        """
+        logger.info(f"Streaming answer from model: {model}")
+        
+        cache_key = self._answer_cache_key(query, documents, model, temperature, max_tokens, context=context)
+        cached_answer = await run_blocking(self._lookup_answer, cache_key, query)
+        if cached_answer is not None:
+            logger.info("Answer cache hit, sending cached answer")
+            yield cached_answer
+            return
+        
+        with track_stage("prompt_build"):
+            messages, token_stats = await run_blocking(self._build_messages, query, documents, context)
+        if diagnostics is not None:
+            diagnostics["context"] = token_stats
+        
+        answer_parts: List[str] = []
+        with track_stage("llm"):
+            started = time.perf_counter()
+            stream = await self.async_client.chat.completions.create(
+                model=model,
+                messages=cast(Any, messages),  # Type cast for OpenAI SDK compatibility
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=30  # 30 second timeout
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not answer_parts:
+                        STAGE_LATENCY.observe(time.perf_counter() - started, "llm_first_token")
+                    answer_parts.append(delta)
+                    yield delta
+        
+        logger.info("LLM stream completed successfully")
+        await run_blocking(self._store_answer, cache_key, query, model, "".join(answer_parts))
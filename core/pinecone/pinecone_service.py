@@ -4,17 +4,27 @@ Uses Pinecone's integrated inference for embedding and hybrid search.
 Based on Pinecone RAG tutorial: https://docs.pinecone.io/guides/
 """
 
+import contextvars
 import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone
 import backoff
 from tqdm import tqdm
 
 from core.llm.config import Settings, get_settings
+from core.vector_store.base import VectorStore
+from core.vector_store.bm25_index import BM25Index
+from core.vector_store.rerank_cache import RerankCache
+from core.vector_store.local_rerank import lexical_rerank
+from core.utils.tokens import truncate_to_tokens
+from core.utils.circuit_breaker import CircuitBreaker
+from core.utils.metrics import ABANDONED_SEARCHES, STAGE_ERRORS, track_stage, record_results
 
 logger = logging.getLogger(__name__)
 
-class PineconeService:
+class PineconeService(VectorStore):
     """
     Handles Pinecone index creation, document storage, and hybrid search.
     Uses integrated inference for automatic embedding.
@@ -32,6 +42,7 @@ class PineconeService:
             api_key: Pinecone API key
             environment: Pinecone environment/region
         """
+        super().__init__()
         self.pc = Pinecone(
             api_key=api_key,
             source_tag="chatbot_rag:vinhuni"
@@ -46,6 +57,37 @@ class PineconeService:
         self.dense_index = None
         self.sparse_index = None
         
+        # Shared pool so dense and sparse searches run concurrently
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=self.settings.SEARCH_MAX_WORKERS,
+            thread_name_prefix="pinecone-search"
+        )
+        
+        # Local Vietnamese BM25 index, kept in sync on every upsert/delete
+        self.bm25_index = BM25Index(
+            persist_dir=self.settings.BM25_INDEX_DIR or None,
+            k1=self.settings.BM25_K1,
+            b=self.settings.BM25_B
+        )
+        
+        # Cross-encoder scores per (query, chunk), dropped whenever chunks change
+        self.rerank_cache = RerankCache(
+            max_size=self.settings.RERANK_CACHE_SIZE,
+            ttl_seconds=self.settings.RERANK_CACHE_TTL_SECONDS
+        )
+        self.add_write_listener(lambda namespace: self.rerank_cache.clear())
+        
+        # Switch to local lexical reranking while the hosted reranker is failing or slow
+        self.rerank_breaker = CircuitBreaker(
+            name="hosted_rerank",
+            failure_rate=self.settings.RERANK_BREAKER_FAILURE_RATE,
+            window=self.settings.RERANK_BREAKER_WINDOW,
+            min_calls=self.settings.RERANK_BREAKER_MIN_CALLS,
+            slow_call_seconds=self.settings.RERANK_BREAKER_SLOW_SECONDS,
+            open_seconds=self.settings.RERANK_BREAKER_OPEN_SECONDS,
+            recovery_probes=self.settings.RERANK_BREAKER_RECOVERY_PROBES
+        )
+        
         logger.info(f"Pinecone client initialized for environment: {environment}")
     
     def create_dense_index(self) -> None:
@@ -178,7 +220,12 @@ class PineconeService:
             batch = documents[start:start + batch_size]
             self.upsert_records_batch(self.sparse_index, batch, namespace)
         
+        # Upsert to local BM25 index
+        logger.info("Indexing in local BM25 index...")
+        self.bm25_index.add_documents(documents, namespace)
+        
         logger.info("Upsert completed successfully")
+        self._notify_write(namespace)
         
         return {
             "dense_count": total_docs,
@@ -191,7 +238,8 @@ class PineconeService:
         query: str,
         top_k: int = 5,
         namespace: str = "default",
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
         Search an index with automatic query embedding.
@@ -202,6 +250,7 @@ class PineconeService:
             top_k: Number of results to return
             namespace: Namespace to search in
             filter_dict: Metadata filters
+            timeout: HTTP request timeout in seconds (None for the client default)
         
         Returns:
             List of search results with scores
@@ -217,66 +266,125 @@ class PineconeService:
         if filter_dict:
             search_params["query"]["filter"] = filter_dict
         
-        results = index.search(**search_params)
+        if timeout is None:
+            results = index.search(**search_params)
+        else:
+            results = self._search_with_timeout(index, search_params, timeout)
         hits = results["result"]["hits"]
         
         # Convert Hit objects to dictionaries for easier handling
         return [self._hit_to_dict(hit) for hit in hits]
     
+    def _search_with_timeout(self, index: Any, search_params: Dict[str, Any], timeout: float) -> Any:
+        """
+        Send a search request with an HTTP timeout.
+        Index.search() takes no timeout, so the request is built the way it
+        builds it and sent through the index's API client with _request_timeout.
+        A hung call then fails in the worker thread instead of holding it.
+        
+        Args:
+            index: Pinecone index to search
+            search_params: Keyword arguments for Index.search()
+            timeout: Request timeout in seconds
+        
+        Returns:
+            Pinecone search response
+        """
+        vector_api = getattr(index, "_vector_api", None)
+        try:
+            from pinecone.db_data.request_factory import IndexRequestFactory
+        except ImportError:
+            vector_api = None
+        if vector_api is None:
+            return index.search(**search_params)
+        
+        request = IndexRequestFactory.search_request(query=search_params["query"], fields=["*"])
+        return vector_api.search_records_namespace(
+            search_params["namespace"],
+            request,
+            _request_timeout=timeout
+        )
+    
     def hybrid_search(
         self,
         query: str,
         top_k: int = 5,
         namespace: str = "default",
-        metadata_filter: Optional[Dict[str, Any]] = None
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        sparse_backend: Optional[str] = None,
+        fusion: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Perform hybrid search across both dense and sparse indexes.
+        Both indexes are queried concurrently, so latency is roughly
+        max(dense, sparse) instead of their sum.
         
         Args:
             query: Search query text
             top_k: Number of results from each index
             namespace: Namespace to search
             metadata_filter: Optional metadata filters
+            timeout: Per-index timeout in seconds (defaults to SEARCH_TIMEOUT_SECONDS),
+                     also sent as the Pinecone request timeout
+            sparse_backend: "bm25" for the local BM25 index or "pinecone" for the
+                           hosted sparse index (defaults to SPARSE_BACKEND)
+            fusion: Fusion strategy ("rrf", "weighted", "max"), defaults to FUSION_STRATEGY
         
         Returns:
-            Merged and deduplicated results from both indexes
+            Fused and deduplicated results from both indexes.
+            If one index fails or times out, results from the other are returned.
         """
         if not self.dense_index or not self.sparse_index:
             raise ValueError("Indexes not initialized. Call setup_indexes() first")
         
         logger.info(f"Performing hybrid search for: {query[:50]}...")
         
-        try:
-            # Search dense index (semantic)
-            dense_results = self.search_index(
-                self.dense_index, 
-                query, 
-                top_k, 
-                namespace, 
-                metadata_filter
-            )
-            logger.debug(f"Dense search returned {len(dense_results)} results")
-        except Exception as e:
-            logger.error(f"Dense search failed: {e}")
-            dense_results = []
+        if timeout is None:
+            timeout = self.settings.SEARCH_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout
+        
+        # Search dense (semantic) and sparse (lexical) indexes in parallel;
+        # copied contexts let the workers report into the request's timings
+        dense_future = self._search_executor.submit(
+            contextvars.copy_context().run,
+            self._timed_search,
+            "dense_search",
+            self.dense_index,
+            query,
+            top_k,
+            namespace,
+            metadata_filter,
+            timeout
+        )
         
-        try:
-            # Search sparse index (lexical)
-            sparse_results = self.search_index(
+        if self._use_bm25(sparse_backend, namespace):
+            # Local lexical search runs on this thread while dense is in flight
+            try:
+                with track_stage("sparse_search"):
+                    sparse_results = self.bm25_index.search(query, top_k, namespace, metadata_filter)
+                record_results("sparse_search", len(sparse_results))
+            except Exception as e:
+                logger.error(f"BM25 search failed: {e}")
+                sparse_results = []
+            dense_results = self._collect_search_results(dense_future, "Dense", deadline)
+        else:
+            sparse_future = self._search_executor.submit(
+                contextvars.copy_context().run,
+                self._timed_search,
+                "sparse_search",
                 self.sparse_index,
                 query,
                 top_k,
                 namespace,
-                metadata_filter
+                metadata_filter,
+                timeout
             )
-            logger.debug(f"Sparse search returned {len(sparse_results)} results")
-        except Exception as e:
-            logger.error(f"Sparse search failed: {e}")
-            sparse_results = []
+            dense_results = self._collect_search_results(dense_future, "Dense", deadline)
+            sparse_results = self._collect_search_results(sparse_future, "Sparse", deadline)
         
-        # Merge and deduplicate
-        merged_results = self._merge_and_deduplicate(dense_results, sparse_results)
+        # Fuse and deduplicate
+        merged_results = self._fuse_results(dense_results, sparse_results, fusion)
         logger.info(f"Hybrid search returned {len(merged_results)} unique results")
         
         if merged_results:
@@ -284,80 +392,129 @@ class PineconeService:
         
         return merged_results
     
-    def _hit_to_dict(self, hit: Any) -> Dict[str, Any]:
+    def _timed_search(
+        self,
+        stage: str,
+        index: Any,
+        query: str,
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[Dict[str, Any]],
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Convert Pinecone Hit object to dictionary.
+        Run search_index and record its latency and result count under a stage label.
         
         Args:
-            hit: Pinecone Hit object from v7 API
+            stage: Metrics stage label ("dense_search" / "sparse_search")
+            index, query, top_k, namespace, metadata_filter, timeout: Same as search_index()
         
         Returns:
-            Dictionary representation of the hit
+            Search results
         """
-        return {
-            "_id": getattr(hit, '_id', ''),
-            "_score": getattr(hit, '_score', 0.0),
-            "fields": getattr(hit, 'fields', {})
-        }
+        with track_stage(stage):
+            results = self.search_index(index, query, top_k, namespace, metadata_filter, timeout)
+        record_results(stage, len(results))
+        return results
+    
+    def _use_bm25(self, sparse_backend: Optional[str], namespace: str) -> bool:
+        """
+        Decide whether lexical search uses the local BM25 index.
+        Falls back to the hosted sparse index while the namespace has not
+        been indexed locally yet (e.g. data uploaded before BM25 existed).
+        
+        Args:
+            sparse_backend: Requested backend, or None for SPARSE_BACKEND
+            namespace: Namespace being searched
+        
+        Returns:
+            True to search BM25, False to search the Pinecone sparse index
+        """
+        backend = (sparse_backend or self.settings.SPARSE_BACKEND).lower()
+        if backend != "bm25":
+            return False
+        if not self.bm25_index.document_count(namespace):
+            logger.warning(f"BM25 index empty for namespace {namespace}, using Pinecone sparse index")
+            return False
+        return True
     
-    def _merge_and_deduplicate(
+    def _collect_search_results(
         self,
-        sparse_results: List[Dict[str, Any]],
-        dense_results: List[Dict[str, Any]]
+        future: Future,
+        label: str,
+        deadline: float
     ) -> List[Dict[str, Any]]:
         """
-        Merge and deduplicate results from dense and sparse searches.
+        Wait for a submitted index search until the shared deadline.
+        A timed out search that already started cannot be cancelled: it keeps
+        its worker thread until the Pinecone request timeout fires. Such
+        searches are counted in the rag_abandoned_searches gauge until they end.
         
         Args:
-            sparse_results: Results from sparse search
-            dense_results: Results from dense search
+            future: Future returned by submitting search_index
+            label: Index label used in log messages ("Dense" / "Sparse")
+            deadline: time.monotonic() value after which the search is abandoned
         
         Returns:
-            Deduplicated list sorted by score
-        """
-        # Debug logging
-        logger.debug(f"Merging {len(sparse_results)} sparse + {len(dense_results)} dense results")
-        
-        if sparse_results:
-            logger.debug(f"Sample sparse result: {sparse_results[0]}")
-        if dense_results:
-            logger.debug(f"Sample dense result: {dense_results[0]}")
-        
-        # Deduplicate by _id, keeping higher score
-        deduped_hits = {}
-        for hit in sparse_results + dense_results:
-            hit_id = hit['_id']
-            if hit_id not in deduped_hits or hit['_score'] > deduped_hits[hit_id]['_score']:
-                deduped_hits[hit_id] = hit
-        
-        # Sort by score descending
-        sorted_hits = sorted(
-            deduped_hits.values(),
-            key=lambda x: x['_score'],
-            reverse=True
-        )
+            Search results, or an empty list if the search failed or timed out
+        """
+        try:
+            results = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            logger.debug(f"{label} search returned {len(results)} results")
+            return results
+        except FutureTimeoutError:
+            stage = f"{label.lower()}_search"
+            if not future.cancel():
+                ABANDONED_SEARCHES.inc(stage)
+                future.add_done_callback(lambda _: ABANDONED_SEARCHES.dec(stage))
+            STAGE_ERRORS.inc(stage)
+            logger.error(f"{label} search timed out")
+            return []
+        except Exception as e:
+            logger.error(f"{label} search failed: {e}")
+            return []
+    
+    def _hit_to_dict(self, hit: Any) -> Dict[str, Any]:
+        """
+        Convert Pinecone Hit object to dictionary.
         
-        logger.debug(f"After merge: {len(sorted_hits)} unique results")
-        return sorted_hits
+        Args:
+            hit: Pinecone Hit object from v7 API
+        
+        Returns:
+            Dictionary representation of the hit
+        """
+        return {
+            "_id": getattr(hit, '_id', ''),
+            "_score": getattr(hit, '_score', 0.0),
+            "fields": getattr(hit, 'fields', {})
+        }
     
     def rerank_results(
         self,
         query: str,
         results: List[Dict[str, Any]],
         top_n: int = 5,
-        model: str = "bge-reranker-v2-m3"
+        model: str = "bge-reranker-v2-m3",
+        lean: Optional[bool] = None
     ) -> List[Dict[str, Any]]:
         """
         Rerank search results using Pinecone's hosted reranking model.
+        Scores already computed for this query are reused from the rerank cache.
         
         Args:
             query: Original search query
             results: Search results to rerank
             top_n: Number of top results to return after reranking
             model: Reranking model to use
+            lean: Send only IDs and token-capped chunk text, without metadata
+                  and without documents in the response (defaults to RERANK_LEAN_PAYLOAD)
         
         Returns:
-            Reranked results with new scores
+            Reranked results with new scores. Documents always carry the full
+            metadata, reattached locally by index. If the hosted reranker fails
+            or its circuit breaker is open, candidates are reranked locally and
+            each result carries "fallback" with the reason.
         """
         logger.info(f"Reranking {len(results)} results...")
         
@@ -370,34 +527,146 @@ class PineconeService:
             }
             for r in results
         ]
+        ids = [doc["_id"] for doc in documents]
+        
+        if lean is None:
+            lean = self.settings.RERANK_LEAN_PAYLOAD
+        max_doc_tokens = self.settings.RERANK_MAX_DOC_TOKENS
+        # Capped text can score differently, so lean scores are cached separately
+        cache_model = f"{model}:lean{max_doc_tokens}" if lean else model
+        
+        # Scores are per (query, chunk): only send chunks not scored before
+        scores, missing = self.rerank_cache.lookup(query, cache_model, ids)
+        if missing:
+            missing_ids = set(missing)
+            to_score = [doc for doc in documents if doc["_id"] in missing_ids]
+            
+            if not self.rerank_breaker.allow():
+                return self._fallback_rerank(query, documents, top_n, reason="circuit_open")
+            
+            started = time.monotonic()
+            try:
+                new_scores = self._hosted_rerank(query, to_score, model, lean, max_doc_tokens)
+            except Exception as e:
+                self.rerank_breaker.record_failure()
+                logger.error(f"Hosted rerank failed: {e}")
+                return self._fallback_rerank(query, documents, top_n, reason="error")
+            self.rerank_breaker.record_success(time.monotonic() - started)
+            
+            self.rerank_cache.store(query, cache_model, new_scores)
+            scores.update(new_scores)
         
-        reranked = self.pc.inference.rerank(
-            model=model,
-            query=query,
-            documents=documents,
-            rank_fields=["chunk_text"],
-            top_n=top_n,
-            return_documents=True,
-            parameters={"truncate": "END"}
+        # Convert to dict format, best first
+        order = sorted(
+            (i for i in range(len(documents)) if ids[i] in scores),
+            key=lambda i: scores[ids[i]],
+            reverse=True
         )
-        
-        # Convert reranked results to dict format
-        # reranked.data contains RerankResult objects with .score, .index, .document attributes
-        formatted_results = []
-        for item in reranked.data:
-            # Get the original document using the index
-            original_doc = documents[item.index] if item.index < len(documents) else {}
-            
-            formatted_item = {
-                "score": item.score,
-                "index": item.index,
-                "document": original_doc
+        formatted_results = [
+            {
+                "score": scores[ids[i]],
+                "index": i,
+                "document": documents[i]
             }
-            formatted_results.append(formatted_item)
+            for i in order[:top_n]
+        ]
         
-        logger.info(f"Reranking complete, returning top {top_n} results")
+        logger.info(f"Reranking complete, returning top {top_n} results ({len(missing)} scored remotely)")
         return formatted_results
     
+    def _hosted_rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        model: str,
+        lean: bool,
+        max_doc_tokens: int
+    ) -> Dict[str, float]:
+        """
+        Score documents with Pinecone's hosted reranker.
+        
+        Args:
+            query: Search query
+            documents: Documents to score ({"_id", "chunk_text", **fields})
+            model: Reranking model
+            lean: Send only ID and token-capped chunk text
+            max_doc_tokens: Token cap per chunk in lean mode
+        
+        Returns:
+            Chunk ID -> rerank score for every document
+        """
+        if lean:
+            payload = [
+                {
+                    "_id": doc["_id"],
+                    "chunk_text": truncate_to_tokens(doc["chunk_text"], max_doc_tokens)
+                }
+                for doc in documents
+            ]
+        else:
+            payload = documents
+        
+        with track_stage("rerank_hosted"):
+            reranked = self.pc.inference.rerank(
+                model=model,
+                query=query,
+                documents=payload,
+                rank_fields=["chunk_text"],
+                top_n=len(payload),  # Score every candidate so all can be cached
+                return_documents=not lean,
+                parameters={"truncate": "END"}
+            )
+        
+        # reranked.data contains RerankResult objects with .score, .index, .document attributes
+        return {
+            documents[item.index]["_id"]: item.score
+            for item in reranked.data
+            if item.index < len(documents)
+        }
+    
+    def _fallback_rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_n: int,
+        reason: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Rerank locally with lexical scoring when the hosted reranker is unavailable.
+        
+        Args:
+            query: Search query
+            documents: Candidates ({"_id", "chunk_text", **fields})
+            top_n: Number of results to return
+            reason: Why the fallback was used ("circuit_open" or "error")
+        
+        Returns:
+            Reranked results, each marked with "fallback": reason
+        """
+        logger.warning(f"Using local lexical rerank fallback ({reason})")
+        results = lexical_rerank(
+            query,
+            documents,
+            top_n=top_n,
+            k1=self.settings.BM25_K1,
+            b=self.settings.BM25_B
+        )
+        for item in results:
+            item["fallback"] = reason
+        return results
+    
+    def get_rerank_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get rerank score cache and circuit breaker counters.
+        
+        Returns:
+            Dictionary with "cache" and "breaker" statistics
+        """
+        return {
+            "cache": self.rerank_cache.stats(),
+            "breaker": self.rerank_breaker.stats()
+        }
+    
     def get_index_stats(self) -> Dict[str, Any]:
         """
         Get statistics for both dense and sparse indexes.
@@ -413,6 +682,8 @@ class PineconeService:
         if self.sparse_index:
             stats["sparse"] = self.sparse_index.describe_index_stats()
         
+        stats["bm25"] = self.bm25_index.stats()
+        
         return stats
     
     def delete_vectors(
@@ -434,6 +705,10 @@ class PineconeService:
         if self.sparse_index:
             self.sparse_index.delete(ids=ids, namespace=namespace)
             logger.info(f"Deleted {len(ids)} vectors from sparse index")
+        
+        self.bm25_index.delete_documents(ids, namespace)
+        
+        self._notify_write(namespace)
     
     def delete_all_vectors(self, namespace: str = "default") -> None:
         """
@@ -448,4 +723,8 @@ class PineconeService:
         
         if self.sparse_index:
             self.sparse_index.delete(delete_all=True, namespace=namespace)
-            logger.warning(f"Deleted all vectors from sparse index namespace: {namespace}")
\ No newline at end of file
+            logger.warning(f"Deleted all vectors from sparse index namespace: {namespace}")
+        
+        self.bm25_index.clear(namespace)
+        
+        self._notify_write(namespace)
\ No newline at end of file
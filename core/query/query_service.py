@@ -1,32 +1,143 @@
 """
-Query Service - Handles hybrid search and retrieval from Pinecone.
-Integrates query processing with Pinecone's hybrid search and reranking.
+Query Service - Handles hybrid search and retrieval from the vector store.
+Integrates query processing with hybrid search and reranking (Pinecone or local).
 """
 
+import copy
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 
-from core.pinecone.pinecone_service import PineconeService
+from core.vector_store.base import VectorStore
 from core.document_processing.query_processor import QueryProcessor
+from core.llm.config import get_settings
+from core.utils.cache import LRUCache
+from core.utils.semantic_cache import SemanticCache
+from core.utils.concurrency import run_blocking
+from core.utils.singleflight import SingleFlight
+from core.query.rerank_policy import RerankPolicy
+from core.query.stitching import stitch_adjacent_chunks
+from core.query.diversify import mmr_select
+from core.utils.metrics import track_stage, record_results, record_cache
 
 logger = logging.getLogger(__name__)
 
 class QueryService:
     """
     Service for processing queries and retrieving relevant documents.
-    Uses Pinecone's hybrid search (dense + sparse) with reranking.
+    Uses the vector store's hybrid search (dense + sparse) with reranking.
     """
     
-    def __init__(self, pinecone_service: PineconeService):
+    def __init__(self, vector_store: VectorStore):
         """
         Initialize Query Service.
         
         Args:
-            pinecone_service: Pinecone service instance
+            vector_store: Vector store backend (Pinecone or local)
         """
-        self.pinecone_service = pinecone_service
+        self.vector_store = vector_store
+        settings = get_settings()
+        
+        # Retrieval results keyed on processed query + search parameters
+        self.retrieval_cache = LRUCache(
+            max_size=settings.RETRIEVAL_CACHE_SIZE,
+            ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+            name="retrieval_cache"
+        )
+        # Paraphrase-tolerant layer behind the exact cache
+        self.semantic_cache = SemanticCache(
+            capacity=settings.SEMANTIC_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+            name="semantic_retrieval_cache"
+        )
+        # Concurrent identical cache misses share one search + rerank
+        self._inflight = SingleFlight(name="retrieval")
+        # Skip or shrink the rerank call when the fused ranking is confident
+        self.adaptive_rerank = settings.ADAPTIVE_RERANK
+        self.rerank_policy = RerankPolicy(
+            max_candidates=settings.RERANK_MAX_CANDIDATES,
+            skip_overlap=settings.RERANK_SKIP_OVERLAP,
+            skip_margin=settings.RERANK_SKIP_MARGIN
+        )
+        # Optional MMR pass that trades near-duplicate chunks for diverse ones
+        self.mmr_enabled = settings.MMR_ENABLED
+        self.mmr_lambda = settings.MMR_LAMBDA
+        self.mmr_pool_size = settings.MMR_POOL_SIZE
+        self.mmr_duplicate_threshold = settings.MMR_DUPLICATE_THRESHOLD
+        # Merge neighbouring chunks of one document, keeping their overlap once
+        self.stitch_chunks = settings.STITCH_ADJACENT_CHUNKS
+        self.stitch_max_overlap = settings.MAX_CHUNK_OVERLAP
+        # Bumped on every write to a namespace; a search started under an older
+        # generation does not cache its (possibly stale) results
+        self._generations: Dict[str, int] = {}
+        self._generations_lock = threading.Lock()
+        # Drop cached results for a namespace as soon as its vectors change
+        self.vector_store.add_write_listener(self.invalidate_namespace)
+        
         logger.info("QueryService initialized")
     
+    @staticmethod
+    def _cache_key(
+        processed_query: str,
+        namespace: str,
+        top_k: int,
+        top_n: int,
+        metadata_filter: Optional[Dict[str, Any]],
+        use_reranking: bool,
+        fusion: Optional[str]
+    ) -> Tuple[Any, ...]:
+        """
+        Build the retrieval cache key. The namespace comes first so that
+        invalidate_namespace() can match on it.
+        """
+        filter_key = json.dumps(metadata_filter, sort_keys=True, default=str) if metadata_filter else ""
+        return (namespace, processed_query, top_k, top_n, filter_key, use_reranking, fusion)
+    
+    def invalidate_namespace(self, namespace: str) -> None:
+        """
+        Remove cached retrieval results for a namespace and start a new
+        generation, so searches already in flight do not cache their results.
+        Called by the vector store after upserts and deletes.
+        
+        Args:
+            namespace: Namespace whose contents changed
+        """
+        with self._generations_lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self.retrieval_cache.invalidate_where(lambda key: key[0] == namespace)
+            self.semantic_cache.invalidate_where(lambda scope: scope[0] == namespace)
+    
+    def _generation(self, namespace: str) -> int:
+        """Current write generation of a namespace."""
+        with self._generations_lock:
+            return self._generations.get(namespace, 0)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get retrieval cache counters.
+        
+        Returns:
+            Dictionary with exact/semantic cache and coalescing statistics
+        """
+        stats = self.retrieval_cache.stats()
+        stats["semantic"] = self.semantic_cache.stats()
+        stats["coalescing"] = self._inflight.stats()
+        return stats
+    
+    def get_rerank_stats(self) -> Dict[str, Any]:
+        """
+        Get how often each rerank path was taken.
+        
+        Returns:
+            Rerank policy statistics plus backend cache and circuit breaker state
+        """
+        stats = self.rerank_policy.stats()
+        stats["adaptive"] = self.adaptive_rerank
+        stats["backend"] = self.vector_store.get_rerank_stats()
+        return stats
+    
     def query(
         self,
         query: str,
@@ -34,7 +145,9 @@ class QueryService:
         top_n: int = 5,
         namespace: str = "default",
         metadata_filter: Optional[Dict[str, Any]] = None,
-        use_reranking: bool = True
+        use_reranking: bool = True,
+        fusion: Optional[str] = None,
+        diagnostics: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Process a query and retrieve relevant documents.
@@ -46,49 +159,205 @@ class QueryService:
             namespace: Pinecone namespace to search
             metadata_filter: Optional metadata filters
             use_reranking: Whether to use reranking
+            fusion: Dense/sparse fusion strategy ("rrf", "weighted", "max"),
+                    defaults to FUSION_STRATEGY
+            diagnostics: Optional dict filled with how the request was served
+                         ("cache" and, after a search, the "rerank" decision,
+                         "diversity" and "stitching" counts; "degraded" is set
+                         when a fallback reranker was used)
             
         Returns:
             List of relevant documents with scores and metadata
         """
+        if diagnostics is None:
+            diagnostics = {}
         try:
             # Preprocess query
-            processed_query = QueryProcessor.clean_query(query)
+            with track_stage("preprocess"):
+                processed_query = QueryProcessor.clean_query(query)
             logger.info(f"Original query: {query}")
             logger.info(f"Processed query: {processed_query}")
             
-            # Perform hybrid search
-            search_results = self.pinecone_service.hybrid_search(
-                query=processed_query,
-                top_k=top_k,
-                namespace=namespace,
-                metadata_filter=metadata_filter
+            fusion = fusion or get_settings().FUSION_STRATEGY
+            cache_key = self._cache_key(
+                processed_query, namespace, top_k, top_n, metadata_filter, use_reranking, fusion
             )
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Retrieval cache hit for: {processed_query[:50]}")
+                diagnostics["cache"] = "exact"
+                record_cache("retrieval", "hit")
+                return copy.deepcopy(cached)
             
-            if not search_results:
-                logger.warning("No results found from hybrid search")
-                return []
-            
-            # Optionally rerank results
-            if use_reranking and len(search_results) > 0:
-                reranked_results = self.pinecone_service.rerank_results(
-                    query=processed_query,
-                    results=search_results,
-                    top_n=top_n
+            # Scope is the key without the query text
+            semantic_scope = cache_key[:1] + cache_key[2:]
+            similar = self.semantic_cache.get(processed_query, scope=semantic_scope)
+            if similar is not None:
+                cached, matched_query, similarity = similar
+                logger.info(
+                    f"Semantic cache hit ({similarity:.3f}) for: {processed_query[:50]} "
+                    f"-> {matched_query[:50]}"
                 )
-                
-                # Format reranked results
-                documents = self._format_reranked_results(reranked_results)
-            else:
-                # Format search results without reranking
-                documents = self._format_search_results(search_results[:top_n])
+                self.retrieval_cache.set(cache_key, cached)
+                diagnostics["cache"] = "semantic"
+                record_cache("retrieval", "semantic")
+                return copy.deepcopy(cached)
             
-            logger.info(f"Retrieved {len(documents)} documents for query")
-            return documents
+            # Identical concurrent queries share one search + rerank
+            diagnostics["cache"] = "miss"
+            record_cache("retrieval", "miss")
+            documents, search_info = self._inflight.do(
+                cache_key,
+                self._search_and_rank,
+                processed_query=processed_query,
+                top_k=top_k,
+                top_n=top_n,
+                namespace=namespace,
+                metadata_filter=metadata_filter,
+                use_reranking=use_reranking,
+                fusion=fusion,
+                cache_key=cache_key,
+                semantic_scope=semantic_scope
+            )
+            diagnostics.update(copy.deepcopy(search_info))
+            if search_info["rerank"].get("degraded"):
+                diagnostics["degraded"] = True
+            return copy.deepcopy(documents)
             
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             raise
     
+    def _search_and_rank(
+        self,
+        processed_query: str,
+        top_k: int,
+        top_n: int,
+        namespace: str,
+        metadata_filter: Optional[Dict[str, Any]],
+        use_reranking: bool,
+        fusion: str,
+        cache_key: Tuple[Any, ...],
+        semantic_scope: Tuple[Any, ...]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Run hybrid search and optional reranking for a processed query,
+        diversify and stitch adjacent chunks, then store non-empty results in
+        the retrieval caches, unless the namespace was written to meanwhile.
+        
+        Returns:
+            Formatted documents (shared between coalesced callers, do not mutate)
+            and a dict with the "rerank" decision, "diversity" and "stitching" counts
+        """
+        generation = self._generation(namespace)
+        
+        # Perform hybrid search
+        with track_stage("search"):
+            search_results = self.vector_store.hybrid_search(
+                query=processed_query,
+                top_k=top_k,
+                namespace=namespace,
+                metadata_filter=metadata_filter,
+                fusion=fusion
+            )
+        
+        if not search_results:
+            logger.warning("No results found from hybrid search")
+            return [], {"rerank": {"path": "no_results", "candidates": 0}}
+        
+        # Decide whether reranking is needed, and on how many candidates
+        if not use_reranking:
+            rerank_info = {"path": "disabled", "candidates": 0}
+        elif self.adaptive_rerank:
+            rerank_info = self.rerank_policy.decide(search_results, top_n)
+        else:
+            rerank_info = {"path": "rerank", "candidates": len(search_results)}
+        
+        # MMR picks top_n from a larger ranked pool
+        pool_size = max(top_n, self.mmr_pool_size) if self.mmr_enabled else top_n
+        
+        # Optionally rerank results
+        if rerank_info["path"] == "rerank":
+            with track_stage("rerank"):
+                reranked_results = self.vector_store.rerank_results(
+                    query=processed_query,
+                    results=search_results[:rerank_info["candidates"]],
+                    top_n=pool_size
+                )
+            
+            fallback = next((r["fallback"] for r in reranked_results if r.get("fallback")), None)
+            if fallback:
+                rerank_info = {**rerank_info, "degraded": True, "fallback": fallback}
+            
+            # Format reranked results
+            documents = self._format_reranked_results(reranked_results)
+        else:
+            # Format search results without reranking
+            documents = self._format_search_results(search_results[:pool_size])
+        
+        logger.info(f"Retrieved {len(documents)} documents for query (rerank path: {rerank_info['path']})")
+        record_results("retrieval", len(documents))
+        
+        search_info = {"rerank": rerank_info}
+        if self.mmr_enabled:
+            documents, search_info["diversity"] = mmr_select(
+                documents,
+                top_n,
+                lambda_=self.mmr_lambda,
+                duplicate_threshold=self.mmr_duplicate_threshold
+            )
+        if self.stitch_chunks:
+            documents, search_info["stitching"] = stitch_adjacent_chunks(
+                documents,
+                max_overlap=self.stitch_max_overlap
+            )
+        
+        # Empty and degraded results are not cached: they may come from a
+        # failed search or a fallback reranker
+        if documents and not rerank_info.get("degraded"):
+            # Checked and stored under the lock, so an invalidation cannot slip in between
+            with self._generations_lock:
+                if self._generations.get(namespace, 0) == generation:
+                    self.retrieval_cache.set(cache_key, documents)
+                    self.semantic_cache.set(processed_query, documents, scope=semantic_scope)
+                else:
+                    logger.info(f"Namespace {namespace} changed during search, results not cached")
+        return documents, search_info
+    
+    async def aquery(
+        self,
+        query: str,
+        top_k: int = 15,
+        top_n: int = 5,
+        namespace: str = "default",
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        use_reranking: bool = True,
+        fusion: Optional[str] = None,
+        diagnostics: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of query() for use from FastAPI routes.
+        Preprocessing, hybrid search and reranking run in the shared bounded
+        executor so the event loop stays free for other requests.
+        
+        Args:
+            Same as query()
+            
+        Returns:
+            List of relevant documents with scores and metadata
+        """
+        return await run_blocking(
+            self.query,
+            query=query,
+            top_k=top_k,
+            top_n=top_n,
+            namespace=namespace,
+            metadata_filter=metadata_filter,
+            use_reranking=use_reranking,
+            fusion=fusion,
+            diagnostics=diagnostics
+        )
+    
     def _format_reranked_results(
         self,
         reranked_results: List[Dict[str, Any]]
@@ -184,7 +453,8 @@ class QueryService:
         top_k: int = 15,
         top_n: int = 5,
         namespace: str = "default",
-        metadata_filter: Optional[Dict[str, Any]] = None
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fusion: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Retrieve documents without LLM generation.
@@ -196,17 +466,21 @@ class QueryService:
             top_n: Final number of results
             namespace: Pinecone namespace
             metadata_filter: Optional metadata filters
+            fusion: Dense/sparse fusion strategy (defaults to FUSION_STRATEGY)
             
         Returns:
-            Dictionary with query and retrieved documents
+            Dictionary with query, retrieved documents and request metadata
         """
+        diagnostics: Dict[str, Any] = {}
         documents = self.query(
             query=query,
             top_k=top_k,
             top_n=top_n,
             namespace=namespace,
             metadata_filter=metadata_filter,
-            use_reranking=True
+            use_reranking=True,
+            fusion=fusion,
+            diagnostics=diagnostics
         )
         
         # Format for display
@@ -223,9 +497,38 @@ class QueryService:
         return {
             "query": query,
             "namespace": namespace,
-            "documents": formatted_docs
+            "documents": formatted_docs,
+            "metadata": diagnostics
         }
     
+    async def aretrieve_only(
+        self,
+        query: str,
+        top_k: int = 15,
+        top_n: int = 5,
+        namespace: str = "default",
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fusion: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of retrieve_only(), executed in the shared bounded executor.
+        
+        Args:
+            Same as retrieve_only()
+            
+        Returns:
+            Dictionary with query and retrieved documents
+        """
+        return await run_blocking(
+            self.retrieve_only,
+            query=query,
+            top_k=top_k,
+            top_n=top_n,
+            namespace=namespace,
+            metadata_filter=metadata_filter,
+            fusion=fusion
+        )
+    
     def get_namespace_stats(self, namespace: str = "default") -> Dict[str, Any]:
         """
         Get statistics for a namespace.
@@ -237,7 +540,7 @@ class QueryService:
             Statistics dictionary
         """
         try:
-            stats = self.pinecone_service.get_index_stats()
+            stats = self.vector_store.get_index_stats()
             
             # Extract namespace stats
             dense_stats = stats.get("dense", {})
@@ -0,0 +1,136 @@
+"""
+Rerank Policy - Decides whether a query needs the hosted reranker.
+Reranking costs a full network round-trip, so it is skipped when the fused
+dense/sparse ranking is already confident, and otherwise limited to the top
+M fused candidates.
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class RerankPolicy:
+    """
+    Confidence checks on a fused hit list:
+    - overlap: share of the fused top_n that every retriever also ranked in its top_n
+    - margin: relative gap between the first and second fused scores
+    Either reaching its threshold skips the reranker.
+    """
+
+    def __init__(
+        self,
+        max_candidates: int = 8,
+        skip_overlap: Optional[float] = 0.75,
+        skip_margin: Optional[float] = 0.4
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            max_candidates: Fused candidates sent to the reranker (M)
+            skip_overlap: Overlap (0-1) at or above which reranking is skipped (None disables the check)
+            skip_margin: Top-hit margin (0-1) at or above which reranking is skipped (None disables the check)
+        """
+        self.max_candidates = max_candidates
+        self.skip_overlap = skip_overlap
+        self.skip_margin = skip_margin
+        self._paths: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def overlap(hits: List[Dict[str, Any]], top_n: int) -> float:
+        """
+        Share of the fused top_n hits ranked within top_n by every input list.
+
+        Args:
+            hits: Fused hits with `_ranks` (from core.vector_store.fusion)
+            top_n: Number of final results
+
+        Returns:
+            Agreement ratio between 0 and 1 (0 if ranks are unknown)
+        """
+        head = hits[:top_n]
+        if not head or any("_ranks" not in hit for hit in head):
+            return 0.0
+        agreed = sum(
+            all(rank is not None and rank < top_n for rank in hit["_ranks"])
+            for hit in head
+        )
+        return agreed / len(head)
+
+    @staticmethod
+    def margin(hits: List[Dict[str, Any]]) -> float:
+        """
+        Relative gap between the first and second fused scores.
+
+        Args:
+            hits: Fused hits sorted by score
+
+        Returns:
+            (first - second) / first, 1.0 for a single hit, 0.0 if undefined
+        """
+        if len(hits) < 2:
+            return 1.0 if hits else 0.0
+        first, second = hits[0]["_score"], hits[1]["_score"]
+        if first <= 0:
+            return 0.0
+        return max(0.0, (first - second) / first)
+
+    def decide(self, hits: List[Dict[str, Any]], top_n: int) -> Dict[str, Any]:
+        """
+        Choose the rerank path for a fused hit list.
+
+        Args:
+            hits: Fused hits sorted by score
+            top_n: Number of final results
+
+        Returns:
+            Decision dict: path ("skip_few" | "skip_overlap" | "skip_margin" | "rerank"),
+            candidates (number of hits to rerank, 0 when skipped), overlap and margin
+        """
+        overlap = self.overlap(hits, top_n)
+        margin = self.margin(hits)
+
+        if len(hits) <= 1:
+            path = "skip_few"
+        elif self.skip_overlap is not None and overlap >= self.skip_overlap:
+            path = "skip_overlap"
+        elif self.skip_margin is not None and margin >= self.skip_margin:
+            path = "skip_margin"
+        else:
+            path = "rerank"
+
+        candidates = min(len(hits), max(self.max_candidates, top_n)) if path == "rerank" else 0
+        with self._lock:
+            self._paths[path] += 1
+        logger.debug(f"Rerank decision: {path} (overlap={overlap:.2f}, margin={margin:.2f})")
+
+        return {
+            "path": path,
+            "candidates": candidates,
+            "overlap": round(overlap, 4),
+            "margin": round(margin, 4)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get how often each path was taken.
+
+        Returns:
+            Dictionary with per-path counts, total decisions and skip rate
+        """
+        with self._lock:
+            paths = dict(self._paths)
+        total = sum(paths.values())
+        skipped = total - paths.get("rerank", 0)
+        return {
+            "paths": paths,
+            "decisions": total,
+            "skip_rate": round(skipped / total, 4) if total else 0.0,
+            "max_candidates": self.max_candidates,
+            "skip_overlap": self.skip_overlap,
+            "skip_margin": self.skip_margin
+        }
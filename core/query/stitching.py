@@ -0,0 +1,135 @@
+"""
+Chunk Stitching - Merges retrieved chunks that are neighbours in their
+source document.
+The splitter repeats the end of chunk i at the start of chunk i+1, so when
+both are retrieved the prompt would carry that overlap twice. Runs of
+consecutive chunks from one document are joined into a single passage with
+the shared overlap kept once.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunk IDs are built as f"{base_doc_id}_chunk_{i}" by the document processor
+_CHUNK_ID_PATTERN = re.compile(r"^(.+)_chunk_\d+$")
+
+def overlap_length(left: str, right: str, max_overlap: int, min_overlap: int = 20) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`.
+
+    Args:
+        left: Text of chunk i
+        right: Text of chunk i+1
+        max_overlap: Longest overlap considered (the splitter's chunk overlap)
+        min_overlap: Shorter matches are treated as coincidence
+
+    Returns:
+        Overlap length in characters (0 if none)
+    """
+    anchor = right[:min_overlap]
+    if len(anchor) < min_overlap:
+        return 0
+    # The earliest match of the anchor in the window gives the longest overlap
+    pos = left.find(anchor, max(0, len(left) - max_overlap))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(anchor, pos + 1)
+    return 0
+
+def _chunk_key(document: Dict[str, Any]) -> Optional[str]:
+    """
+    Identify the upload a chunk belongs to, or None if it cannot be placed.
+    Chunk IDs are "<base_doc_id>_chunk_<n>" and base_doc_id is unique per
+    upload, so two uploads of the same file are never stitched together.
+    """
+    metadata = document.get("metadata", {})
+    chunk_index = metadata.get("chunk_index")
+    if not isinstance(chunk_index, (int, float)):
+        return None
+    match = _CHUNK_ID_PATTERN.match(metadata.get("document_id") or "")
+    return match.group(1) if match else None
+
+def stitch_adjacent_chunks(
+    documents: List[Dict[str, Any]],
+    max_overlap: int = 200,
+    min_overlap: int = 20
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Merge consecutive chunks of the same upload into single passages.
+    A merged passage takes the best score and rank of its members and the
+    metadata of its first chunk, plus "chunk_indices" and "merged_document_ids".
+
+    Args:
+        documents: Formatted documents ({"text", "score", "metadata"}), best first
+        max_overlap: Longest overlap removed between neighbours
+        min_overlap: Shortest overlap recognised as duplicated text
+
+    Returns:
+        (documents with runs merged, ranking order preserved; stitching statistics)
+    """
+    runs_by_upload: Dict[str, List[int]] = defaultdict(list)
+    for position, doc in enumerate(documents):
+        key = _chunk_key(doc)
+        if key is not None:
+            runs_by_upload[key].append(position)
+
+    # Map each member position to the first position of its run
+    run_of: Dict[int, int] = {}
+    runs: Dict[int, List[int]] = {}
+    for positions in runs_by_upload.values():
+        positions.sort(key=lambda p: documents[p]["metadata"]["chunk_index"])
+        current = [positions[0]]
+        for prev, pos in zip(positions, positions[1:]):
+            if documents[pos]["metadata"]["chunk_index"] == documents[prev]["metadata"]["chunk_index"] + 1:
+                current.append(pos)
+            else:
+                current = [pos]
+            if len(current) > 1:
+                for member in current:
+                    run_of[member] = current[0]
+                runs[current[0]] = current
+
+    if not runs:
+        return documents, {"merged_chunks": 0, "chars_saved": 0}
+
+    stitched: List[Dict[str, Any]] = []
+    emitted = set()
+    chars_saved = 0
+    for position, doc in enumerate(documents):
+        run_id = run_of.get(position)
+        if run_id is None:
+            stitched.append(doc)
+            continue
+        if run_id in emitted:
+            continue
+        # Emit the whole run where its best-ranked member was
+        emitted.add(run_id)
+        members = [documents[p] for p in runs[run_id]]
+        text = members[0]["text"]
+        for member in members[1:]:
+            shared = overlap_length(text, member["text"], max_overlap, min_overlap)
+            chars_saved += shared
+            text += member["text"][shared:] if shared else "\n" + member["text"]
+
+        merged = {
+            **members[0],
+            "text": text,
+            "score": max(member.get("score", 0.0) for member in members),
+            "metadata": {
+                **members[0]["metadata"],
+                "chunk_indices": [member["metadata"]["chunk_index"] for member in members],
+                "merged_document_ids": [member["metadata"].get("document_id", "") for member in members]
+            }
+        }
+        if any("rerank_score" in member for member in members):
+            merged["rerank_score"] = max(member.get("rerank_score", 0.0) for member in members)
+        stitched.append(merged)
+
+    merged_chunks = len(documents) - len(stitched)
+    logger.info(f"Stitched {merged_chunks} adjacent chunks, removed {chars_saved} duplicated characters")
+    return stitched, {"merged_chunks": merged_chunks, "chars_saved": chars_saved}
@@ -0,0 +1,160 @@
+"""
+Circuit Breaker - Stops calling a failing or slow dependency for a while.
+Closed: calls pass and outcomes are tracked over a sliding window.
+Open: calls are refused until a cool-down elapses.
+Half-open: a limited number of probe calls decide whether to close again.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker that opens when the failure rate over the last
+    `window` calls reaches `failure_rate`. Calls slower than
+    `slow_call_seconds` count as failures.
+    """
+
+    def __init__(
+        self,
+        name: str = "breaker",
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        slow_call_seconds: Optional[float] = None,
+        open_seconds: float = 30.0,
+        recovery_probes: int = 2
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name used in logs and stats
+            failure_rate: Failure ratio (0-1) over the window that opens the breaker
+            window: Number of recent calls considered
+            min_calls: Calls needed in the window before the breaker can open
+            slow_call_seconds: Latency above which a successful call counts as failed (None disables)
+            open_seconds: Cool-down before probing the dependency again
+            recovery_probes: Consecutive successful probes needed to close
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.recovery_probes = recovery_probes
+
+        self._outcomes: deque = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the cool-down has passed."""
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        """Apply the open -> half-open transition (caller holds the lock)."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit {self.name} half-open, probing")
+
+    def allow(self) -> bool:
+        """
+        Ask whether a call may go to the dependency.
+        Every allowed call must be followed by record_success() or record_failure().
+
+        Returns:
+            True if the call may proceed
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.recovery_probes - self._probe_successes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        """
+        Record a completed call.
+
+        Args:
+            latency: Call duration in seconds (slow calls count as failures)
+        """
+        if self.slow_call_seconds is not None and latency is not None and latency > self.slow_call_seconds:
+            logger.warning(f"Circuit {self.name}: slow call ({latency:.2f}s)")
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._probe_successes += 1
+                if self._probe_successes >= self.recovery_probes:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit {self.name} closed after recovery")
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed (or slow) call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if self._state == CLOSED and calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        """Open the breaker (caller holds the lock)."""
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened += 1
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters.
+
+        Returns:
+            Dictionary with state, recent failure rate, rejected calls and times opened
+        """
+        with self._lock:
+            self._refresh()
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "recent_calls": calls,
+                "recent_failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened
+            }
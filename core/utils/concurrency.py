@@ -0,0 +1,51 @@
+"""
+Concurrency helpers - Run blocking service calls off the event loop.
+A single bounded thread pool is shared by all async request handlers.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+from core.llm.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+@lru_cache()
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared executor used for blocking calls (Pinecone, underthesea, file I/O).
+
+    Returns:
+        ThreadPoolExecutor bounded by BLOCKING_POOL_SIZE
+    """
+    settings = get_settings()
+    logger.info(f"Creating blocking executor with {settings.BLOCKING_POOL_SIZE} workers")
+    return ThreadPoolExecutor(
+        max_workers=settings.BLOCKING_POOL_SIZE,
+        thread_name_prefix="rag-blocking"
+    )
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function in the shared executor without blocking the event loop.
+    The caller's context variables are propagated to the worker thread.
+
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The value returned by func
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
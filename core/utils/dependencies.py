@@ -8,9 +8,14 @@ from fastapi import Depends
 from sqlalchemy.orm import Session
 
 from core.pinecone.pinecone_service import PineconeService
+from core.vector_store import VectorStore, LocalVectorStore
 from core.document_processing.document_processor import DocumentProcessor
 from core.query.query_service import QueryService
 from core.llm.llm_interface import RAGPromptManager, create_llm_provider
+from core.llm.answer_cache import AnswerCache
+from core.llm.context_assembler import ContextAssembler
+from core.llm.context_compressor import ContextCompressor
+from core.utils.semantic_cache import SemanticCache
 from core.llm.config import get_settings
 from core.database.database import get_db
 
@@ -34,22 +39,41 @@ def get_pinecone_service() -> PineconeService:
     
     return pinecone_service
 
+@lru_cache()
+def get_vector_store() -> VectorStore:
+    """
+    Get singleton vector store for the configured backend.
+    
+    Returns:
+        PineconeService when VECTOR_STORE_BACKEND is "pinecone",
+        LocalVectorStore when it is "local"
+    """
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "local":
+        return LocalVectorStore(
+            persist_dir=settings.LOCAL_STORE_DIR or None,
+            n_features=settings.LOCAL_STORE_DIM
+        )
+    if backend != "pinecone":
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND}")
+    return get_pinecone_service()
+
 def get_document_processor(
     db: Session = Depends(get_db),
-    pinecone_service: PineconeService = Depends(get_pinecone_service)
+    vector_store: VectorStore = Depends(get_vector_store)
 ) -> DocumentProcessor:
     """
     Get Document Processor instance.
     
     Args:
         db: Database session
-        pinecone_service: Pinecone service
+        vector_store: Vector store backend
         
     Returns:
         DocumentProcessor instance
     """
     return DocumentProcessor(
-        pinecone_service=pinecone_service,
+        vector_store=vector_store,
         db=db,
         chunk_size=settings.DEFAULT_CHUNK_SIZE,
         chunk_overlap=settings.DEFAULT_CHUNK_OVERLAP
@@ -63,8 +87,8 @@ def get_query_service() -> QueryService:
     Returns:
         QueryService instance
     """
-    pinecone_service = get_pinecone_service()
-    return QueryService(pinecone_service=pinecone_service)
+    vector_store = get_vector_store()
+    return QueryService(vector_store=vector_store)
 
 @lru_cache()
 def get_prompt_manager() -> RAGPromptManager:
@@ -80,4 +104,39 @@ def get_prompt_manager() -> RAGPromptManager:
         api_key=settings.DASHSCOPE_API_KEY
     )
     
-    return RAGPromptManager(llm_provider)
+    semantic_answer_cache = None
+    if settings.SEMANTIC_CACHE_REUSE_ANSWERS:
+        semantic_answer_cache = SemanticCache(
+            capacity=settings.SEMANTIC_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            name="semantic_answer_cache"
+        )
+    
+    answer_cache = AnswerCache(
+        max_size=settings.ANSWER_CACHE_SIZE,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        cache_dir=settings.ANSWER_CACHE_DIR or None,
+        semantic_cache=semantic_answer_cache,
+        disk_max_entries=settings.ANSWER_CACHE_DISK_MAX_ENTRIES
+    )
+    
+    context_assembler = ContextAssembler(
+        max_input_tokens=settings.LLM_MAX_INPUT_TOKENS,
+        max_history_tokens=settings.LLM_MAX_HISTORY_TOKENS,
+        min_document_tokens=settings.LLM_MIN_DOCUMENT_TOKENS
+    )
+    
+    context_compressor = None
+    if settings.CONTEXT_COMPRESSION:
+        context_compressor = ContextCompressor(
+            target_ratio=settings.CONTEXT_COMPRESSION_RATIO,
+            min_tokens=settings.CONTEXT_COMPRESSION_MIN_TOKENS
+        )
+    
+    return RAGPromptManager(
+        llm_provider,
+        answer_cache=answer_cache,
+        context_assembler=context_assembler,
+        context_compressor=context_compressor
+    )
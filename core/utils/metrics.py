@@ -0,0 +1,295 @@
+"""
+Metrics - In-process counters, gauges and histograms rendered in the Prometheus
+text exposition format (served at /api/metrics).
+Recording is a lock plus a bisect, so instrumenting the hot path costs
+microseconds. Pipeline stages share a few labelled metric families:
+latency, errors, result counts and cache lookups.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from in-process work (ms) to LLM calls (tens of s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Result count buckets
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a label set as {a="x",b="y"}."""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    """Render a sample value (integers without a decimal point)."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            *label_values: One value per label, in declaration order
+            amount: Increment
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """Current value for a label set (0 if never incremented)."""
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        """Prometheus text lines for this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = sorted(self._values.items())
+        for label_values, value in samples:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, with optional labels.
+    """
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        """Decrease the gauge (same arguments as inc)."""
+        self.inc(*label_values, amount=-amount)
+
+class Histogram:
+    """
+    Fixed-bucket histogram with optional labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            *label_values: One value per label, in declaration order
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *label_values: str) -> Optional[Dict[str, float]]:
+        """
+        Get count and sum for a label set.
+
+        Returns:
+            {"count", "sum"} or None if nothing was observed
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            return {"count": series[2], "sum": series[1]} if series else None
+
+    def render(self) -> List[str]:
+        """Prometheus text lines for this histogram."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            samples = sorted((key, ([*s[0]], s[1], s[2])) for key, s in self._series.items())
+        for label_values, (counts, total, count) in samples:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labels, label_values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric.
+
+        Returns:
+            Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Per-request stage durations in milliseconds, set by start_request_timings()
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+# Shared registry and the pipeline's metric families
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "rag_stage_latency_seconds",
+    "Latency of RAG pipeline stages",
+    labels=("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "rag_stage_errors_total",
+    "Failed or timed out RAG pipeline stages",
+    labels=("stage",)
+)
+ABANDONED_SEARCHES = REGISTRY.gauge(
+    "rag_abandoned_searches",
+    "Timed out index searches still holding a search worker thread",
+    labels=("stage",)
+)
+STAGE_RESULTS = REGISTRY.histogram(
+    "rag_stage_results",
+    "Number of results produced by a RAG pipeline stage",
+    labels=("stage",),
+    buckets=COUNT_BUCKETS
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "rag_cache_lookups_total",
+    "Cache lookups by cache and result",
+    labels=("cache", "result")
+)
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    Time a pipeline stage and count it as an error if it raises.
+    The duration is also added to the current request's timings, if any.
+
+    Args:
+        stage: Stage label (e.g. "preprocess", "dense_search", "llm")
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+def record_results(stage: str, count: int) -> None:
+    """
+    Record how many results a stage produced.
+
+    Args:
+        stage: Stage label
+        count: Number of results
+    """
+    STAGE_RESULTS.observe(count, stage)
+
+def record_cache(cache: str, result: str) -> None:
+    """
+    Count a cache lookup.
+
+    Args:
+        cache: Cache name (e.g. "retrieval", "rerank", "answer")
+        result: Lookup outcome (e.g. "hit", "semantic", "partial", "miss")
+    """
+    CACHE_LOOKUPS.inc(cache, result)
+
+def start_request_timings() -> Dict[str, float]:
+    """
+    Start collecting stage durations for the current request.
+    Stages run in this context (and in contexts copied from it, e.g. by
+    run_blocking) add their duration to the returned dict.
+
+    Returns:
+        Stage -> milliseconds, filled as stages complete
+    """
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """
+    Render stage durations as a Server-Timing header value.
+
+    Args:
+        timings: Stage -> milliseconds
+
+    Returns:
+        Header value such as "preprocess;dur=3.1, llm;dur=812.4"
+    """
+    return ", ".join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
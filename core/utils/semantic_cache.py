@@ -0,0 +1,234 @@
+"""
+Semantic Cache - Paraphrase-tolerant cache backed by an in-process similarity index.
+Queries are embedded locally with hashed character n-grams, so lookups never
+touch the network. Entries are grouped by a scope (e.g. namespace and search
+parameters) and only match queries with the same scope.
+
+N-gram similarity alone cannot tell "học phí năm 2024" from "năm 2023" or
+"ngành Sư phạm Toán" from "Văn", so a similar entry is only a hit if both
+queries also have the same numbers and the same content words (ignoring
+stop words, question fillers and the university's own name).
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from core.document_processing.query_processor import QueryProcessor
+from core.utils.text_vectors import HashedNgramVectorizer
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"\d+")
+
+# Words a paraphrase may add or drop without changing what is asked
+PARAPHRASE_FILLERS = frozenset({
+    'ai', 'gì', 'hỏi', 'em', 'mình', 'muốn', 'biết', 'xin', 'ạ', 'ơi', 'nhé', 'vậy',
+    'làm', 'nghĩa', 'hiện', 'nay', 'trường', 'đại', 'học', 'đh', 'đhv', 'vinh'
+})
+
+def key_terms(query: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Get the terms two queries must share to be answered alike.
+
+    Args:
+        query: Query text
+
+    Returns:
+        (numbers, content words)
+    """
+    words = HashedNgramVectorizer.normalize(query).split()
+    numbers = frozenset(n for word in words for n in _NUMBER.findall(word))
+    content = frozenset(
+        word for word in words
+        if not word.isdigit() and word not in QueryProcessor.STOP_WORDS and word not in PARAPHRASE_FILLERS
+    )
+    return numbers, content
+
+def same_key_terms(query: str, other: str) -> bool:
+    """Whether two queries have the same numbers and content words."""
+    return key_terms(query) == key_terms(other)
+
+class SemanticCache:
+    """
+    Fixed-capacity cache returning the value stored for the most similar
+    earlier query, if its cosine similarity reaches the threshold.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        threshold: float = 0.85,
+        ttl_seconds: Optional[float] = None,
+        vectorizer: Optional[HashedNgramVectorizer] = None,
+        name: str = "semantic_cache",
+        guard: Optional[Callable[[str, str], bool]] = same_key_terms
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            capacity: Maximum number of entries (0 disables the cache)
+            threshold: Minimum cosine similarity for a hit (0-1)
+            ttl_seconds: Entry lifetime in seconds (None means no expiry)
+            vectorizer: Text vectorizer (defaults to HashedNgramVectorizer())
+            name: Name used in logs and stats
+            guard: Check a similar entry's query must also pass to be a hit
+                   (None accepts any entry above the threshold)
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self.guard = guard
+
+        # Slot-based index: row i of the matrix belongs to self._entries[i]
+        self._vectors = np.zeros((capacity, self.vectorizer.n_features), dtype=np.float32)
+        self._entries: List[Optional[Tuple[Hashable, str, Any, float]]] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._tick = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Similar entries rejected by the guard
+        self.refused = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.capacity > 0
+
+    def get(self, query: str, scope: Hashable = None) -> Optional[Tuple[Any, str, float]]:
+        """
+        Find the cached value for the most similar query in the same scope.
+
+        Args:
+            query: Query text
+            scope: Scope the entry must have been stored with
+
+        Returns:
+            (value, matched_query, similarity) on a hit, otherwise None
+        """
+        if not self.enabled:
+            return None
+        vector = self.vectorizer.transform_one(query)
+
+        with self._lock:
+            now = time.monotonic()
+            sims = self._vectors @ vector
+            best_slot, best_sim = -1, self.threshold
+            for slot in np.flatnonzero(sims >= self.threshold):
+                entry = self._entries[slot]
+                if entry is None or entry[0] != scope:
+                    continue
+                if entry[3] < now:
+                    self._free(slot)
+                    continue
+                if sims[slot] >= best_sim:
+                    if self.guard is not None and not self.guard(query, entry[1]):
+                        self.refused += 1
+                        continue
+                    best_slot, best_sim = slot, float(sims[slot])
+
+            if best_slot < 0:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._tick += 1
+            self._last_used[best_slot] = self._tick
+            entry = self._entries[best_slot]
+            return entry[2], entry[1], best_sim
+
+    def set(self, query: str, value: Any, scope: Hashable = None) -> None:
+        """
+        Store a value for a query, replacing the entry for the same query and
+        scope, or else evicting the least recently used entry if full.
+
+        Args:
+            query: Query text
+            value: Value to return for similar queries
+            scope: Scope for the entry
+        """
+        if not self.enabled:
+            return
+        vector = self.vectorizer.transform_one(query)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+
+        with self._lock:
+            same = [
+                i for i, entry in enumerate(self._entries)
+                if entry is not None and entry[1] == query and entry[0] == scope
+            ]
+            free = [i for i, entry in enumerate(self._entries) if entry is None]
+            if same:
+                slot = same[0]
+            elif free:
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._tick += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = (scope, query, value, expires_at)
+            self._last_used[slot] = self._tick
+
+    def _free(self, slot: int) -> None:
+        """Release a slot (caller holds the lock)."""
+        self._entries[slot] = None
+        self._vectors[slot] = 0.0
+        self._last_used[slot] = 0
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove every entry whose scope matches a predicate.
+
+        Args:
+            predicate: Function called with each entry's scope
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and predicate(entry[0]):
+                    self._free(slot)
+                    removed += 1
+        if removed:
+            logger.info(f"Invalidated {removed} entries from {self.name}")
+        return removed
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.invalidate_where(lambda scope: True)
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with size, hits, misses, evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refused": self.refused,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
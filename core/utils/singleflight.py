@@ -0,0 +1,168 @@
+"""
+Single-flight request coalescing - Concurrent calls with the same key share
+one in-flight computation instead of each doing the work.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """An in-flight computation and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None  # type: ignore
+
+class SingleFlight:
+    """
+    Thread-based coalescing: while a call for a key is running, other threads
+    calling with the same key wait for it and receive the same result (or error).
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Name used in logs and stats
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run func unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the computation
+            func: Function to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The (possibly shared) result of func
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"{self.name}: joining in-flight call")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with calls, executions, deduplicated callers and in-flight keys
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "executions": self.executions,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._calls)
+            }
+
+class AsyncSingleFlight:
+    """
+    Coroutine-based coalescing for a single event loop: concurrent awaits with
+    the same key share one running task, which finishes even if every caller
+    is cancelled.
+    """
+
+    def __init__(self, name: str = "async_singleflight"):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Name used in logs and stats
+        """
+        self.name = name
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await func unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the computation
+            func: Coroutine function to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The (possibly shared) result of func
+        """
+        self.calls += 1
+        task = self._futures.get(key)
+        if task is not None:
+            self.deduplicated += 1
+            logger.debug(f"{self.name}: joining in-flight call")
+        else:
+            # The shared call runs as its own task: cancelling any caller,
+            # the first one included, never cancels it for the others
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._futures[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        """Forget a finished call."""
+        if self._futures.get(key) is task:
+            del self._futures[key]
+        # Mark retrieved so an exception without waiting callers is not reported
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with calls, executions, deduplicated callers and in-flight keys
+        """
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._futures)
+        }
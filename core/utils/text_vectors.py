@@ -0,0 +1,89 @@
+"""
+Text Vectors - Cheap local text representations that need no network.
+Hashed character n-grams are robust to word order and small spelling
+differences, which makes them a good fit for paraphrase detection.
+"""
+
+import re
+import unicodedata
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+class HashedNgramVectorizer:
+    """
+    Map text to L2-normalized vectors of hashed character n-grams
+    (taken within words) plus hashed whole words.
+    """
+
+    def __init__(self, n_features: int = 4096, ngram_range: tuple = (2, 4)):
+        """
+        Initialize the vectorizer.
+
+        Args:
+            n_features: Vector dimension (number of hash buckets)
+            ngram_range: Inclusive (min_n, max_n) character n-gram lengths
+        """
+        self.n_features = n_features
+        self.min_n, self.max_n = ngram_range
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode NFC, lowercase, punctuation removed, whitespace collapsed."""
+        text = unicodedata.normalize("NFC", text).lower()
+        return _NON_WORD.sub(" ", text).strip()
+
+    def features(self, text: str) -> List[str]:
+        """
+        Get the n-gram features of a text.
+
+        Args:
+            text: Input text
+
+        Returns:
+            List of feature strings (with repetitions)
+        """
+        feats = []
+        for word in self.normalize(text).split():
+            feats.append(f"w:{word}")
+            padded = f" {word} "
+            for n in range(self.min_n, self.max_n + 1):
+                for i in range(len(padded) - n + 1):
+                    feats.append(padded[i:i + n])
+        return feats
+
+    def transform_one(self, text: str) -> np.ndarray:
+        """
+        Vectorize a single text.
+
+        Args:
+            text: Input text
+
+        Returns:
+            float32 vector of length n_features with unit L2 norm (or all zeros)
+        """
+        vec = np.zeros(self.n_features, dtype=np.float32)
+        for feat in self.features(text):
+            vec[zlib.crc32(feat.encode("utf-8")) % self.n_features] += 1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def transform(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Vectorize several texts.
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            float32 matrix of shape (len(texts), n_features)
+        """
+        rows = [self.transform_one(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.n_features), dtype=np.float32)
+        return np.vstack(rows)
@@ -0,0 +1,49 @@
+"""
+Token estimates - Fast, dependency-free approximation of model token counts.
+Multilingual subword tokenizers (XLM-R for bge-reranker, Qwen's BPE) split
+Vietnamese into roughly one to two tokens per syllable and one per
+punctuation mark, so counting word pieces and applying a ratio is close
+enough for budgeting payloads and prompts.
+"""
+
+import math
+import re
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+# Estimated model tokens per word piece (syllable or punctuation mark)
+TOKENS_PER_PIECE = 1.3
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    return math.ceil(len(_PIECE.findall(text)) * TOKENS_PER_PIECE)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text so that its estimated token count fits max_tokens.
+    The cut falls on a word piece boundary.
+
+    Args:
+        text: Input text
+        max_tokens: Token budget
+
+    Returns:
+        The original text if it fits, otherwise its longest fitting prefix
+    """
+    max_pieces = int(max_tokens / TOKENS_PER_PIECE)
+    if max_pieces <= 0:
+        return ""
+    for i, match in enumerate(_PIECE.finditer(text)):
+        if i == max_pieces:
+            return text[:match.start()].rstrip()
+    return text
@@ -0,0 +1,109 @@
+"""
+Startup warmup - Build the service singletons and open connections before
+the first user request pays for them.
+Run from the FastAPI lifespan hook as a background task, so /api/health
+can report "warming" until every component is done.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.document_processing.query_processor import QueryProcessor
+from core.utils.concurrency import get_blocking_executor, run_blocking
+from core.utils.dependencies import get_vector_store, get_query_service, get_prompt_manager
+
+logger = logging.getLogger(__name__)
+
+# Loads the underthesea normalization and POS tagging models
+WARMUP_QUERY = "Lịch thi học kỳ 1 năm học 2024-2025 của sinh viên Trường Đại học Vinh"
+
+class WarmupState:
+    """
+    Progress of the startup warmup, as reported by /api/health.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+        # Component -> {"ms", optional "error"}, in warmup order
+        self.components: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        """Components whose warmup failed, with the error message."""
+        return {name: info["error"] for name, info in self.components.items() if "error" in info}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable view for the health endpoint."""
+        return {
+            "ready": self.ready,
+            "duration_ms": self.duration_ms,
+            "components": self.components
+        }
+
+async def _warm_vector_store() -> None:
+    # Builds the backend (Pinecone runs setup_indexes() over the network),
+    # then a stats call opens the pooled HTTPS connections
+    vector_store = await run_blocking(get_vector_store)
+    await run_blocking(vector_store.get_index_stats)
+    await run_blocking(get_query_service)
+
+async def _warm_llm_client() -> None:
+    prompt_manager = await run_blocking(get_prompt_manager)
+    # Any response, even an error status, leaves a connection in the client's pool
+    try:
+        await prompt_manager.async_client.models.list()
+    except Exception as e:
+        logger.info(f"LLM connection warmup returned an error (connection kept): {str(e)}")
+
+async def _warm_query_processor() -> None:
+    await run_blocking(QueryProcessor.clean_query, WARMUP_QUERY)
+
+async def _warm_executor() -> None:
+    get_blocking_executor()
+
+async def warm_up(state: WarmupState, include_connections: bool = True) -> WarmupState:
+    """
+    Warm every component in order, recording its duration.
+    A failing component is logged and recorded, and the others still run;
+    its singleton is then built lazily by the first request as before.
+
+    Args:
+        state: State to update (shared with the health endpoint)
+        include_connections: Also warm the vector store and LLM client
+                             (network calls)
+
+    Returns:
+        The updated state, with ready set once every component has run
+    """
+    steps: Dict[str, Callable[[], Awaitable[None]]] = {
+        "executor": _warm_executor,
+        "query_processor": _warm_query_processor
+    }
+    if include_connections:
+        steps["vector_store"] = _warm_vector_store
+        steps["llm_client"] = _warm_llm_client
+
+    state.started_at = time.time()
+    start = time.perf_counter()
+    for name, step in steps.items():
+        step_start = time.perf_counter()
+        info: Dict[str, Any] = {}
+        try:
+            await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Warmup of {name} failed: {str(e)}")
+            info["error"] = str(e)
+        info["ms"] = round((time.perf_counter() - step_start) * 1000, 1)
+        state.components[name] = info
+        logger.info(f"Warmed up {name} in {info['ms']}ms")
+
+    state.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    state.ready = True
+    logger.info(f"Warmup finished in {state.duration_ms}ms ({len(state.errors)} failed components)")
+    return state
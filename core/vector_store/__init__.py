@@ -0,0 +1,10 @@
+"""
+Vector store module.
+Defines the vector store interface used by query and document services,
+with Pinecone (hosted) and in-process NumPy (local) implementations.
+"""
+
+from .base import VectorStore
+from .local_store import LocalVectorStore
+
+__all__ = ['VectorStore', 'LocalVectorStore']
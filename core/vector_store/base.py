@@ -0,0 +1,185 @@
+"""
+Vector Store interface - Operations QueryService and DocumentProcessor depend on.
+Implementations return hits in the Pinecone v7 dict format:
+{"_id": str, "_score": float, "fields": {"chunk_text": str, ...metadata}}
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Callable
+
+from core.llm.config import get_settings
+from core.vector_store.fusion import fuse
+from core.utils.metrics import track_stage, record_results
+
+logger = logging.getLogger(__name__)
+
+class VectorStore(ABC):
+    """
+    Base class for vector stores supporting hybrid (dense + lexical) search,
+    reranking and namespace-scoped writes.
+    """
+    
+    def __init__(self):
+        # Callbacks notified with the namespace after every upsert/delete
+        self._write_listeners: List[Callable[[str], None]] = []
+    
+    @abstractmethod
+    def upsert_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        namespace: str = "default",
+        batch_size: int = 96
+    ) -> Dict[str, int]:
+        """
+        Upsert documents to the store.
+        
+        Args:
+            documents: List of records with "id", "chunk_text" and flat metadata fields
+            namespace: Namespace for organizing vectors
+            batch_size: Number of records per batch
+        
+        Returns:
+            Dictionary with upserted counts ("dense_count", "sparse_count")
+        """
+    
+    @abstractmethod
+    def hybrid_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: str = "default",
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fusion: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search dense and lexical representations and fuse the results.
+        
+        Args:
+            query: Search query text
+            top_k: Number of results from each representation
+            namespace: Namespace to search
+            metadata_filter: Optional metadata filters
+            fusion: Fusion strategy ("rrf", "weighted", "max"), defaults to FUSION_STRATEGY
+        
+        Returns:
+            Fused and deduplicated hits sorted by score
+        """
+    
+    @abstractmethod
+    def rerank_results(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_n: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Rerank search hits.
+        
+        Args:
+            query: Original search query
+            results: Hits from hybrid_search
+            top_n: Number of top results to return
+        
+        Returns:
+            List of {"score", "index", "document"} dicts, where document is
+            {"_id", "chunk_text", **fields} of results[index]. Items produced
+            by a degraded fallback path carry "fallback" with the reason.
+        """
+    
+    @abstractmethod
+    def delete_vectors(self, ids: List[str], namespace: str = "default") -> None:
+        """
+        Delete vectors by IDs.
+        
+        Args:
+            ids: List of vector IDs to delete
+            namespace: Namespace containing the vectors
+        """
+    
+    @abstractmethod
+    def delete_all_vectors(self, namespace: str = "default") -> None:
+        """
+        Delete all vectors in a namespace.
+        
+        Args:
+            namespace: Namespace to clear
+        """
+    
+    @abstractmethod
+    def get_index_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics for the dense and sparse representations.
+        
+        Returns:
+            {"dense": {"namespaces": {ns: {"vector_count": n}}}, "sparse": {...}}
+        """
+    
+    def get_rerank_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get reranker health and cache counters.
+        
+        Returns:
+            Statistics, or None if the store reranks in process without caching
+        """
+        return None
+    
+    def add_write_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Register a callback invoked with the namespace whenever vectors in it
+        are upserted or deleted (used to invalidate query caches).
+        
+        Args:
+            listener: Callable taking the namespace name
+        """
+        self._write_listeners.append(listener)
+    
+    def _notify_write(self, namespace: str) -> None:
+        """
+        Notify write listeners that a namespace changed.
+        Listener errors are logged and never fail the write.
+        
+        Args:
+            namespace: Namespace that was modified
+        """
+        for listener in self._write_listeners:
+            try:
+                listener(namespace)
+            except Exception as e:
+                logger.error(f"Write listener failed for namespace {namespace}: {e}")
+    
+    def _fuse_results(
+        self,
+        dense_results: List[Dict[str, Any]],
+        sparse_results: List[Dict[str, Any]],
+        fusion: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge and deduplicate dense and sparse hits with a fusion strategy.
+        
+        Args:
+            dense_results: Results from dense search, best first
+            sparse_results: Results from sparse search, best first
+            fusion: "rrf", "weighted" or "max" (defaults to FUSION_STRATEGY)
+        
+        Returns:
+            Deduplicated list sorted by fused score
+        """
+        settings = get_settings()
+        strategy = fusion or settings.FUSION_STRATEGY
+        logger.debug(
+            f"Fusing {len(dense_results)} dense + {len(sparse_results)} sparse results ({strategy})"
+        )
+        
+        dense_weight = settings.FUSION_DENSE_WEIGHT
+        with track_stage("merge"):
+            fused = fuse(
+                [dense_results, sparse_results],
+                strategy=strategy,
+                weights=[dense_weight, 1.0 - dense_weight],
+                rrf_k=settings.FUSION_RRF_K
+            )
+        record_results("merge", len(fused))
+        
+        logger.debug(f"After fusion: {len(fused)} unique results")
+        return fused
\ No newline at end of file
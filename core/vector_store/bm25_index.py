@@ -0,0 +1,479 @@
+"""
+BM25 Index - In-process Vietnamese lexical search.
+Chunk text is segmented with underthesea at upsert time; each term maps to
+compact array-backed postings (row numbers and term frequencies). Every
+namespace is persisted as an append-only JSON Lines log of upserts and
+deletes, replayed on startup and compacted once deleted rows dominate.
+Before each search the log is checked for entries written by other
+processes (API workers sharing the directory): new lines are replayed,
+and a log rewritten or removed elsewhere is reloaded. Appends, compaction
+and clearing hold an exclusive flock on <namespace>/bm25.lock, so a
+compaction never swaps out a log another worker is appending to.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+import uuid
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single worker
+    fcntl = None
+
+import numpy as np
+from underthesea import word_tokenize
+
+from core.document_processing.query_processor import QueryProcessor
+from core.vector_store.filters import matches_filter
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Segment Vietnamese text into BM25 terms.
+    Multi-syllable words are kept as one term ("công_nghệ") and also
+    contribute their syllables, so a query segmented differently from the
+    document still matches. Stop-word syllables are dropped.
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of terms (with repetitions)
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    try:
+        words = word_tokenize(text)
+    except Exception as e:
+        logger.warning(f"Word segmentation failed, falling back to syllables: {e}")
+        words = text.split()
+
+    terms = []
+    for word in words:
+        syllables = _WORD.findall(word)
+        if not syllables:
+            continue
+        if len(syllables) > 1:
+            terms.append("_".join(syllables))
+        terms.extend(s for s in syllables if s not in QueryProcessor.STOP_WORDS)
+    return terms
+
+class _BM25Namespace:
+    """
+    Postings of one namespace. Rows are append-only; deleted or replaced
+    documents are tombstoned in `alive` until the namespace is compacted.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.fields: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {}
+        self.lengths = array("I")
+        self.alive = bytearray()
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.live_count = 0
+        self.live_length = 0
+
+    @property
+    def dead_count(self) -> int:
+        return len(self.ids) - self.live_count
+
+    def add(self, doc_id: str, fields: Dict[str, Any], term_freqs: Dict[str, int]) -> None:
+        """Append a document, tombstoning any previous version."""
+        self.remove(doc_id)
+        row = len(self.ids)
+        length = sum(term_freqs.values())
+        self.ids.append(doc_id)
+        self.fields.append(fields)
+        self.rows[doc_id] = row
+        self.lengths.append(length)
+        self.alive.append(1)
+        self.live_count += 1
+        self.live_length += length
+        for term, tf in term_freqs.items():
+            rows, tfs = self.postings.setdefault(term, (array("I"), array("H")))
+            rows.append(row)
+            tfs.append(min(tf, 0xFFFF))
+
+    def remove(self, doc_id: str) -> bool:
+        """Tombstone a document. Returns True if it was present."""
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self.alive[row] = 0
+        self.fields[row] = None
+        self.live_count -= 1
+        self.live_length -= self.lengths[row]
+        return True
+
+class BM25Index:
+    """
+    Okapi BM25 over underthesea-segmented chunk text, returning hits in the
+    same dict format as the vector stores.
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        Initialize the index and replay persisted logs.
+
+        Args:
+            persist_dir: Directory holding <namespace>/bm25.jsonl logs (None keeps everything in memory)
+            k1: Term frequency saturation
+            b: Document length normalization (0-1)
+        """
+        self.persist_dir = persist_dir
+        self.k1 = k1
+        self.b = b
+        self._namespaces: Dict[str, _BM25Namespace] = {}
+        self._lock = threading.RLock()
+        # Namespace -> (log inode, bytes replayed); tells which log lines are new
+        self._log_state: Dict[str, Tuple[int, int]] = {}
+        # Tags the entries this instance writes, which it has already applied
+        self._writer = uuid.uuid4().hex[:12]
+        # Namespace -> nesting depth of its held cross-process lock
+        self._held_locks: Dict[str, int] = {}
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self._load()
+
+    def _log_path(self, namespace: str) -> str:
+        return os.path.join(self.persist_dir or "", namespace, "bm25.jsonl")
+
+    @contextmanager
+    def _log_lock(self, namespace: str) -> Iterator[None]:
+        """
+        Hold the namespace's cross-process write lock (caller holds self._lock,
+        which makes the nesting count safe). Reentrant within this instance.
+
+        Args:
+            namespace: Namespace whose log is written
+        """
+        if not self.persist_dir or fcntl is None or self._held_locks.get(namespace):
+            self._held_locks[namespace] = self._held_locks.get(namespace, 0) + 1
+            try:
+                yield
+            finally:
+                self._held_locks[namespace] -= 1
+            return
+
+        lock_dir = os.path.join(self.persist_dir, namespace)
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, "bm25.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._held_locks[namespace] = 1
+            try:
+                yield
+            finally:
+                self._held_locks[namespace] = 0
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def document_count(self, namespace: str = "default") -> int:
+        """Number of live documents in a namespace."""
+        with self._lock:
+            self._refresh(namespace)
+            ns = self._namespaces.get(namespace)
+            return ns.live_count if ns else 0
+
+    def add_documents(self, documents: List[Dict[str, Any]], namespace: str = "default") -> int:
+        """
+        Index documents (records with "id", "chunk_text" and metadata fields).
+        Existing IDs are replaced.
+
+        Args:
+            documents: Records to index
+            namespace: Namespace for the documents
+
+        Returns:
+            Number of documents indexed
+        """
+        # Segmentation is the expensive part, do it outside the lock
+        entries = [
+            {
+                "op": "add",
+                "writer": self._writer,
+                "id": str(doc["id"]),
+                "fields": {k: v for k, v in doc.items() if k != "id"},
+                "tf": dict(Counter(tokenize(doc.get("chunk_text", ""))))
+            }
+            for doc in documents
+        ]
+
+        with self._lock, self._log_lock(namespace):
+            # Catch up with other workers first, so a compaction keeps their entries
+            self._refresh(namespace)
+            ns = self._namespaces.setdefault(namespace, _BM25Namespace())
+            for entry in entries:
+                ns.add(entry["id"], entry["fields"], entry["tf"])
+            self._append_log(namespace, entries)
+            self._maybe_compact(namespace)
+        return len(entries)
+
+    def delete_documents(self, ids: List[str], namespace: str = "default") -> int:
+        """
+        Remove documents by ID.
+
+        Args:
+            ids: Document IDs
+            namespace: Namespace containing the documents
+
+        Returns:
+            Number of documents removed
+        """
+        with self._lock, self._log_lock(namespace):
+            self._refresh(namespace)
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                return 0
+            removed = [doc_id for doc_id in ids if ns.remove(doc_id)]
+            if removed:
+                self._append_log(namespace, [{"op": "delete", "writer": self._writer, "ids": removed}])
+                self._maybe_compact(namespace)
+            return len(removed)
+
+    def clear(self, namespace: str = "default") -> None:
+        """
+        Remove every document in a namespace.
+
+        Args:
+            namespace: Namespace to clear
+        """
+        with self._lock, self._log_lock(namespace):
+            self._namespaces.pop(namespace, None)
+            self._log_state.pop(namespace, None)
+            if self.persist_dir and os.path.exists(self._log_path(namespace)):
+                os.remove(self._log_path(namespace))
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: str = "default",
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score documents with BM25.
+
+        Args:
+            query: Search query text
+            top_k: Number of results to return
+            namespace: Namespace to search
+            metadata_filter: Optional Pinecone-style metadata filter
+
+        Returns:
+            Hits {"_id", "_score", "fields"} sorted by score
+        """
+        terms = set(tokenize(query))
+
+        with self._lock:
+            self._refresh(namespace)
+            ns = self._namespaces.get(namespace)
+            if ns is None or not ns.live_count or not terms:
+                return []
+
+            n_rows = len(ns.ids)
+            alive = np.frombuffer(ns.alive, dtype=np.uint8)
+            lengths = np.frombuffer(ns.lengths, dtype=np.uint32).astype(np.float32)
+            avg_length = ns.live_length / ns.live_count or 1.0
+            norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+
+            scores = np.zeros(n_rows, dtype=np.float32)
+            for term in terms:
+                postings = ns.postings.get(term)
+                if postings is None:
+                    continue
+                rows = np.frombuffer(postings[0], dtype=np.uint32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                df = int(alive[rows].sum())
+                if not df:
+                    continue
+                idf = math.log(1 + (ns.live_count - df + 0.5) / (df + 0.5))
+                # Each row appears once per term, so plain fancy-index add is safe
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+            scores *= alive
+            candidates = np.flatnonzero(scores > 0)
+            if metadata_filter:
+                candidates = np.array(
+                    [row for row in candidates if matches_filter(ns.fields[row], metadata_filter)],
+                    dtype=np.int64
+                )
+            if not len(candidates):
+                return []
+
+            k = min(top_k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                {
+                    "_id": ns.ids[row],
+                    "_score": float(scores[row]),
+                    "fields": dict(ns.fields[row])
+                }
+                for row in top
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-namespace counts in the same shape as describe_index_stats.
+
+        Returns:
+            Dictionary with namespaces, total documents and vocabulary sizes
+        """
+        with self._lock:
+            if self.persist_dir:
+                for namespace in set(os.listdir(self.persist_dir)) | set(self._namespaces):
+                    self._refresh(namespace)
+            namespaces = {
+                name: {
+                    "vector_count": ns.live_count,
+                    "deleted_rows": ns.dead_count,
+                    "terms": len(ns.postings)
+                }
+                for name, ns in self._namespaces.items()
+            }
+        return {
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())
+        }
+
+    def _append_log(self, namespace: str, entries: List[Dict[str, Any]]) -> None:
+        """Append entries to the namespace log (caller holds both locks)."""
+        if not self.persist_dir:
+            return
+        path = self._log_path(namespace)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries).encode("utf-8")
+        with open(path, "ab") as f:
+            f.write(data)
+        if namespace not in self._log_state:
+            # This write created the log: everything in it is already applied
+            stat = os.stat(path)
+            if stat.st_size == len(data):
+                self._log_state[namespace] = (stat.st_ino, stat.st_size)
+
+    def _maybe_compact(self, namespace: str) -> None:
+        """Compact once tombstoned rows outnumber live ones (caller holds the lock)."""
+        ns = self._namespaces[namespace]
+        if ns.dead_count > max(ns.live_count, 1000):
+            self.compact(namespace)
+
+    def compact(self, namespace: str = "default") -> None:
+        """
+        Drop tombstoned rows from memory and rewrite the namespace log
+        with live documents only. Entries other workers appended are
+        replayed first, under the write lock, so none are dropped.
+
+        Args:
+            namespace: Namespace to compact
+        """
+        with self._lock, self._log_lock(namespace):
+            self._refresh(namespace)
+            old = self._namespaces.get(namespace)
+            if old is None:
+                return
+            new = _BM25Namespace()
+            entries = []
+            # Rebuild term frequencies per live row from the postings
+            row_tfs: Dict[int, Dict[str, int]] = {row: {} for row in old.rows.values()}
+            for term, (rows, tfs) in old.postings.items():
+                for row, tf in zip(rows, tfs):
+                    if row in row_tfs:
+                        row_tfs[row][term] = tf
+            for row in sorted(row_tfs):
+                entry = {"op": "add", "id": old.ids[row], "fields": old.fields[row], "tf": row_tfs[row]}
+                new.add(entry["id"], entry["fields"], entry["tf"])
+                entries.append(entry)
+            self._namespaces[namespace] = new
+
+            if self.persist_dir:
+                path = self._log_path(namespace)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                os.replace(f"{path}.tmp", path)
+                stat = os.stat(path)
+                self._log_state[namespace] = (stat.st_ino, stat.st_size)
+            logger.info(f"Compacted BM25 namespace {namespace}: {old.dead_count} rows dropped")
+
+    def _load(self) -> None:
+        """Replay every namespace log found in persist_dir."""
+        for namespace in sorted(os.listdir(self.persist_dir)):
+            if os.path.isfile(self._log_path(namespace)):
+                self._refresh(namespace)
+
+    def _refresh(self, namespace: str) -> None:
+        """
+        Bring a namespace up to date with its log (caller holds the lock):
+        replay lines appended since the last read, reload a log that was
+        rewritten (compacted elsewhere), drop a namespace whose log was
+        removed. Costs one stat() when nothing changed.
+
+        Args:
+            namespace: Namespace to refresh
+        """
+        if not self.persist_dir:
+            return
+        path = self._log_path(namespace)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if self._log_state.pop(namespace, None) is not None:
+                # Cleared by another process
+                self._namespaces.pop(namespace, None)
+            return
+
+        state = self._log_state.get(namespace)
+        if state is not None and state[0] == stat.st_ino and state[1] == stat.st_size:
+            return
+        if state is None or state[0] != stat.st_ino or stat.st_size < state[1]:
+            ns = _BM25Namespace()
+            offset = 0
+            own_entries = False
+        else:
+            ns = self._namespaces.setdefault(namespace, _BM25Namespace())
+            offset = state[1]
+            own_entries = True
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; read it next time
+                    break
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn line from an interrupted write
+                    logger.warning(f"Skipping unreadable line of {path} ending at byte {offset}")
+                    continue
+                if own_entries and entry.get("writer") == self._writer:
+                    continue
+                if entry["op"] == "add":
+                    ns.add(entry["id"], entry["fields"], entry["tf"])
+                elif entry["op"] == "delete":
+                    for doc_id in entry["ids"]:
+                        ns.remove(doc_id)
+
+        self._namespaces[namespace] = ns
+        self._log_state[namespace] = (stat.st_ino, offset)
+        if state is None or not own_entries:
+            logger.info(f"Loaded BM25 namespace {namespace} ({ns.live_count} documents)")
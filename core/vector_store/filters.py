@@ -0,0 +1,58 @@
+"""
+Metadata Filters - Evaluate Pinecone-style filter expressions in process.
+"""
+
+from typing import Any, Dict
+
+def matches_filter(fields: Dict[str, Any], metadata_filter: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter against a record's fields.
+    Supports $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $exists, $and and $or;
+    a bare value means $eq.
+
+    Args:
+        fields: Record metadata
+        metadata_filter: Filter expression
+
+    Returns:
+        True if the record matches
+    """
+    for key, condition in metadata_filter.items():
+        if key == "$and":
+            if not all(matches_filter(fields, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(fields, sub) for sub in condition):
+                return False
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        value = fields.get(key)
+        for op, expected in condition.items():
+            if op == "$exists":
+                ok = (key in fields) == bool(expected)
+            elif key not in fields:
+                ok = op in ("$ne", "$nin")
+            elif op == "$eq":
+                ok = value == expected
+            elif op == "$ne":
+                ok = value != expected
+            elif op == "$in":
+                ok = value in expected
+            elif op == "$nin":
+                ok = value not in expected
+            elif op == "$gt":
+                ok = value > expected
+            elif op == "$gte":
+                ok = value >= expected
+            elif op == "$lt":
+                ok = value < expected
+            elif op == "$lte":
+                ok = value <= expected
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not ok:
+                return False
+    return True
@@ -0,0 +1,162 @@
+"""
+Result Fusion - Combine ranked hit lists from several retrievers.
+Dense and lexical scores live on different scales (cosine vs BM25), so
+comparing raw `_score` values lets one retriever dominate. Rank-based (RRF)
+and normalized (weighted min-max) fusion put them on a common footing.
+Scoring is vectorized with NumPy over a (queries x lists x candidates) tensor
+so many queries can be fused in one call.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "max" keeps the highest raw score per ID (the original merge behaviour)
+FUSION_STRATEGIES = ("rrf", "weighted", "max")
+
+def fuse(
+    result_lists: Sequence[List[Dict[str, Any]]],
+    strategy: str = "rrf",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = 60,
+    top_k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fuse the hit lists of one query.
+
+    Args:
+        result_lists: Hit lists ({"_id", "_score", "fields"}), each sorted best first
+        strategy: "rrf", "weighted" or "max"
+        weights: Weight per list (defaults to equal weights)
+        rrf_k: RRF smoothing constant
+        top_k: Number of fused hits to return (None returns all)
+
+    Returns:
+        Deduplicated hits sorted by fused score, with `_score` set to it and
+        `_ranks` holding the zero-based rank in each input list (None if absent)
+    """
+    return fuse_batch([result_lists], strategy, weights, rrf_k, top_k)[0]
+
+def fuse_batch(
+    batch: Sequence[Sequence[List[Dict[str, Any]]]],
+    strategy: str = "rrf",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = 60,
+    top_k: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Fuse the hit lists of several queries at once.
+
+    Args:
+        batch: For each query, its hit lists (all queries must have the same number of lists)
+        strategy: "rrf", "weighted" or "max"
+        weights: Weight per list (defaults to equal weights)
+        rrf_k: RRF smoothing constant
+        top_k: Number of fused hits to return per query (None returns all)
+
+    Returns:
+        For each query, deduplicated hits sorted by fused score
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy} (expected one of {FUSION_STRATEGIES})")
+    if not batch:
+        return []
+
+    n_lists = len(batch[0])
+    if any(len(lists) != n_lists for lists in batch):
+        raise ValueError("Every query in a batch must have the same number of result lists")
+    w = np.ones(n_lists, dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    if w.shape != (n_lists,):
+        raise ValueError(f"Expected {n_lists} weights, got {len(w)}")
+
+    # Candidate columns per query: first occurrence of each ID wins the hit dict
+    candidates: List[List[Dict[str, Any]]] = []
+    columns: List[Dict[str, int]] = []
+    for lists in batch:
+        hits, column = [], {}
+        for results in lists:
+            for hit in results:
+                if hit["_id"] not in column:
+                    column[hit["_id"]] = len(hits)
+                    hits.append(hit)
+        candidates.append(hits)
+        columns.append(column)
+
+    n_queries = len(batch)
+    width = max((len(hits) for hits in candidates), default=0)
+    if width == 0:
+        return [[] for _ in batch]
+
+    # ranks/scores[q, l, c]: rank and raw score of candidate c in list l of query q
+    ranks = np.full((n_queries, n_lists, width), np.inf, dtype=np.float32)
+    scores = np.full((n_queries, n_lists, width), np.nan, dtype=np.float32)
+    for q, lists in enumerate(batch):
+        column = columns[q]
+        for l, results in enumerate(lists):
+            if not results:
+                continue
+            cols = [column[hit["_id"]] for hit in results]
+            # A list may repeat an ID; keep its best (first) rank
+            ranks[q, l, cols[::-1]] = np.arange(len(results), 0, -1, dtype=np.float32) - 1
+            scores[q, l, cols[::-1]] = [hit["_score"] for hit in results[::-1]]
+
+    fused = _score(strategy, ranks, scores, w, rrf_k)
+    # Padding columns never win
+    valid = np.arange(width)[None, :] < np.array([len(h) for h in candidates])[:, None]
+    fused = np.where(valid, fused, -np.inf)
+
+    order = np.argsort(-fused, axis=1, kind="stable")
+    output = []
+    for q, hits in enumerate(candidates):
+        limit = len(hits) if top_k is None else min(top_k, len(hits))
+        output.append([
+            {
+                **hits[c],
+                "_score": float(fused[q, c]),
+                "_ranks": [None if np.isinf(r) else int(r) for r in ranks[q, :, c]]
+            }
+            for c in order[q, :limit]
+        ])
+    return output
+
+def _score(
+    strategy: str,
+    ranks: np.ndarray,
+    scores: np.ndarray,
+    weights: np.ndarray,
+    rrf_k: int
+) -> np.ndarray:
+    """
+    Compute fused scores.
+
+    Args:
+        strategy: Fusion strategy
+        ranks: (queries, lists, candidates) zero-based ranks, inf where absent
+        scores: (queries, lists, candidates) raw scores, nan where absent
+        weights: (lists,) list weights
+        rrf_k: RRF smoothing constant
+
+    Returns:
+        (queries, candidates) fused scores
+    """
+    w = weights[None, :, None]
+    if strategy == "rrf":
+        # 1 / (k + rank), rank starting at 1; absent entries contribute 0
+        return np.sum(w / (rrf_k + ranks + 1), axis=1)
+
+    if strategy == "weighted":
+        present = ~np.isnan(scores)
+        with np.errstate(invalid="ignore"):
+            low = np.nanmin(np.where(present, scores, np.inf), axis=2, keepdims=True)
+            high = np.nanmax(np.where(present, scores, -np.inf), axis=2, keepdims=True)
+        spread = high - low
+        # A list whose hits all tie maps them to 1.0
+        normalized = np.where(spread > 0, (scores - low) / np.where(spread > 0, spread, 1), 1.0)
+        normalized = np.where(present, normalized, 0.0)
+        return np.sum(w * normalized, axis=1) / weights.sum()
+
+    # "max": highest raw score across lists
+    return np.max(np.where(np.isnan(scores), -np.inf, scores), axis=1)
@@ -0,0 +1,66 @@
+"""
+Local Rerank - Network-free lexical rescoring of rerank candidates.
+Used as the fallback when the hosted reranker is slow, failing or behind an
+open circuit breaker. Candidates are rescored with BM25 (statistics taken
+from the candidate set itself) plus the share of query terms they cover.
+"""
+
+import math
+from collections import Counter
+from typing import List, Dict, Any
+
+from core.vector_store.bm25_index import tokenize
+
+def lexical_rerank(
+    query: str,
+    documents: List[Dict[str, Any]],
+    top_n: int = 5,
+    k1: float = 1.5,
+    b: float = 0.75
+) -> List[Dict[str, Any]]:
+    """
+    Rescore candidate documents against the query.
+
+    Args:
+        query: Search query
+        documents: Candidates as {"_id", "chunk_text", **fields}
+        top_n: Number of results to return
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization
+
+    Returns:
+        List of {"score", "index", "document"} dicts, best first
+    """
+    if not documents:
+        return []
+    query_terms = set(tokenize(query))
+    doc_terms = [Counter(tokenize(doc.get("chunk_text", ""))) for doc in documents]
+    lengths = [sum(tf.values()) for tf in doc_terms]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    n_docs = len(documents)
+    idf = {
+        term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for term in query_terms
+        for df in [sum(term in tf for tf in doc_terms)]
+    }
+
+    scores = []
+    for tf, length in zip(doc_terms, lengths):
+        norm = k1 * (1 - b + b * length / avg_length)
+        bm25 = sum(
+            idf[term] * tf[term] * (k1 + 1) / (tf[term] + norm)
+            for term in query_terms
+            if term in tf
+        )
+        coverage = sum(term in tf for term in query_terms) / len(query_terms) if query_terms else 0.0
+        scores.append(bm25 + coverage)
+
+    order = sorted(range(n_docs), key=lambda i: scores[i], reverse=True)[:top_n]
+    return [
+        {
+            "score": scores[i],
+            "index": i,
+            "document": documents[i]
+        }
+        for i in order
+    ]
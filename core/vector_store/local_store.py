@@ -0,0 +1,598 @@
+"""
+Local Vector Store - In-process NumPy implementation of VectorStore.
+Dense vectors are hashed character n-grams (no network, no model download),
+lexical search is the Vietnamese BM25 index. Each namespace is persisted
+next to the BM25 log as an append-only JSON Lines log of upserts and
+deletes plus an append-only file of raw float32 vectors, one row per
+upsert; both are rewritten once superseded rows dominate.
+"""
+
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from core.utils.text_vectors import HashedNgramVectorizer
+from core.vector_store.base import VectorStore
+from core.vector_store.bm25_index import BM25Index
+from core.vector_store.filters import matches_filter
+from core.utils.metrics import track_stage, record_results
+
+logger = logging.getLogger(__name__)
+
+class _Namespace:
+    """
+    Records of one namespace. The dense matrix is stored feature-major, shape
+    (n_features, capacity): column i belongs to ids[i], and a query only
+    touches the contiguous rows of its own non-zero features. The capacity
+    doubles when it runs out, so appends copy the matrix O(log n) times.
+    """
+
+    def __init__(self, n_features: int):
+        self.ids: List[str] = []
+        self.fields: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        self._matrix = np.zeros((n_features, 0), dtype=np.float32)
+        # Rows in the persisted vector file, superseded and deleted ones included
+        self.stored_rows = 0
+        # Bumped by every rewrite of the persisted files, names the vector file
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dense(self) -> np.ndarray:
+        """The filled columns of the matrix (a view)."""
+        return self._matrix[:, :len(self.ids)]
+
+    def append(self, ids: List[str], fields: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Append new records; vectors has shape (len(ids), n_features)."""
+        start = len(self.ids)
+        end = start + len(ids)
+        if end > self._matrix.shape[1]:
+            capacity = max(end, 2 * self._matrix.shape[1], 64)
+            grown = np.zeros((self._matrix.shape[0], capacity), dtype=np.float32)
+            grown[:, :start] = self._matrix[:, :start]
+            self._matrix = grown
+        self._matrix[:, start:end] = vectors.T
+        for doc_id, record_fields in zip(ids, fields):
+            self.rows[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.fields.append(record_fields)
+
+    def replace(self, row: int, fields: Dict[str, Any], vector: np.ndarray) -> None:
+        """Overwrite the record at a row."""
+        self.fields[row] = fields
+        self._matrix[:, row] = vector
+
+    def keep(self, rows: List[int]) -> None:
+        """Keep only the given rows, in order."""
+        self.ids = [self.ids[row] for row in rows]
+        self.fields = [self.fields[row] for row in rows]
+        self._matrix = self._matrix[:, rows]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+class LocalVectorStore(VectorStore):
+    """
+    Brute-force hybrid search over in-memory matrices. Suited to the corpus
+    sizes of this platform (tens of thousands of chunks), local development,
+    tests and benchmarks.
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        n_features: int = 1024,
+        bm25_index: Optional[BM25Index] = None
+    ):
+        """
+        Initialize the store and load persisted namespaces.
+
+        Args:
+            persist_dir: Directory for persisted namespaces (None keeps everything in memory)
+            n_features: Dimension of the dense vectors
+            bm25_index: Lexical index (defaults to a BM25Index sharing persist_dir)
+        """
+        super().__init__()
+        self.persist_dir = persist_dir
+        self.n_features = n_features
+        self.vectorizer = HashedNgramVectorizer(n_features=n_features)
+        self.bm25_index = bm25_index or BM25Index(persist_dir=persist_dir)
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self._load()
+
+        logger.info(
+            f"Local vector store initialized ({n_features} dims, "
+            f"{sum(len(ns) for ns in self._namespaces.values())} vectors)"
+        )
+
+    def _lexical_vector(self, text: str) -> np.ndarray:
+        """
+        Hashed word-count vector with sublinear term frequency, L2-normalized.
+
+        Args:
+            text: Input text
+
+        Returns:
+            float32 vector of length n_features
+        """
+        vec = np.zeros(self.n_features, dtype=np.float32)
+        for word in self.vectorizer.normalize(text).split():
+            vec[zlib.crc32(word.encode("utf-8")) % self.n_features] += 1.0
+        np.log1p(vec, out=vec)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def upsert_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        namespace: str = "default",
+        batch_size: int = 96
+    ) -> Dict[str, int]:
+        """
+        Insert or replace documents. Records use the same flat format as
+        PineconeService: {"id", "chunk_text", **metadata}.
+
+        Args:
+            documents: Records to upsert
+            namespace: Namespace for organizing vectors
+            batch_size: Unused, kept for interface compatibility
+
+        Returns:
+            Dictionary with upserted counts
+        """
+        texts = [doc.get("chunk_text", "") for doc in documents]
+        dense = self.vectorizer.transform(texts)
+        self.bm25_index.add_documents(documents, namespace)
+
+        with self._lock:
+            ns = self._namespaces.setdefault(namespace, _Namespace(self.n_features))
+            # Last occurrence wins when a batch repeats an ID
+            latest = {str(doc["id"]): i for i, doc in enumerate(documents)}
+            entries = []
+            new_ids, new_fields, new_rows = [], [], []
+            for doc_id, i in latest.items():
+                fields = {k: v for k, v in documents[i].items() if k != "id"}
+                entries.append({"op": "add", "id": doc_id, "fields": fields})
+                row = ns.rows.get(doc_id)
+                if row is None:
+                    new_ids.append(doc_id)
+                    new_fields.append(fields)
+                    new_rows.append(i)
+                else:
+                    ns.replace(row, fields, dense[i])
+            if new_ids:
+                ns.append(new_ids, new_fields, dense[new_rows])
+            self._append_log(namespace, entries, dense[list(latest.values())])
+
+        logger.info(f"Upserted {len(documents)} documents to local namespace: {namespace}")
+        self._notify_write(namespace)
+
+        return {
+            "dense_count": len(documents),
+            "sparse_count": len(documents)
+        }
+
+    def hybrid_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: str = "default",
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        fusion: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score every row of the namespace by dense cosine similarity, run BM25
+        for the lexical side and fuse the top_k of each.
+
+        Args:
+            query: Search query text
+            top_k: Number of results from each representation
+            namespace: Namespace to search
+            metadata_filter: Optional Pinecone-style metadata filter
+            timeout: Unused, searches are in-process
+            fusion: Fusion strategy ("rrf", "weighted", "max"), defaults to FUSION_STRATEGY
+
+        Returns:
+            Fused and deduplicated hits sorted by score
+        """
+        with track_stage("dense_search"):
+            dense_results = self._dense_search(query, top_k, namespace, metadata_filter)
+        if dense_results is None:
+            return []
+        record_results("dense_search", len(dense_results))
+
+        with track_stage("sparse_search"):
+            sparse_results = self.bm25_index.search(query, top_k, namespace, metadata_filter)
+        record_results("sparse_search", len(sparse_results))
+
+        merged_results = self._fuse_results(dense_results, sparse_results, fusion)
+        logger.info(f"Local hybrid search returned {len(merged_results)} unique results")
+        return merged_results
+
+    def _dense_search(
+        self,
+        query: str,
+        top_k: int,
+        namespace: str,
+        metadata_filter: Optional[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Score the namespace's rows by dense cosine similarity.
+
+        Args:
+            query: Search query text
+            top_k: Number of hits to return
+            namespace: Namespace to search
+            metadata_filter: Optional Pinecone-style metadata filter
+
+        Returns:
+            Top hits, or None if the namespace is empty or nothing matches the filter
+        """
+        dense_query = self.vectorizer.transform_one(query)
+        dense_features = np.flatnonzero(dense_query)
+
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None or not len(ns):
+                return None
+            if metadata_filter:
+                candidates = np.array(
+                    [i for i in range(len(ns)) if matches_filter(ns.fields[i], metadata_filter)],
+                    dtype=np.int64
+                )
+                if not len(candidates):
+                    return None
+            else:
+                candidates = np.arange(len(ns))
+
+            # Only the query's non-zero features contribute to the dot product
+            dense_scores = dense_query[dense_features] @ ns.dense[dense_features]
+            if metadata_filter:
+                dense_scores = dense_scores[candidates]
+            return self._top_hits(ns, candidates, dense_scores, top_k)
+
+    @staticmethod
+    def _top_hits(
+        ns: _Namespace,
+        candidates: np.ndarray,
+        scores: np.ndarray,
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Select the top_k rows by score as hit dicts (zero scores are dropped).
+
+        Args:
+            ns: Namespace the rows belong to
+            candidates: Row numbers that were scored
+            scores: Score per candidate
+            top_k: Number of hits to return
+
+        Returns:
+            Hits in the Pinecone dict format, best first
+        """
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "_id": ns.ids[candidates[i]],
+                "_score": float(scores[i]),
+                "fields": dict(ns.fields[candidates[i]])
+            }
+            for i in top
+            if scores[i] > 0
+        ]
+
+    def rerank_results(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_n: int = 5,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rerank hits by the mean of dense and lexical similarity to the query.
+
+        Args:
+            query: Original search query
+            results: Hits from hybrid_search
+            top_n: Number of top results to return
+            model: Unused, kept for interface compatibility
+
+        Returns:
+            List of {"score", "index", "document"} dicts, best first
+        """
+        if not results:
+            return []
+        documents = [
+            {
+                "_id": r["_id"],
+                "chunk_text": r["fields"].get("chunk_text", ""),
+                **r["fields"]
+            }
+            for r in results
+        ]
+        texts = [doc["chunk_text"] for doc in documents]
+        dense_scores = self.vectorizer.transform(texts) @ self.vectorizer.transform_one(query)
+        lexical_scores = np.vstack([self._lexical_vector(t) for t in texts]) @ self._lexical_vector(query)
+        scores = (dense_scores + lexical_scores) / 2
+
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        return [
+            {
+                "score": float(scores[i]),
+                "index": int(i),
+                "document": documents[i]
+            }
+            for i in order
+        ]
+
+    def delete_vectors(self, ids: List[str], namespace: str = "default") -> None:
+        """
+        Delete vectors by IDs.
+
+        Args:
+            ids: List of vector IDs to delete
+            namespace: Namespace containing the vectors
+        """
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                return
+            removed = [doc_id for doc_id in dict.fromkeys(ids) if doc_id in ns.rows]
+            drop = {ns.rows[doc_id] for doc_id in removed}
+            if drop:
+                ns.keep([row for row in range(len(ns)) if row not in drop])
+                self._append_log(namespace, [{"op": "delete", "ids": removed}])
+            self.bm25_index.delete_documents(ids, namespace)
+            logger.info(f"Deleted {len(drop)} vectors from local namespace: {namespace}")
+
+        self._notify_write(namespace)
+
+    def delete_all_vectors(self, namespace: str = "default") -> None:
+        """
+        Delete all vectors in a namespace.
+
+        Args:
+            namespace: Namespace to clear
+        """
+        with self._lock:
+            self._namespaces[namespace] = _Namespace(self.n_features)
+            self._remove_files(namespace)
+            self.bm25_index.clear(namespace)
+        logger.warning(f"Deleted all vectors from local namespace: {namespace}")
+        self._notify_write(namespace)
+
+    def get_index_stats(self) -> Dict[str, Any]:
+        """
+        Get vector counts in the same shape as Pinecone's describe_index_stats.
+
+        Returns:
+            Dictionary with stats for the dense and sparse representations
+        """
+        with self._lock:
+            namespaces = {name: {"vector_count": len(ns)} for name, ns in self._namespaces.items()}
+        total = sum(ns["vector_count"] for ns in namespaces.values())
+        stats = {
+            "dimension": self.n_features,
+            "namespaces": namespaces,
+            "total_vector_count": total
+        }
+        return {"dense": stats, "sparse": self.bm25_index.stats()}
+
+    def _namespace_dir(self, namespace: str) -> str:
+        return os.path.join(self.persist_dir or "", namespace)
+
+    def _log_path(self, namespace: str) -> str:
+        return os.path.join(self._namespace_dir(namespace), "records.jsonl")
+
+    def _vectors_path(self, namespace: str, generation: int) -> str:
+        return os.path.join(self._namespace_dir(namespace), f"dense-{generation}.f32")
+
+    def _append_log(
+        self,
+        namespace: str,
+        entries: List[Dict[str, Any]],
+        vectors: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Persist a write (caller holds the lock): vectors are appended to the
+        vector file first, then the entries, which point at their rows, to the
+        log. A write torn in between leaves unreferenced rows, never entries
+        without a vector.
+
+        Args:
+            namespace: Namespace written to
+            entries: "add" entries (one per row of vectors) or a "delete" entry
+            vectors: Vectors of the "add" entries, shape (len(entries), n_features)
+        """
+        if not self.persist_dir:
+            return
+        if not os.path.isfile(self._log_path(namespace)):
+            # First write: the snapshot already holds these entries
+            self._compact(namespace)
+            return
+
+        ns = self._namespaces[namespace]
+        if vectors is not None:
+            for offset, entry in enumerate(entries):
+                entry["row"] = ns.stored_rows + offset
+            with open(self._vectors_path(namespace, ns.generation), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            ns.stored_rows += len(entries)
+        with open(self._log_path(namespace), "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        self._maybe_compact(namespace)
+
+    def _maybe_compact(self, namespace: str) -> None:
+        """Compact once superseded and deleted rows outnumber live ones (caller holds the lock)."""
+        ns = self._namespaces[namespace]
+        if ns.stored_rows - len(ns) > max(len(ns), 1000):
+            self._compact(namespace)
+
+    def _compact(self, namespace: str) -> None:
+        """
+        Rewrite a namespace's files with its live records only (caller holds
+        the lock). The vectors go to a new file named in the log's first line,
+        and the log is replaced atomically, so a crash at any point leaves a
+        log and the vector file it names.
+
+        Args:
+            namespace: Namespace to compact
+        """
+        ns = self._namespaces[namespace]
+        ns_dir = self._namespace_dir(namespace)
+        os.makedirs(ns_dir, exist_ok=True)
+        generation = ns.generation + 1
+
+        with open(self._vectors_path(namespace, generation), "wb") as f:
+            f.write(np.ascontiguousarray(ns.dense.T).tobytes())
+        path = self._log_path(namespace)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "snapshot", "generation": generation, "n_features": self.n_features}) + "\n")
+            for row, (doc_id, fields) in enumerate(zip(ns.ids, ns.fields)):
+                entry = {"op": "add", "id": doc_id, "fields": fields, "row": row}
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        os.replace(f"{path}.tmp", path)
+
+        dropped = ns.stored_rows - len(ns)
+        ns.generation = generation
+        ns.stored_rows = len(ns)
+        for name in os.listdir(ns_dir):
+            if name.startswith("dense-") and name != os.path.basename(self._vectors_path(namespace, generation)):
+                os.remove(os.path.join(ns_dir, name))
+        if dropped > 0:
+            logger.info(f"Compacted local namespace {namespace}: {dropped} rows dropped")
+
+    def _remove_files(self, namespace: str) -> None:
+        """Delete a namespace's persisted files (caller holds the lock)."""
+        if not self.persist_dir or not os.path.isdir(self._namespace_dir(namespace)):
+            return
+        ns_dir = self._namespace_dir(namespace)
+        for name in os.listdir(ns_dir):
+            if name == "records.jsonl" or name.startswith("dense-"):
+                os.remove(os.path.join(ns_dir, name))
+
+    def _load(self) -> None:
+        """Replay every namespace log found in persist_dir."""
+        for namespace in sorted(os.listdir(self.persist_dir)):
+            if not os.path.isfile(self._log_path(namespace)):
+                self._migrate_snapshot(namespace)
+            if not os.path.isfile(self._log_path(namespace)):
+                continue
+            try:
+                ns = self._replay(namespace)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Failed to load local namespace {namespace}: {e}")
+                continue
+            if ns is None:
+                continue
+            self._namespaces[namespace] = ns
+            self._maybe_compact(namespace)
+            logger.info(f"Loaded local namespace {namespace} ({len(ns)} vectors)")
+
+    def _migrate_snapshot(self, namespace: str) -> None:
+        """Convert a namespace saved as dense.npy + records.json to the log format."""
+        ns_dir = self._namespace_dir(namespace)
+        records_path = os.path.join(ns_dir, "records.json")
+        dense_path = os.path.join(ns_dir, "dense.npy")
+        if not (os.path.isfile(records_path) and os.path.isfile(dense_path)):
+            return
+        try:
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            dense = np.load(dense_path)
+            if dense.shape != (self.n_features, len(records["ids"])):
+                logger.error(f"Not migrating local namespace {namespace}: stored shape {dense.shape}")
+                return
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to migrate local namespace {namespace}: {e}")
+            return
+        ns = _Namespace(self.n_features)
+        ns.append(records["ids"], records["fields"], dense.T)
+        self._namespaces[namespace] = ns
+        self._compact(namespace)
+        os.remove(records_path)
+        os.remove(dense_path)
+        logger.info(f"Migrated local namespace {namespace} to the records log")
+
+    def _replay(self, namespace: str) -> Optional[_Namespace]:
+        """
+        Rebuild a namespace from its log and vector file.
+
+        Args:
+            namespace: Namespace to load
+
+        Returns:
+            The namespace, or None if its files do not match this store
+        """
+        path = self._log_path(namespace)
+        header: Optional[Dict[str, Any]] = None
+        # ID -> (vector row, fields); replacing an ID keeps its position
+        latest: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        complete_bytes = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.endswith("\n"):
+                    # A torn final line from an interrupted write: cut it so
+                    # the next append starts on a line of its own
+                    logger.warning(f"Dropping incomplete line {line_no} of {path}")
+                    os.truncate(path, complete_bytes)
+                    break
+                complete_bytes += len(line.encode("utf-8"))
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable line {line_no} of {path}")
+                    continue
+                if header is None:
+                    header = entry
+                elif entry["op"] == "add":
+                    latest[entry["id"]] = (entry["row"], entry["fields"])
+                elif entry["op"] == "delete":
+                    for doc_id in entry["ids"]:
+                        latest.pop(doc_id, None)
+
+        if header is None or header.get("op") != "snapshot" or header.get("n_features") != self.n_features:
+            logger.error(
+                f"Skipping local namespace {namespace}: stored dimension "
+                f"{header.get('n_features') if header else None} does not match {self.n_features}"
+            )
+            return None
+
+        vectors_path = self._vectors_path(namespace, header["generation"])
+        vectors = np.fromfile(vectors_path, dtype=np.float32)
+        stored_rows = vectors.size // self.n_features
+        if vectors.size % self.n_features:
+            # A torn final row: cut it so later appends stay aligned
+            os.truncate(vectors_path, stored_rows * self.n_features * vectors.itemsize)
+        vectors = vectors[:stored_rows * self.n_features].reshape(stored_rows, self.n_features)
+
+        ns = _Namespace(self.n_features)
+        ns.generation = header["generation"]
+        ns.stored_rows = stored_rows
+        records = [(doc_id, row, fields) for doc_id, (row, fields) in latest.items() if row < stored_rows]
+        if len(records) < len(latest):
+            logger.warning(f"Skipping {len(latest) - len(records)} records without a vector in {namespace}")
+        ns.append(
+            [doc_id for doc_id, _, _ in records],
+            [fields for _, _, fields in records],
+            vectors[[row for _, row, _ in records]]
+        )
+        return ns
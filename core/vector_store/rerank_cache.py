@@ -0,0 +1,117 @@
+"""
+Rerank Cache - Reuses cross-encoder scores across rerank calls.
+A reranker scores each (query, document) pair independently, so scores are
+stored per query as a map of chunk ID to score. A later candidate set that
+is a subset of a cached one is served entirely from cache; for a superset
+only the unseen chunks are sent to the reranker.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Tuple, Any, Optional
+
+from core.utils.cache import LRUCache
+from core.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+class RerankCache:
+    """
+    Bounded LRU of (model, query) -> {chunk_id: score}.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        max_ids_per_query: int = 256
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached queries (0 disables the cache)
+            ttl_seconds: Entry lifetime in seconds (None means no expiry)
+            max_ids_per_query: Maximum scores kept per query
+        """
+        self.scores = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds, name="rerank_cache")
+        self.max_ids_per_query = max_ids_per_query
+        self._lock = threading.Lock()
+        self.full_hits = 0
+        self.partial_hits = 0
+        self.pairs_reused = 0
+        self.pairs_scored = 0
+
+    def lookup(self, query: str, model: str, ids: List[str]) -> Tuple[Dict[str, float], List[str]]:
+        """
+        Split candidates into cached scores and IDs that still need scoring.
+
+        Args:
+            query: Processed query sent to the reranker
+            model: Reranking model
+            ids: Candidate chunk IDs
+
+        Returns:
+            (cached scores for known IDs, IDs missing from the cache)
+        """
+        cached = self.scores.get((model, query)) or {}
+        known = {doc_id: cached[doc_id] for doc_id in ids if doc_id in cached}
+        missing = [doc_id for doc_id in ids if doc_id not in cached]
+
+        with self._lock:
+            self.pairs_reused += len(known)
+            if known and not missing:
+                self.full_hits += 1
+            elif known:
+                self.partial_hits += 1
+        record_cache("rerank", "hit" if not missing else "partial" if known else "miss")
+        if known:
+            logger.info(f"Rerank cache reused {len(known)}/{len(ids)} scores")
+        return known, missing
+
+    def store(self, query: str, model: str, scores: Dict[str, float]) -> None:
+        """
+        Merge freshly computed scores into the query's entry.
+
+        Args:
+            query: Processed query sent to the reranker
+            model: Reranking model
+            scores: Chunk ID -> score
+        """
+        with self._lock:
+            self.pairs_scored += len(scores)
+        if not self.scores.enabled:
+            return
+        key = (model, query)
+        merged = dict(self.scores.get(key) or {})
+        merged.update(scores)
+        if len(merged) > self.max_ids_per_query:
+            # Keep the best-scoring chunks, the ones that matter for top_n
+            merged = dict(sorted(merged.items(), key=lambda item: item[1], reverse=True)[:self.max_ids_per_query])
+        self.scores.set(key, merged)
+
+    def clear(self) -> None:
+        """Remove all entries (chunk text may have changed)."""
+        self.scores.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Query-level LRU statistics plus pair-level reuse counters
+        """
+        stats = self.scores.stats()
+        # LRU hits/misses also count the reads made when merging scores
+        for key in ("hits", "misses", "hit_rate"):
+            stats.pop(key, None)
+        with self._lock:
+            total_pairs = self.pairs_reused + self.pairs_scored
+            stats.update({
+                "full_hits": self.full_hits,
+                "partial_hits": self.partial_hits,
+                "pairs_reused": self.pairs_reused,
+                "pairs_scored": self.pairs_scored,
+                "pair_reuse_rate": round(self.pairs_reused / total_pairs, 4) if total_pairs else 0.0
+            })
+        return stats
@@ -1,11 +1,18 @@
 import logging
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse
 from dotenv import load_dotenv
 import os
 import uvicorn
 from typing import List, Dict, Any
 from core.llm.config import Settings, get_settings
+from core.utils.metrics import REGISTRY
+from core.utils.warmup import WarmupState, warm_up
+from core.utils.concurrency import get_blocking_executor
+from core.document_processing.pdf_extractor import shutdown_pdf_executor
 
 # Import routers
 from routers import document_router, query_router, session_router
@@ -22,10 +29,31 @@ settings = get_settings()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Startup warmup progress, reported by /api/health
+warmup_state = WarmupState()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /api/health can answer "warming" meanwhile
+    warmup_task = None
+    if settings.WARMUP_ON_STARTUP:
+        warmup_task = asyncio.create_task(
+            warm_up(warmup_state, include_connections=settings.WARMUP_CONNECTIONS)
+        )
+    else:
+        warmup_state.ready = True
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    get_blocking_executor().shutdown(wait=False)
+    get_blocking_executor.cache_clear()
+    shutdown_pdf_executor()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
-    description=settings.API_DESCRIPTION
+    description=settings.API_DESCRIPTION,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -65,17 +93,30 @@ app.include_router(document_router.router, prefix="/api/documents", tags=["docum
 app.include_router(query_router.router, prefix="/api/query", tags=["query"])
 # app.include_router(document_manager.router, prefix="/api/manage", tags=["management"])  # TODO: Update for Pinecone
 
-# Add health check endpoint
+# Add health check endpoint (503 until the startup warmup has finished)
 @app.get("/api/health")
 async def health_check():
-    return {
-        "status": "ok",
+    if not warmup_state.ready:
+        status = "warming"
+    elif warmup_state.errors:
+        status = "degraded"
+    else:
+        status = "ok"
+    body = {
+        "status": status,
+        "warmup": warmup_state.to_dict(),
         "collection": {
             "name": settings.STORAGE_NAME,
             "display_name": settings.DISPLAY_NAME,
             "description": settings.DESCRIPTION
         }
     }
+    return JSONResponse(body, status_code=200 if warmup_state.ready else 503)
+
+# Per-stage latency, error, result count and cache counters (Prometheus text format)
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api")
 async def api_root():
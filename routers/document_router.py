@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks, Query, Request
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field, validator
-from core.pinecone.pinecone_service import PineconeService
+from core.vector_store import VectorStore
 from core.document_processing.document_processor import DocumentProcessor
-from core.utils.dependencies import get_pinecone_service, get_document_processor
+from core.utils.dependencies import get_vector_store, get_document_processor
 from core.llm.config import CollectionConfig, ChunkingConfig, get_settings
 import logging
 import os
@@ -468,7 +468,7 @@ async def get_documents_summary(
 @router.delete("/documents/{document_id}")
 async def delete_document(
     document_id: str,
-    pinecone_service: PineconeService = Depends(get_pinecone_service),
+    vector_store: VectorStore = Depends(get_vector_store),
     db: Session = Depends(get_db)
 ):
     """Delete a specific document and all its chunks from Pinecone and PostgreSQL."""
@@ -484,7 +484,7 @@ async def delete_document(
             ids_to_delete = [f"{document_id}-chunk_{i}" for i in range(int(db_doc.point_start), int(db_doc.point_end) + 1)]  # type: ignore
             
             # Delete from Pinecone
-            pinecone_service.delete_vectors(
+            vector_store.delete_vectors(
                 ids=ids_to_delete,
                 namespace=CollectionConfig.STORAGE_NAME
             )
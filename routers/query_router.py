@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, AsyncIterator, Literal
 from pydantic import BaseModel
 from core.query.query_service import QueryService
-from core.llm.llm_interface import RAGPromptManager
+from core.llm.llm_interface import RAGPromptManager, FALLBACK_ANSWER
 from core.utils.dependencies import get_query_service, get_prompt_manager
 from core.llm.config import get_settings, CollectionConfig
 from core.session_manager import ChatSessionManager
 from core.auth.simple_auth_router import get_current_user_from_session
+from core.utils.concurrency import run_blocking
+from core.utils.metrics import track_stage, start_request_timings, format_server_timing
+import json
 import logging
+import time
 
 router = APIRouter()
 settings = get_settings()
@@ -16,23 +21,112 @@ logger = logging.getLogger(__name__)
 # Initialize session manager
 session_manager = ChatSessionManager()
 
+# Answer returned when retrieval finds nothing
+NO_DOCUMENTS_ANSWER = "No relevant documents found for your query."
+
 class QueryInput(BaseModel):
     query: str
-    top_k: int = 12  # Optimized: Reduced from 15 for faster search
+    top_k: int = 8   # Optimized: Reduced from 12, rank fusion needs less over-fetching
     top_n: int = 4   # Optimized: Reduced from 5 for faster reranking
     temperature: float = 0.2  # Optimized: Increased for faster generation
     max_tokens: int = 600  # Optimized: Increased for more complete answers
     model: Optional[str] = None
     image_data: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
+    fusion: Optional[Literal["rrf", "weighted", "max"]] = None  # Defaults to FUSION_STRATEGY
+    debug: bool = False  # Return the per-stage timing breakdown in debug.timings
 
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
+    metadata: Optional[Dict[str, Any]] = None  # How retrieval was served (cache, rerank path)
+    debug: Optional[Dict[str, Any]] = None  # Per-stage timings in ms, when requested
+
+def _finish_timings(timings: Dict[str, float], started: float) -> Dict[str, float]:
+    """Round stage durations (ms) and add the request total."""
+    result = {stage: round(duration, 1) for stage, duration in timings.items()}
+    result["total"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+def _timing_response(
+    response: Response,
+    query_input: QueryInput,
+    timings: Dict[str, float],
+    started: float
+) -> Optional[Dict[str, Any]]:
+    """
+    Set the Server-Timing header and build the debug field.
+    
+    Returns:
+        {"timings": ...} if the client asked for debug output, else None
+    """
+    finished = _finish_timings(timings, started)
+    if settings.SERVER_TIMING_HEADER:
+        response.headers["Server-Timing"] = format_server_timing(finished)
+    return {"timings": finished} if query_input.debug else None
+
+def _save_exchange_to_session(
+    current_user: dict,
+    query_input: QueryInput,
+    model_name: str,
+    answer: str,
+    sources_count: int
+) -> None:
+    """
+    Save the user query and assistant answer to the chat session named in
+    query_input.context["session_id"]. Does nothing if no session_id is given.
+    Failures are logged and never propagate to the request.
+    """
+    session_id = None
+    if query_input.context and isinstance(query_input.context, dict):
+        session_id = query_input.context.get("session_id")
+    
+    if not session_id:
+        return
+    
+    user_id = current_user["id"]
+    try:
+        # Ensure session exists
+        session = session_manager.get_session(user_id, session_id)
+        if not session:
+            session = session_manager.create_session(user_id, session_id)
+            logger.info(f"Created new session {session_id} for user {user_id}")
+        
+        # Save user query
+        session_manager.add_message(
+            user_id=user_id,
+            session_id=session_id,
+            role="user",
+            content=query_input.query,
+            metadata={
+                "top_k": query_input.top_k,
+                "top_n": query_input.top_n,
+                "model": model_name,
+                "temperature": query_input.temperature
+            }
+        )
+        
+        # Save assistant answer
+        session_manager.add_message(
+            user_id=user_id,
+            session_id=session_id,
+            role="assistant",
+            content=answer,
+            metadata={
+                "sources_count": sources_count,
+                "model": model_name
+            }
+        )
+        
+        logger.info(f"Saved query and answer to session {session_id}")
+    except Exception as e:
+        logger.error(f"Failed to save to session: {e}")
+        # Don't fail the request if session save fails
 
 @router.post("/rag", response_model=QueryResponse)
 async def query_rag(
     query_input: QueryInput,
+    response: Response,
     query_service: QueryService = Depends(get_query_service),
     prompt_manager: RAGPromptManager = Depends(get_prompt_manager),
     current_user: dict = Depends(get_current_user_from_session)
@@ -44,21 +138,33 @@ async def query_rag(
     3. Rerank documents
     4. Generate answer using LLM
     5. Save query and answer to session (if session_id provided)
+    
+    Blocking work runs in the shared executor and the LLM call uses the
+    async client, so the event loop is never blocked by a single request.
+    Stage durations are sent in the Server-Timing header, and in
+    debug.timings when query_input.debug is set.
     """
     logger.info(f"Query from user {current_user['username']}: {query_input.query}")
+    started = time.perf_counter()
+    timings = start_request_timings()
     
     # Query service handles: preprocessing → hybrid search → reranking → formatting
-    documents = query_service.query(
+    diagnostics: Dict[str, Any] = {}
+    documents = await query_service.aquery(
         query=query_input.query,
         top_k=query_input.top_k,
         top_n=query_input.top_n,
-        namespace=CollectionConfig.STORAGE_NAME
+        namespace=CollectionConfig.STORAGE_NAME,
+        fusion=query_input.fusion,
+        diagnostics=diagnostics
     )
     
     if not documents:
         return QueryResponse(
-            answer="No relevant documents found for your query.",
-            sources=[]
+            answer=NO_DOCUMENTS_ANSWER,
+            sources=[],
+            metadata=diagnostics,
+            debug=_timing_response(response, query_input, timings, started)
         )
     
     # Log additional parameters
@@ -70,14 +176,15 @@ async def query_rag(
     
     # Generate answer using LLM (default to qwen3-max for better quality)
     model_name = query_input.model if query_input.model else "qwen3-max"
-    result = prompt_manager.generate_answer(
+    result = await prompt_manager.agenerate_answer(
         query=query_input.query,
         documents=documents,
         temperature=query_input.temperature,
         max_tokens=query_input.max_tokens,
         model=model_name,
         image_data=query_input.image_data,
-        context=query_input.context
+        context=query_input.context,
+        diagnostics=diagnostics
     )
     
     # Enhance source information
@@ -88,52 +195,115 @@ async def query_rag(
             # Add the namespace to the source for clarity
             source["namespace"] = metadata.get("namespace", CollectionConfig.STORAGE_NAME)
     
-    # Save to session if session_id is provided in context
-    session_id = None
-    if query_input.context and isinstance(query_input.context, dict):
-        session_id = query_input.context.get("session_id")
+    # Save to session if session_id is provided in context (file I/O, off the event loop)
+    with track_stage("session_write"):
+        await run_blocking(
+            _save_exchange_to_session,
+            current_user,
+            query_input,
+            model_name,
+            result["answer"],
+            len(sources)
+        )
+    
+    return QueryResponse(
+        **result,
+        metadata=diagnostics,
+        debug=_timing_response(response, query_input, timings, started)
+    )
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/rag/stream")
+async def query_rag_stream(
+    query_input: QueryInput,
+    query_service: QueryService = Depends(get_query_service),
+    prompt_manager: RAGPromptManager = Depends(get_prompt_manager),
+    current_user: dict = Depends(get_current_user_from_session)
+) -> StreamingResponse:
+    """
+    Process a RAG query and stream the answer as Server-Sent Events:
+    1. "sources" - retrieved documents, sent as soon as retrieval finishes
+    2. "token"   - LLM text deltas, forwarded as they arrive
+    3. "done"    - the complete answer and request metadata, sent once the answer is saved to the session
+    An "error" event is sent instead of "done" if retrieval or generation fails.
+    Headers go out before any stage has run, so timings are not sent as
+    Server-Timing here; with query_input.debug they are in the "done" event.
+    """
+    logger.info(f"Streaming query from user {current_user['username']}: {query_input.query}")
+    model_name = query_input.model if query_input.model else "qwen3-max"
     
-    if session_id:
-        user_id = current_user["id"]
+    async def event_stream() -> AsyncIterator[str]:
+        started = time.perf_counter()
+        timings = start_request_timings()
+        diagnostics: Dict[str, Any] = {}
+        answer_parts: List[str] = []
         try:
-            # Ensure session exists
-            session = session_manager.get_session(user_id, session_id)
-            if not session:
-                session = session_manager.create_session(user_id, session_id)
-                logger.info(f"Created new session {session_id} for user {user_id}")
-            
-            # Save user query
-            session_manager.add_message(
-                user_id=user_id,
-                session_id=session_id,
-                role="user",
-                content=query_input.query,
-                metadata={
-                    "top_k": query_input.top_k,
-                    "top_n": query_input.top_n,
-                    "model": model_name,
-                    "temperature": query_input.temperature
-                }
+            documents = await query_service.aquery(
+                query=query_input.query,
+                top_k=query_input.top_k,
+                top_n=query_input.top_n,
+                namespace=CollectionConfig.STORAGE_NAME,
+                fusion=query_input.fusion,
+                diagnostics=diagnostics
             )
             
-            # Save assistant answer
-            session_manager.add_message(
-                user_id=user_id,
-                session_id=session_id,
-                role="assistant",
-                content=result["answer"],
-                metadata={
-                    "sources_count": len(sources),
-                    "model": model_name
-                }
-            )
+            if not documents:
+                yield _sse_event("sources", [])
+                done = {"answer": NO_DOCUMENTS_ANSWER, "metadata": diagnostics}
+                if query_input.debug:
+                    done["debug"] = {"timings": _finish_timings(timings, started)}
+                yield _sse_event("done", done)
+                return
+            
+            sources = prompt_manager.format_sources(documents)
+            for source in sources:
+                source["namespace"] = source["metadata"].get("namespace", CollectionConfig.STORAGE_NAME)
+            yield _sse_event("sources", sources)
             
-            logger.info(f"Saved query and answer to session {session_id}")
+            async for delta in prompt_manager.astream_answer(
+                query=query_input.query,
+                documents=documents,
+                temperature=query_input.temperature,
+                max_tokens=query_input.max_tokens,
+                model=model_name,
+                context=query_input.context,
+                diagnostics=diagnostics
+            ):
+                answer_parts.append(delta)
+                yield _sse_event("token", {"delta": delta})
         except Exception as e:
-            logger.error(f"Failed to save to session: {e}")
-            # Don't fail the request if session save fails
+            logger.error(f"Error streaming query: {str(e)}")
+            yield _sse_event("error", {"answer": FALLBACK_ANSWER})
+            return
+        
+        answer = "".join(answer_parts)
+        # Persist the answer before "done", so a client that reloads the session on it sees the answer
+        with track_stage("session_write"):
+            await run_blocking(
+                _save_exchange_to_session,
+                current_user,
+                query_input,
+                model_name,
+                answer,
+                len(sources)
+            )
+        
+        done = {"answer": answer, "metadata": diagnostics}
+        if query_input.debug:
+            done["debug"] = {"timings": _finish_timings(timings, started)}
+        yield _sse_event("done", done)
     
-    return QueryResponse(**result)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
 
 @router.post("/retrieve")
 async def retrieve_documents(
@@ -142,11 +312,31 @@ async def retrieve_documents(
 ) -> Dict[str, Any]:
     """Retrieve and rerank documents without LLM generation."""
     # retrieve_only already formats and returns a dict with query and documents
-    result = query_service.retrieve_only(
+    result = await query_service.aretrieve_only(
         query=query_input.query,
         top_k=query_input.top_k,
         top_n=query_input.top_n,
-        namespace=CollectionConfig.STORAGE_NAME
+        namespace=CollectionConfig.STORAGE_NAME,
+        fusion=query_input.fusion
     )
     
     return result
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    query_service: QueryService = Depends(get_query_service),
+    prompt_manager: RAGPromptManager = Depends(get_prompt_manager)
+) -> Dict[str, Any]:
+    """Get hit/miss counters for the query caches and deduplicated in-flight calls."""
+    return {
+        "retrieval": query_service.get_cache_stats(),
+        "answer": prompt_manager.answer_cache.stats() if prompt_manager.answer_cache else None,
+        "generation_coalescing": prompt_manager.get_coalescing_stats()
+    }
+
+@router.get("/rerank/stats")
+async def get_rerank_stats(
+    query_service: QueryService = Depends(get_query_service)
+) -> Dict[str, Any]:
+    """Get how often reranking was skipped, shrunk or run."""
+    return query_service.get_rerank_stats()
@@ -0,0 +1,108 @@
+"""
+Benchmark the answer cache on the first questions of data/Validate/100TestCase.csv
+with a stubbed LLM client (no API key needed, runs offline).
+
+Each question is asked over the same retrieved passages under several
+request variants, then asked again:
+  - two course contexts (ElearningChatInterface sends course_title,
+    course_code and course_description, which go into the prompt)
+  - two max_tokens limits (a truncated short answer must not be served
+    to a request allowing a longer one)
+A variant may only be answered from the cache by its own earlier answer:
+the report counts LLM calls, hits, and hits that returned an answer
+generated for another variant (must be 0).
+
+Usage: python test/benchmark_answer_cache.py
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append('.')
+
+from core.llm.answer_cache import AnswerCache
+from core.llm.llm_interface import RAGPromptManager
+
+CSV_PATH = os.path.join("data", "Validate", "100TestCase.csv")
+QUESTIONS = 20
+
+COURSES = [
+    {"course_title": "Giải tích 1", "course_code": "MAT101", "course_description": "Giới hạn, đạo hàm, tích phân"},
+    {"course_title": "Văn học Việt Nam", "course_code": "LIT201", "course_description": "Văn học hiện đại"},
+]
+VARIANTS = [
+    ("course A, 600 tokens", COURSES[0], 600),
+    ("course B, 600 tokens", COURSES[1], 600),
+    ("course A, 100 tokens", COURSES[0], 100),
+    ("no course, 600 tokens", None, 600),
+]
+
+DOCUMENTS = [
+    {"text": "Học phí năm học 2024-2025 là 15 triệu đồng.", "score": 0.9, "metadata": {"document_id": "hp_chunk_0"}},
+    {"text": "Sinh viên nộp học phí trước ngày 15 mỗi học kỳ.", "score": 0.8, "metadata": {"document_id": "hp_chunk_1"}},
+]
+
+class StubCompletions:
+    """Answers with the course code and token limit it was asked for."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, temperature, max_tokens, timeout):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        course = next((c["course_code"] for c in COURSES if c["course_code"] in prompt), "none")
+        answer = f"[{course}/{max_tokens}] answer {self.calls}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+def load_questions(path: str) -> list:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        return [row["question_text"].strip() for row in reader if row.get("question_text")][:QUESTIONS]
+
+def main():
+    questions = load_questions(CSV_PATH)
+    print("=" * 70)
+    print(f"ANSWER CACHE BENCHMARK: {len(questions)} questions x {len(VARIANTS)} variants, asked twice")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        manager = RAGPromptManager(
+            {"provider": "qwen", "api_key": "offline"},
+            answer_cache=AnswerCache(max_size=1024, ttl_seconds=3600, cache_dir=cache_dir)
+        )
+        completions = StubCompletions()
+        manager.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        print(f"{'variant':<24} {'LLM calls':>10} {'hits':>6} {'foreign hits':>13} {'ms/answer (hit)':>16}")
+        for name, course, max_tokens in VARIANTS:
+            calls_before = completions.calls
+            hits = foreign = 0
+            elapsed = 0.0
+            expected_tag = f"[{course['course_code'] if course else 'none'}/{max_tokens}]"
+            for round_ in range(2):
+                for question in questions:
+                    context = dict(course) if course else None
+                    calls = completions.calls
+                    start = time.perf_counter()
+                    answer = manager.generate_answer(
+                        query=question,
+                        documents=DOCUMENTS,
+                        max_tokens=max_tokens,
+                        context=context
+                    )["answer"]
+                    if completions.calls == calls:
+                        hits += 1
+                        elapsed += time.perf_counter() - start
+                        foreign += not answer.startswith(expected_tag)
+            hit_ms = elapsed / hits * 1000 if hits else 0.0
+            print(f"{name:<24} {completions.calls - calls_before:>10} {hits:>6} {foreign:>13} {hit_ms:>16.3f}")
+
+        print(f"\nEach variant should call the LLM {len(questions)} times, hit {len(questions)} times, 0 foreign hits")
+        print(f"Cache: {manager.answer_cache.stats()['size']} entries in memory")
+
+if __name__ == "__main__":
+    main()
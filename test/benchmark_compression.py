@@ -0,0 +1,97 @@
+"""
+Benchmark extractive context compression against data/Validate/100TestCase.csv.
+Runs fully offline. For each question, a chunk-sized context is built from
+its ground-truth answer mixed with the answers of other questions (the
+distractors a real retrieval would bring), then compressed with
+ContextCompressor as RAGPromptManager does before generation.
+
+For each target ratio it reports:
+  - prompt token reduction
+  - answer recall: share of ground-truth answer syllables still in the context
+  - full retention: contexts that kept every ground-truth answer sentence
+  - average compression latency per context
+
+Answer quality with the LLM in the loop needs the live API; recall of the
+ground-truth answer is the offline proxy used here.
+
+Usage: python test/benchmark_compression.py
+"""
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.append('.')
+
+from core.llm.context_compressor import ContextCompressor, split_sentences
+from core.utils.text_vectors import HashedNgramVectorizer
+from core.utils.tokens import estimate_tokens
+
+CSV_PATH = os.path.join("data", "Validate", "100TestCase.csv")
+RATIOS = [0.4, 0.5, 0.6]
+DISTRACTORS = 4
+
+def load_cases(path: str) -> list:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        return [
+            (row["question_text"].strip(), row["ground_truth_answer"].strip())
+            for row in reader
+            if row.get("question_text") and row.get("ground_truth_answer")
+        ]
+
+def build_contexts(cases: list) -> list:
+    rng = random.Random(13)
+    contexts = []
+    for i, (question, answer) in enumerate(cases):
+        others = [cases[j][1] for j in rng.sample(range(len(cases)), DISTRACTORS + 1) if j != i][:DISTRACTORS]
+        parts = others + [answer]
+        rng.shuffle(parts)
+        contexts.append((question, answer, "\n".join(parts)))
+    return contexts
+
+def syllables(text: str) -> set:
+    return set(HashedNgramVectorizer.normalize(text).split())
+
+def run(ratio: float, contexts: list) -> dict:
+    compressor = ContextCompressor(target_ratio=ratio)
+    before = after = 0
+    recall = 0.0
+    retained = 0
+    start = time.perf_counter()
+    compressed_texts = [compressor.compress_text(q, ctx) for q, _, ctx in contexts]
+    elapsed = time.perf_counter() - start
+
+    for (question, answer, context), compressed in zip(contexts, compressed_texts):
+        before += estimate_tokens(context)
+        after += estimate_tokens(compressed)
+        expected = syllables(answer)
+        recall += len(expected & syllables(compressed)) / len(expected) if expected else 1.0
+        retained += all(sentence in compressed for sentence in split_sentences(answer))
+
+    return {
+        "reduction": 1 - after / before,
+        "recall": recall / len(contexts),
+        "retained": retained / len(contexts),
+        "latency_ms": elapsed / len(contexts) * 1000
+    }
+
+def main():
+    cases = load_cases(CSV_PATH)
+    contexts = build_contexts(cases)
+    avg_tokens = sum(estimate_tokens(ctx) for _, _, ctx in contexts) / len(contexts)
+    print("=" * 70)
+    print(f"CONTEXT COMPRESSION BENCHMARK: {len(contexts)} cases from {CSV_PATH}")
+    print(f"Average context size: {avg_tokens:.0f} tokens")
+    print("=" * 70)
+    print(f"{'ratio':>6} {'reduction':>10} {'recall':>8} {'retained':>9} {'latency':>10}")
+    for ratio in RATIOS:
+        result = run(ratio, contexts)
+        print(
+            f"{ratio:>6.2f} {result['reduction']:>9.1%} {result['recall']:>8.1%} "
+            f"{result['retained']:>9.1%} {result['latency_ms']:>8.2f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark API boot cost: import time and resident memory of the modules a
+worker loads at startup, measured with `python -X importtime` in fresh
+interpreters (the median of several runs).
+
+Reports for each entry point:
+  - cumulative import time
+  - peak resident memory after the import
+  - which document parser libraries got loaded (they should be imported by
+    core/document_processing/extractors.py only when a file is ingested;
+    pandas may still appear, loaded by underthesea through scikit-learn)
+Then lists the slowest top-level imports of main and the one-off cost each
+parser adds on first use.
+
+Usage: python test/benchmark_import_time.py
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+sys.path.append('.')
+
+ENTRY_POINTS = ["core.document_processing.document_processor", "core.utils.dependencies", "main"]
+PARSERS = ["fitz", "pdfplumber", "docx", "openpyxl", "pandas", "bs4", "langchain_text_splitters"]
+RUNS = 3
+TOP = 12
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Printed by the child after the import: peak RSS (KB) and loaded parsers
+PROBE = (
+    "import resource, sys; "
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss); "
+    f"print(','.join(m for m in {PARSERS!r} if m in sys.modules))"
+)
+
+def run_importtime(code: str) -> tuple:
+    """Run code under -X importtime; return (import records, stdout lines)."""
+    env = dict(os.environ, PYTHONPATH=".")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=True
+    )
+    records = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append((module, int(cumulative_us), len(indent) // 2))
+    return records, proc.stdout.strip().splitlines()
+
+def measure(module: str) -> dict:
+    totals, rss = [], []
+    loaded = ""
+    for _ in range(RUNS):
+        records, out = run_importtime(f"import {module}; {PROBE}")
+        totals.append(next(us for name, us, depth in records if name == module and depth == 0))
+        rss.append(int(out[-2]))
+        loaded = out[-1]
+    return {
+        "ms": statistics.median(totals) / 1000,
+        "rss_mb": statistics.median(rss) / 1024,
+        "parsers": loaded or "-"
+    }
+
+def main():
+    print("=" * 70)
+    print(f"IMPORT TIME BENCHMARK: median of {RUNS} fresh interpreters")
+    print("=" * 70)
+    print(f"{'module':<46} {'import':>9} {'RSS':>8}  parsers loaded")
+    for module in ENTRY_POINTS:
+        result = measure(module)
+        print(f"{module:<46} {result['ms']:>7.0f}ms {result['rss_mb']:>6.0f}MB  {result['parsers']}")
+
+    records, _ = run_importtime("import main")
+    print(f"\nSlowest imports under main (depth <= 2, cumulative):")
+    slowest = sorted((r for r in records if 0 < r[2] <= 2), key=lambda r: -r[1])[:TOP]
+    for name, us, depth in slowest:
+        print(f"  {'  ' * (depth - 1)}{name:<44} {us / 1000:>8.0f}ms")
+
+    print("\nFirst-use cost of each parser (imported after main):")
+    for parser in PARSERS:
+        records, _ = run_importtime(f"import main; import {parser}")
+        us = next((us for name, us, depth in records if name == parser and depth == 0), 0)
+        print(f"  {parser:<44} {us / 1000:>8.0f}ms")
+
+if __name__ == "__main__":
+    main()
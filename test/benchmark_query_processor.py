@@ -0,0 +1,95 @@
+"""
+Benchmark QueryProcessor.clean_query on the questions of data/Validate/100TestCase.csv.
+Runs fully offline and compares per-query CPU time of:
+  - before: the previous pipeline (word_tokenize + pos_tag, two regex passes,
+    per-word scan over DOMAIN_KEYWORDS), reproduced below
+  - after (cold): the one-pass pipeline with the memo cleared
+  - after (warm): repeated queries served from the memo
+
+It also checks that both pipelines produce identical processed queries,
+since those feed the retrieval caches and BM25, apart from numerals
+("học kỳ 2"), which the previous pipeline dropped and are now kept.
+
+Usage: python test/benchmark_query_processor.py
+"""
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.append('.')
+
+from underthesea import word_tokenize, pos_tag, text_normalize
+
+from core.document_processing.query_processor import QueryProcessor
+
+CSV_PATH = os.path.join("data", "Validate", "100TestCase.csv")
+ROUNDS = 5
+
+def load_questions(path: str) -> list:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        return [row["question_text"].strip() for row in reader if row.get("question_text")]
+
+def baseline_clean_query(query: str) -> str:
+    """The previous clean_query/extract_keywords, without memoization."""
+    query = query[:QueryProcessor.MAX_QUERY_LENGTH]
+    query = text_normalize(query)
+    query = re.sub(r'[^\w\s]', ' ', query)
+    query = re.sub(r'\s+', ' ', query).strip()
+    query = query.lower()
+
+    word_tokenize(query)  # Result was discarded
+    keywords = []
+    for word, pos in pos_tag(query):
+        is_domain_keyword = any(keyword in word.lower() for keyword in QueryProcessor.DOMAIN_KEYWORDS)
+        if (is_domain_keyword or
+            pos.startswith('N') or
+            pos.startswith('V') or
+            pos.startswith('A') or
+            (word.lower() not in QueryProcessor.STOP_WORDS and len(word) > 1)):
+            keywords.append(word)
+    return ' '.join(keywords) if keywords else query
+
+def without_numerals(processed: str) -> str:
+    return ' '.join(word for word in processed.split() if not word.isdigit())
+
+def cpu_ms_per_query(func, questions: list, clear_memo: bool = False) -> float:
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        if clear_memo:
+            QueryProcessor._memo.clear()
+        for question in questions:
+            func(question)
+    return (time.process_time() - start) / (ROUNDS * len(questions)) * 1000
+
+def main():
+    questions = load_questions(CSV_PATH)
+    print("=" * 70)
+    print(f"QUERY PROCESSOR BENCHMARK: {len(questions)} questions from {CSV_PATH}")
+    print("=" * 70)
+
+    # Warm up underthesea models
+    baseline_clean_query(questions[0])
+    QueryProcessor._memo.clear()
+    mismatches = [
+        q for q in questions
+        if baseline_clean_query(q) != without_numerals(QueryProcessor.clean_query(q))
+    ]
+    print(f"Identical output (ignoring kept numerals): {len(questions) - len(mismatches)}/{len(questions)}")
+    for question in mismatches[:5]:
+        print(f"  differs: {question}")
+
+    before = cpu_ms_per_query(baseline_clean_query, questions)
+    cold = cpu_ms_per_query(QueryProcessor.clean_query, questions, clear_memo=True)
+    warm = cpu_ms_per_query(QueryProcessor.clean_query, questions)
+
+    print(f"{'pipeline':<16} {'CPU ms/query':>14} {'speedup':>9}")
+    print(f"{'before':<16} {before:>14.3f} {1.0:>8.1f}x")
+    print(f"{'after (cold)':<16} {cold:>14.3f} {before / cold:>8.1f}x")
+    print(f"{'after (memo)':<16} {warm:>14.4f} {before / warm:>8.0f}x")
+    print(f"Memo: {QueryProcessor.get_memo_stats()}")
+
+if __name__ == "__main__":
+    main()
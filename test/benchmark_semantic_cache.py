@@ -0,0 +1,127 @@
+"""
+Benchmark the semantic query cache against data/Validate/100TestCase.csv.
+Runs fully offline: queries go through QueryProcessor.clean_query and the
+local hashed n-gram SemanticCache, exactly as QueryService does.
+
+For each threshold, with and without the key-term guard, it reports:
+  - false hits while inserting the distinct test questions
+  - hit rate of hand-written paraphrases (hit on the right original question)
+  - wrong hits (paraphrase matched a different question)
+  - hits between hard negative pairs (same wording, different number or subject)
+  - average lookup latency
+
+Usage: python test/benchmark_semantic_cache.py
+"""
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.append('.')
+
+from core.document_processing.query_processor import QueryProcessor
+from core.utils.semantic_cache import SemanticCache
+
+CSV_PATH = os.path.join("data", "Validate", "100TestCase.csv")
+THRESHOLDS = [0.70, 0.75, 0.80, 0.85, 0.90]
+
+def load_questions(path: str) -> list:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        questions = [row["question_text"].strip() for row in reader if row.get("question_text")]
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(q for q in questions if q))
+
+# Student rewordings of questions in the CSV (index, paraphrase): word order,
+# question words and the university's name change, the question does not
+PARAPHRASES = [
+    (0, "Ai là hiệu trưởng trường ĐH Vinh"),
+    (0, "hiệu trưởng đại học vinh là ai vậy"),
+    (7, "lịch thi học kỳ 2 khi nào có"),
+    (8, "khi nào bắt đầu xét học bổng"),
+    (11, "năm nay học phí có thay đổi không"),
+    (19, "khi nào là thời gian đăng ký tín chỉ"),
+    (20, "một kỳ học tối đa bao nhiêu tín chỉ"),
+    (29, "mất thẻ sinh viên thì làm sao"),
+    (38, "có thể học cùng lúc 2 ngành tại trường không"),
+    (57, "sau năm nhất có thể chuyển ngành học không"),
+    (68, "một năm học có mấy học kỳ chính"),
+    (73, "thế nào là học phần bắt buộc"),
+    (75, "học phần tiên quyết nghĩa là gì"),
+    (84, "trong một học kỳ chính SV cần đăng ký tối thiểu bao nhiêu tín chỉ"),
+    (94, "giảng viên của lớp \"Trí tuệ nhân tạo\" là ai"),
+    (56, "mất thẻ thư viện thì cấp lại như thế nào"),
+]
+
+# Similar wording, different question: any hit here is a wrong answer
+HARD_NEGATIVES = [
+    ("học phí ngành cntt năm 2024", "học phí ngành cntt năm 2023"),
+    ("Điểm chuẩn ngành Sư phạm Toán", "Điểm chuẩn ngành Sư phạm Văn"),
+    ("Khi nào có lịch thi học kỳ 1", "Khi nào có lịch thi học kỳ 2"),
+    ("Học phần bắt buộc là gì?", "Học phần tự chọn là gì?"),
+    ("Mã học phần của lớp \"Trí tuệ nhân tạo\" LT_04 là gì?", "Mã học phần của lớp \"Trí tuệ nhân tạo\" LT_03 là gì?"),
+]
+
+def run(threshold: float, guard: bool, originals: list, variants: list, negatives: list) -> dict:
+    kwargs = {} if guard else {"guard": None}
+    cache = SemanticCache(capacity=len(originals), threshold=threshold, **kwargs)
+
+    # Distinct dataset questions must never hit each other
+    false_hits = 0
+    for idx, processed in enumerate(originals):
+        if cache.get(processed) is not None:
+            false_hits += 1
+        cache.set(processed, idx)
+
+    hits = wrong = 0
+    start = time.perf_counter()
+    for idx, processed in variants:
+        result = cache.get(processed)
+        if result is None:
+            continue
+        if result[0] == idx:
+            hits += 1
+        else:
+            wrong += 1
+    elapsed = time.perf_counter() - start
+
+    negative_hits = 0
+    for stored, asked in negatives:
+        pair_cache = SemanticCache(capacity=1, threshold=threshold, **kwargs)
+        pair_cache.set(stored, True)
+        negative_hits += pair_cache.get(asked) is not None
+
+    return {
+        "false_hits": false_hits,
+        "hit_rate": hits / len(variants),
+        "wrong": wrong,
+        "negative_hits": negative_hits,
+        "lookup_ms": elapsed / len(variants) * 1000
+    }
+
+def main():
+    questions = load_questions(CSV_PATH)
+    print("=" * 70)
+    print(f"SEMANTIC CACHE BENCHMARK: {len(questions)} questions from {CSV_PATH}")
+    print("=" * 70)
+
+    # Questions asked twice in the CSV (e.g. "Học phần tiên quyết là gì") are kept once
+    originals = list(dict.fromkeys(QueryProcessor.clean_query(q) for q in questions))
+    index = {processed: i for i, processed in enumerate(originals)}
+    variants = [(index[QueryProcessor.clean_query(questions[idx])], QueryProcessor.clean_query(p)) for idx, p in PARAPHRASES]
+    negatives = [(QueryProcessor.clean_query(a), QueryProcessor.clean_query(b)) for a, b in HARD_NEGATIVES]
+    print(f"{len(variants)} hand-written paraphrases, {len(negatives)} hard negative pairs\n")
+
+    print(f"{'threshold':>9} | {'guard':>5} | {'false hits':>10} | {'hit rate':>8} | {'wrong':>5} | {'neg hits':>8} | {'lookup ms':>9}")
+    print("-" * 74)
+    for threshold in THRESHOLDS:
+        for guard in (False, True):
+            r = run(threshold, guard, originals, variants, negatives)
+            print(
+                f"{threshold:>9.2f} | {'on' if guard else 'off':>5} | {r['false_hits']:>10d} | {r['hit_rate']:>8.1%} | "
+                f"{r['wrong']:>5d} | {r['negative_hits']:>8d} | {r['lookup_ms']:>9.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -124,6 +124,10 @@ if user_input == 'y':
             )
             print(f"   ✅ Deleted vectors from sparse index")
         
+        # Clear local BM25 index
+        pinecone_service.bm25_index.clear(NAMESPACE)
+        print(f"   ✅ Cleared local BM25 index")
+        
         print("   Waiting 2 seconds for deletion to complete...")
         time.sleep(2)
     except Exception as delete_error: